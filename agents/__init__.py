@@ -1,18 +1,45 @@
 """
 ClimateSense Agents Module
 Contains all agentic AI components for climate action guidance.
+
+Exports are resolved lazily (PEP 562), so `import agents` is cheap and each
+agent module is only imported when its class is first used.
 """
 
-from .estimator import CarbonEstimator
-from .analysis_agent import ImpactAnalysisAgent
-from .recommendation_agent import RecommendationAgent
-from .chat_agent import ClimateChatAgent
-from .challenge_agent import ChallengeAgent
-
-__all__ = [
-    'CarbonEstimator',
-    'ImpactAnalysisAgent',
-    'RecommendationAgent',
-    'ClimateChatAgent',
-    'ChallengeAgent'
-]
+import importlib
+from typing import TYPE_CHECKING
+
+_EXPORTS = {
+    'CarbonEstimator': '.estimator',
+    'ImpactAnalysisAgent': '.analysis_agent',
+    'RecommendationAgent': '.recommendation_agent',
+    'ClimateChatAgent': '.chat_agent',
+    'ChallengeAgent': '.challenge_agent',
+    'AssessmentPipeline': '.pipeline',
+    'TemplateAgent': '.template_agent',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .estimator import CarbonEstimator
+    from .analysis_agent import ImpactAnalysisAgent
+    from .recommendation_agent import RecommendationAgent
+    from .chat_agent import ClimateChatAgent
+    from .challenge_agent import ChallengeAgent
+    from .pipeline import AssessmentPipeline
+    from .template_agent import TemplateAgent
@@ -4,8 +4,25 @@ Analyzes carbon footprint breakdown and explains top emission drivers.
 """
 
 import os
-import google.genai as genai
-from typing import Dict
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+from config.prompts import IMPACT_ANALYSIS_PROMPT
+from agents.estimator import footprint_level
+from agents.llm_client import (
+    DEFAULT_MODEL_NAME,
+    generate_text,
+    generate_text_async,
+    get_client,
+    stream_text,
+    stream_text_async
+)
+from agents.response_cache import get_response_cache
+from agents.precomputed import get_precomputed_store
+from utils.templates import PromptTemplate
+from utils.tracing import traced
+
+
+_ANALYSIS_TEMPLATE = PromptTemplate(IMPACT_ANALYSIS_PROMPT)
 
 
 class ImpactAnalysisAgent:
@@ -26,10 +43,13 @@ class ImpactAnalysisAgent:
                 "Gemini API key not found. Set GEMINI_API_KEY environment variable."
             )
         
-        # Using new google.genai Client API
-        self.client = genai.Client(api_key=self.api_key)
-        self.model_name = 'models/gemini-2.5-flash'
+        # Shared, process-wide client (reuses pooled connections)
+        self.client = get_client(self.api_key)
+        self.model_name = DEFAULT_MODEL_NAME
+        self.cache = get_response_cache()
+        self.precomputed = get_precomputed_store()
     
+    @traced('analysis.analyze')
     def analyze(self, footprint_data: Dict) -> str:
         """
         Analyze footprint breakdown and provide insights.
@@ -40,35 +60,114 @@ class ImpactAnalysisAgent:
         Returns:
             Natural language analysis of the footprint
         """
-        from config.prompts import IMPACT_ANALYSIS_PROMPT
+        precomputed = self._lookup_precomputed(footprint_data)
+        if precomputed is not None:
+            return precomputed
+        
+        prompt = self._build_prompt(footprint_data)
+        
+        try:
+            return generate_text(
+                self.client,
+                self.model_name,
+                prompt,
+                cache=self.cache,
+                agent='analysis'
+            )
+        except Exception as e:
+            raise RuntimeError(str(e))
+    
+    def analyze_stream(self, footprint_data: Dict) -> Iterator[str]:
+        """
+        Stream the analysis as text chunks while the model generates it.
         
+        Args:
+            footprint_data: Output from CarbonEstimator.estimate_footprint()
+            
+        Yields:
+            Text chunks; joined together they form the full analysis
+        """
+        precomputed = self._lookup_precomputed(footprint_data)
+        if precomputed is not None:
+            yield precomputed
+            return
+        
+        prompt = self._build_prompt(footprint_data)
+        
+        try:
+            yield from stream_text(
+                self.client,
+                self.model_name,
+                prompt,
+                cache=self.cache,
+                agent='analysis'
+            )
+        except Exception as e:
+            raise RuntimeError(str(e))
+    
+    @traced('analysis.analyze')
+    async def analyze_async(self, footprint_data: Dict) -> str:
+        """analyze() for the ASGI app; awaits the model instead of blocking."""
+        precomputed = self._lookup_precomputed(footprint_data)
+        if precomputed is not None:
+            return precomputed
+        
+        prompt = self._build_prompt(footprint_data)
+        
+        try:
+            return await generate_text_async(
+                self.client,
+                self.model_name,
+                prompt,
+                cache=self.cache,
+                agent='analysis'
+            )
+        except Exception as e:
+            raise RuntimeError(str(e))
+    
+    async def analyze_stream_async(self, footprint_data: Dict) -> AsyncIterator[str]:
+        """analyze_stream() for the ASGI app."""
+        precomputed = self._lookup_precomputed(footprint_data)
+        if precomputed is not None:
+            yield precomputed
+            return
+        
+        prompt = self._build_prompt(footprint_data)
+        
+        try:
+            async for text in stream_text_async(
+                self.client,
+                self.model_name,
+                prompt,
+                cache=self.cache,
+                agent='analysis'
+            ):
+                yield text
+        except Exception as e:
+            raise RuntimeError(str(e))
+    
+    def _lookup_precomputed(self, footprint_data: Dict) -> Optional[str]:
+        """Return the offline-precomputed analysis for this profile, if any."""
+        if self.precomputed is None:
+            return None
+        return self.precomputed.lookup('analysis', footprint_data)
+    
+    @traced('analysis.build_prompt')
+    def _build_prompt(self, footprint_data: Dict) -> str:
+        """Build the impact analysis prompt from footprint data."""
         # Format breakdown for prompt
         breakdown_text = self._format_breakdown(footprint_data['breakdown'])
         
         # Get footprint level
-        from agents.estimator import CarbonEstimator
-        estimator = CarbonEstimator()
-        level, level_desc = estimator.get_footprint_level(
-            footprint_data['total_score']
-        )
+        level, level_desc = footprint_level(footprint_data['total_score'])
         
         # Build prompt
-        prompt = IMPACT_ANALYSIS_PROMPT.format(
+        return _ANALYSIS_TEMPLATE.render(
             breakdown=breakdown_text,
             total_score=footprint_data['total_score'],
             level=level,
             level_description=level_desc
         )
-        
-        try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt
-            )
-            return response.text
-        except Exception as e:
-            raise RuntimeError(str(e))
-
     
     def _format_breakdown(self, breakdown: list) -> str:
         """Format breakdown list into readable text."""
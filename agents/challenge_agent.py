@@ -4,9 +4,16 @@ Suggests specific, realistic weekly challenges for behavior change.
 """
 
 import os
-import google.genai as genai
 from typing import Dict, Optional
 
+from config.prompts import CHALLENGE_PROMPT
+from agents.llm_client import get_client, generate_text, generate_text_async, DEFAULT_MODEL_NAME
+from utils.templates import PromptTemplate
+from utils.tracing import traced
+
+
+_CHALLENGE_TEMPLATE = PromptTemplate(CHALLENGE_PROMPT)
+
 
 class ChallengeAgent:
     """
@@ -26,10 +33,11 @@ class ChallengeAgent:
                 "Gemini API key not found. Set GEMINI_API_KEY environment variable."
             )
         
-        # Using new google.genai Client API
-        self.client = genai.Client(api_key=self.api_key)
-        self.model_name = 'models/gemini-2.5-flash'
+        # Shared, process-wide client (reuses pooled connections)
+        self.client = get_client(self.api_key)
+        self.model_name = DEFAULT_MODEL_NAME
     
+    @traced('challenge.suggest')
     def suggest_challenge(
         self,
         footprint_data: Dict,
@@ -49,8 +57,44 @@ class ChallengeAgent:
                 - impact: Why it matters
                 - success_criteria: How to measure success
         """
-        from config.prompts import CHALLENGE_PROMPT
+        prompt = self._build_prompt(footprint_data, recommendations_text)
         
+        try:
+            challenge_text = generate_text(
+                self.client,
+                self.model_name,
+                prompt,
+                agent='challenge'
+            )
+            
+            # Parse challenge into structured format
+            return self._parse_challenge(challenge_text)
+        except Exception as e:
+                raise RuntimeError(str(e))
+    
+    @traced('challenge.suggest')
+    async def suggest_challenge_async(
+        self,
+        footprint_data: Dict,
+        recommendations_text: str
+    ) -> Dict[str, str]:
+        """suggest_challenge() for the ASGI app."""
+        prompt = self._build_prompt(footprint_data, recommendations_text)
+        
+        try:
+            challenge_text = await generate_text_async(
+                self.client,
+                self.model_name,
+                prompt,
+                agent='challenge'
+            )
+            return self._parse_challenge(challenge_text)
+        except Exception as e:
+            raise RuntimeError(str(e))
+    
+    @traced('challenge.build_prompt')
+    def _build_prompt(self, footprint_data: Dict, recommendations_text: str) -> str:
+        """Build the challenge prompt from footprint data and recommendations."""
         # Extract top drivers
         top_drivers = [
             item['category'] 
@@ -64,23 +108,11 @@ class ChallengeAgent:
         lifestyle_summary = self._create_lifestyle_summary(footprint_data)
         
         # Build prompt
-        prompt = CHALLENGE_PROMPT.format(
+        return _CHALLENGE_TEMPLATE.render(
             top_drivers=", ".join(top_drivers),
             immediate_action=immediate_action,
             lifestyle_summary=lifestyle_summary
         )
-        
-        try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt
-            )
-            challenge_text = response.text
-            
-            # Parse challenge into structured format
-            return self._parse_challenge(challenge_text)
-        except Exception as e:
-                raise RuntimeError(str(e))
     
     def _extract_immediate_action(self, recommendations: str) -> str:
         """Extract immediate action from recommendations text."""
@@ -111,6 +143,7 @@ class ChallengeAgent:
             parts.append(f"Diet: {inputs['diet']}")
         return "; ".join(parts)
     
+    @traced('challenge.parse')
     def _parse_challenge(self, challenge_text: str) -> Dict[str, str]:
         """Parse challenge text into structured format."""
         challenge = {
@@ -4,8 +4,26 @@ Provides context-aware climate guidance through chat interface.
 """
 
 import os
-import google.genai as genai
-from typing import List, Dict, Optional
+from typing import AsyncIterator, Iterator, List, Dict, Optional
+
+from config.prompts import CHAT_SUMMARY_PROMPT, CHAT_SYSTEM_PROMPT, CHAT_USER_TEMPLATE
+from agents.conversation_store import DEFAULT_TOKEN_BUDGET, estimate_tokens, select_recent
+from agents.estimator import footprint_level
+from agents.llm_client import (
+    DEFAULT_MODEL_NAME,
+    generate_text,
+    generate_text_async,
+    get_client,
+    stream_text,
+    stream_text_async
+)
+from utils.templates import PromptTemplate
+from utils.tracing import traced
+
+
+_SYSTEM_TEMPLATE = PromptTemplate(CHAT_SYSTEM_PROMPT)
+_USER_TEMPLATE = PromptTemplate(CHAT_USER_TEMPLATE)
+_SUMMARY_TEMPLATE = PromptTemplate(CHAT_SUMMARY_PROMPT)
 
 
 class ClimateChatAgent:
@@ -26,16 +44,19 @@ class ClimateChatAgent:
                 "Gemini API key not found. Set GEMINI_API_KEY environment variable."
             )
         
-        # Using new google.genai Client API
-        self.client = genai.Client(api_key=self.api_key)
-        self.model_name = 'models/gemini-2.5-flash'
+        # Shared, process-wide client (reuses pooled connections)
+        self.client = get_client(self.api_key)
+        self.model_name = DEFAULT_MODEL_NAME
+        self.token_budget = int(os.getenv('CHAT_CONTEXT_TOKEN_BUDGET', DEFAULT_TOKEN_BUDGET))
     
+    @traced('chat.chat')
     def chat(
         self,
         user_message: str,
         footprint_profile: Dict,
         chat_history: List[Dict[str, str]],
-        current_challenge: Optional[str] = None
+        current_challenge: Optional[str] = None,
+        summary: Optional[str] = None
     ) -> str:
         """
         Generate contextual response based on user message and profile.
@@ -45,49 +66,183 @@ class ClimateChatAgent:
             footprint_profile: User's footprint data
             chat_history: List of previous messages [{"role": "user/assistant", "content": "..."}]
             current_challenge: Currently selected One-Change Challenge
+            summary: Rolling summary of turns older than chat_history
             
         Returns:
             Assistant's response
         """
-        from config.prompts import CHAT_SYSTEM_PROMPT, CHAT_USER_TEMPLATE
+        full_prompt = self._build_prompt(
+            user_message,
+            footprint_profile,
+            chat_history,
+            current_challenge,
+            summary
+        )
+        
+        try:
+            return generate_text(
+                self.client,
+                self.model_name,
+                full_prompt,
+                agent='chat'
+            )
+        except Exception as e:
+            raise RuntimeError(str(e))
+    
+    def chat_stream(
+        self,
+        user_message: str,
+        footprint_profile: Dict,
+        chat_history: List[Dict[str, str]],
+        current_challenge: Optional[str] = None,
+        summary: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Stream the assistant's response as text chunks.
+        
+        Takes the same arguments as chat().
+        
+        Yields:
+            Text chunks; joined together they form the full response
+        """
+        full_prompt = self._build_prompt(
+            user_message,
+            footprint_profile,
+            chat_history,
+            current_challenge,
+            summary
+        )
+        
+        try:
+            yield from stream_text(
+                self.client,
+                self.model_name,
+                full_prompt,
+                agent='chat'
+            )
+        except Exception as e:
+            raise RuntimeError(str(e))
+    
+    @traced('chat.chat')
+    async def chat_async(
+        self,
+        user_message: str,
+        footprint_profile: Dict,
+        chat_history: List[Dict[str, str]],
+        current_challenge: Optional[str] = None,
+        summary: Optional[str] = None
+    ) -> str:
+        """chat() for the ASGI app; awaits the model instead of blocking."""
+        full_prompt = self._build_prompt(
+            user_message,
+            footprint_profile,
+            chat_history,
+            current_challenge,
+            summary
+        )
         
+        try:
+            return await generate_text_async(
+                self.client,
+                self.model_name,
+                full_prompt,
+                agent='chat'
+            )
+        except Exception as e:
+            raise RuntimeError(str(e))
+    
+    async def chat_stream_async(
+        self,
+        user_message: str,
+        footprint_profile: Dict,
+        chat_history: List[Dict[str, str]],
+        current_challenge: Optional[str] = None,
+        summary: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """chat_stream() for the ASGI app."""
+        full_prompt = self._build_prompt(
+            user_message,
+            footprint_profile,
+            chat_history,
+            current_challenge,
+            summary
+        )
+        
+        try:
+            async for text in stream_text_async(
+                self.client,
+                self.model_name,
+                full_prompt,
+                agent='chat'
+            ):
+                yield text
+        except Exception as e:
+            raise RuntimeError(str(e))
+    
+    @traced('chat.build_prompt')
+    def _build_prompt(
+        self,
+        user_message: str,
+        footprint_profile: Dict,
+        chat_history: List[Dict[str, str]],
+        current_challenge: Optional[str],
+        summary: Optional[str] = None
+    ) -> str:
+        """Build the full chat prompt (system context plus user turn)."""
         # Extract profile info
         top_drivers = [
             item['category'] 
             for item in footprint_profile.get('breakdown', [])[:3]
         ]
         
-        from agents.estimator import CarbonEstimator
-        estimator = CarbonEstimator()
-        level, _ = estimator.get_footprint_level(
-            footprint_profile.get('total_score', 0)
-        )
+        level, _ = footprint_level(footprint_profile.get('total_score', 0))
         
-        # Format chat history
-        history_text = self._format_chat_history(chat_history[-6:])  # Last 6 messages
+        # Format chat history: the summary plus as many recent turns as fit the budget
+        budget = self.token_budget - (estimate_tokens(summary) if summary else 0)
+        history_text = self._format_chat_history(select_recent(chat_history, max(budget, 0)))
+        if summary:
+            history_text = f"Summary of earlier conversation: {summary}\n\n{history_text}"
         
         # Build system context
-        system_context = CHAT_SYSTEM_PROMPT.format(
+        system_context = _SYSTEM_TEMPLATE.render(
             footprint_level=level,
             top_drivers=", ".join(top_drivers) if top_drivers else "Not analyzed yet",
             current_challenge=current_challenge or "None selected"
         )
         
         # Build user prompt
-        user_prompt = CHAT_USER_TEMPLATE.format(
+        user_prompt = _USER_TEMPLATE.render(
             user_message=user_message,
             chat_history=history_text
         )
         
         # Combine prompts
-        full_prompt = f"{system_context}\n\n{user_prompt}"
+        return f"{system_context}\n\n{user_prompt}"
+    
+    @traced('chat.summarize')
+    def summarize(self, previous_summary: str, turns: List[Dict[str, str]]) -> str:
+        """
+        Fold older turns into the rolling conversation summary.
+        
+        Args:
+            previous_summary: Existing summary ('' if none)
+            turns: Turns being dropped from the conversation window
+            
+        Returns:
+            Updated summary
+        """
+        prompt = _SUMMARY_TEMPLATE.render(
+            previous_summary=previous_summary or "None yet.",
+            chat_history=self._format_chat_history(turns)
+        )
         
         try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=full_prompt
-            )
-            return response.text
+            return generate_text(
+                self.client,
+                self.model_name,
+                prompt,
+                agent='chat_summary'
+            ).strip()
         except Exception as e:
             raise RuntimeError(str(e))
     
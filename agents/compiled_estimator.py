@@ -0,0 +1,188 @@
+"""
+Compiled Carbon Estimator - Precomputed Lookup Table
+Scores every possible lifestyle profile once and serves estimates from
+array-backed tables, with a vectorized NumPy batch scorer for cohort jobs.
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from agents.estimator import CarbonEstimator
+
+
+class CompiledEstimator(CarbonEstimator):
+    """
+    Carbon estimator backed by an exhaustive table of all profiles.
+
+    Complete inputs are encoded with CarbonEstimator.encode_profile() and
+    looked up by code; anything incomplete or unknown falls back to the
+    rule-based CarbonEstimator.estimate_footprint().
+    """
+
+    # Ordered footprint levels; tables store an index into this tuple
+    LEVELS: Tuple[Tuple[str, str], ...] = ()
+
+    _table: Optional[Dict[str, np.ndarray]] = None
+    _table_lock = threading.Lock()
+
+    def __init__(self):
+        """Initialize the estimator, building the shared table on first use."""
+        super().__init__()
+        self.table = self.compile()
+
+    @classmethod
+    def compile(cls) -> Dict[str, np.ndarray]:
+        """
+        Build (once per process) the lookup table for every profile.
+
+        Returns:
+            Dictionary of arrays indexed by profile code:
+                - total_score: int16 total score (minimum 1)
+                - level_index: uint8 index into LEVELS
+                - category_scores: int16 score per category, CATEGORIES order
+                - breakdown_order: int8 category indices sorted by score
+                  (descending), padded with -1 after the positive entries
+        """
+        if cls._table is not None:
+            return cls._table
+
+        with cls._table_lock:
+            if cls._table is not None:
+                return cls._table
+
+            estimator = CarbonEstimator()
+            count = cls.PROFILE_COUNT
+            n_categories = len(cls.CATEGORIES)
+
+            category_scores = np.zeros((count, n_categories), dtype=np.int16)
+            for position, category in enumerate(cls.CATEGORIES):
+                options = cls.WEIGHTS[category]
+                weights = np.array(list(options.values()), dtype=np.int16)
+                # Mixed-radix digit for this category across all codes
+                stride = 1
+                for later in cls.CATEGORIES[position + 1:]:
+                    stride *= len(cls.WEIGHTS[later])
+                digits = (np.arange(count) // stride) % len(options)
+                category_scores[:, position] = weights[digits]
+
+            total_score = np.maximum(category_scores.sum(axis=1), 1).astype(np.int16)
+
+            levels: List[Tuple[str, str]] = []
+            level_index = np.zeros(count, dtype=np.uint8)
+            for score in np.unique(total_score):
+                level = estimator.get_footprint_level(int(score))
+                if level not in levels:
+                    levels.append(level)
+                level_index[total_score == score] = levels.index(level)
+
+            # Stable descending sort, matching estimate_footprint() ordering
+            order = np.argsort(-category_scores, axis=1, kind='stable')
+            sorted_scores = np.take_along_axis(category_scores, order, axis=1)
+            breakdown_order = np.where(sorted_scores > 0, order, -1).astype(np.int8)
+
+            cls.LEVELS = tuple(levels)
+            cls._table = {
+                'total_score': total_score,
+                'level_index': level_index,
+                'category_scores': category_scores,
+                'breakdown_order': breakdown_order,
+            }
+            return cls._table
+
+    def estimate_footprint(self, user_inputs: Dict[str, str]) -> Dict:
+        """
+        Estimate footprint from the precomputed table.
+
+        Same output as CarbonEstimator.estimate_footprint(); inputs that
+        cannot be encoded are scored by the rule-based path instead.
+        """
+        code = self.encode_profile(user_inputs)
+        if code is None:
+            return super().estimate_footprint(user_inputs)
+        return self.estimate_code(code, user_inputs)
+
+    def estimate_code(self, code: int, user_inputs: Optional[Dict[str, str]] = None) -> Dict:
+        """Build the estimate_footprint() result for an encoded profile."""
+        if user_inputs is None:
+            user_inputs = self.decode_profile(code)
+
+        total_score = int(self.table['total_score'][code])
+        scores = self.table['category_scores'][code].tolist()
+
+        category_scores = dict(zip(self.CATEGORIES, scores))
+        category_percentages = {
+            cat: (score / total_score) * 100
+            for cat, score in category_scores.items()
+        }
+
+        breakdown = []
+        for position in self.table['breakdown_order'][code].tolist():
+            if position < 0:
+                break
+            category = self.CATEGORIES[position]
+            breakdown.append({
+                'category': self.CATEGORY_LABELS.get(category, category),
+                'score': scores[position],
+                'percentage': category_percentages[category],
+                'value': user_inputs.get(category, 'N/A')
+            })
+
+        return {
+            'total_score': total_score,
+            'category_scores': category_scores,
+            'category_percentages': category_percentages,
+            'breakdown': breakdown,
+            'raw_inputs': user_inputs
+        }
+
+    def get_level_for_code(self, code: int) -> Tuple[str, str]:
+        """Return (level_name, description) for an encoded profile."""
+        return self.LEVELS[self.table['level_index'][code]]
+
+    def encode_batch(self, profiles: Iterable[Dict[str, str]]) -> np.ndarray:
+        """
+        Encode many input dictionaries into an int16 array of profile codes.
+
+        Profiles that cannot be encoded are stored as -1.
+        """
+        codes = [self.encode_profile(inputs) for inputs in profiles]
+        return np.array(
+            [-1 if code is None else code for code in codes],
+            dtype=np.int16
+        )
+
+    def estimate_batch(
+        self,
+        codes: np.ndarray,
+        include_categories: bool = False
+    ) -> Dict[str, np.ndarray]:
+        """
+        Score an array of profile codes with vectorized table lookups.
+
+        Args:
+            codes: Integer array of profile codes (e.g. from encode_batch())
+            include_categories: Also return the (n, 8) per-category scores
+
+        Returns:
+            Dictionary of arrays aligned with `codes`:
+                - total_score: total footprint score
+                - level_index: index into CompiledEstimator.LEVELS
+                - category_scores: per-category scores, CATEGORIES order
+                  (only when include_categories is True)
+
+        Raises:
+            ValueError: If any code is outside range(PROFILE_COUNT)
+        """
+        codes = np.asarray(codes)
+        if codes.size and (codes.min() < 0 or codes.max() >= self.PROFILE_COUNT):
+            raise ValueError("Profile codes must be in range(PROFILE_COUNT)")
+
+        result = {
+            'total_score': self.table['total_score'][codes],
+            'level_index': self.table['level_index'][codes],
+        }
+        if include_categories:
+            result['category_scores'] = self.table['category_scores'][codes]
+        return result
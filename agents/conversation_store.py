@@ -0,0 +1,287 @@
+"""
+Conversation Store for the Climate Advisor Chat
+Keeps each user's conversation on the server (in-process LRU backed by the
+chat_history table), assembles prompt context to a token budget, and
+compacts older turns into a rolling summary so prompt size stays flat.
+Summaries are persisted to chat_summaries so a reloaded conversation keeps
+them instead of falling back to its raw recent turns.
+"""
+
+import os
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agents.single_flight import SingleFlight
+from utils.lru_cache import TTLCache
+
+
+DEFAULT_TOKEN_BUDGET = 1200
+DEFAULT_MAX_CONVERSATIONS = 2000
+DEFAULT_LOAD_TURNS = 40
+
+# Summarizer: (previous_summary, turns_to_fold) -> new summary
+Summarizer = Callable[[str, List[Dict[str, str]]], str]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def turn_tokens(turn: Dict[str, str]) -> int:
+    """Estimated tokens for one message, including its role prefix."""
+    return estimate_tokens(turn.get('content', '')) + 2
+
+
+def make_turn(role: str, content: str, created_at: Optional[str] = None) -> Dict[str, str]:
+    """A chat turn, tagged with its chat_history timestamp when known."""
+    turn = {'role': role, 'content': content}
+    if created_at is not None:
+        turn['created_at'] = created_at
+    return turn
+
+
+def select_recent(turns: List[Dict[str, str]], budget: int) -> List[Dict[str, str]]:
+    """Return the longest suffix of `turns` that fits in `budget` tokens."""
+    selected = []
+    used = 0
+    for turn in reversed(turns):
+        cost = turn_tokens(turn)
+        if used + cost > budget:
+            break
+        selected.append(turn)
+        used += cost
+    selected.reverse()
+    return selected
+
+
+class Conversation:
+    """One user's conversation: a rolling summary plus recent turns."""
+
+    __slots__ = ('summary', 'turns', 'compacting', 'lock')
+
+    def __init__(self, turns: Optional[List[Dict[str, str]]] = None, summary: str = ''):
+        self.summary = summary
+        self.turns: List[Dict[str, str]] = turns or []
+        self.compacting = False
+        self.lock = threading.Lock()
+
+    def tokens(self) -> int:
+        return sum(turn_tokens(turn) for turn in self.turns)
+
+
+class ConversationStore:
+    """
+    Server-side chat history keyed by user.
+
+    Conversations live in an LRU; on a miss the saved summary and the
+    turns written after it are reloaded from chat_summaries and
+    chat_history. When the stored turns exceed `compact_ratio` x budget,
+    older turns are folded into the summary by the summarizer on a
+    background thread, and the new summary is saved.
+    """
+
+    def __init__(
+        self,
+        supabase: Any = None,
+        summarizer: Optional[Summarizer] = None,
+        token_budget: int = DEFAULT_TOKEN_BUDGET,
+        max_conversations: int = DEFAULT_MAX_CONVERSATIONS,
+        load_turns: int = DEFAULT_LOAD_TURNS,
+        compact_ratio: float = 2.0,
+        flush: Optional[Callable[[], None]] = None
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            supabase: Supabase client used to reload evicted conversations
+            summarizer: Function folding old turns into a summary
+            token_budget: Tokens of history (summary + turns) per prompt
+            max_conversations: Conversations kept in memory
+            load_turns: Turns reloaded from the database on a miss
+            compact_ratio: Compact when stored turns exceed ratio x budget
+            flush: Writes queued chat_history rows before a reload
+                (e.g. WriteBehindQueue.flush), so recent turns are not missed
+        """
+        self.supabase = supabase
+        self.summarizer = summarizer
+        self.token_budget = token_budget
+        self.load_turns = load_turns
+        self.compact_ratio = compact_ratio
+        self.flush = flush
+        self._conversations = TTLCache(max_entries=max_conversations)
+        # Concurrent misses for one user share a load; other users' run in parallel
+        self._loads = SingleFlight()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chat-compact')
+        self.compactions = 0
+
+    def get(self, key: str) -> Conversation:
+        """Return the conversation for a key, loading it on a miss."""
+        conversation = self._conversations.get(key)
+        if conversation is not None:
+            return conversation
+        return self._loads.do(key, lambda: self._load_conversation(key))
+
+    def _load_conversation(self, key: str) -> Conversation:
+        # A load for this key may have finished just before this one started
+        conversation = self._conversations.get(key)
+        if conversation is None:
+            conversation = Conversation(*self._load(key))
+            self._conversations.set(key, conversation)
+        return conversation
+
+    def context(self, key: str) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        Assemble prompt context within the token budget.
+
+        Returns:
+            Tuple of (summary, recent_turns)
+        """
+        conversation = self.get(key)
+        with conversation.lock:
+            summary = conversation.summary
+            budget = max(self.token_budget - estimate_tokens(summary), 0)
+            return summary, select_recent(conversation.turns, budget)
+
+    def append(
+        self,
+        key: str,
+        user_message: str,
+        assistant_response: str,
+        created_at: Optional[str] = None
+    ):
+        """
+        Record a completed exchange and compact if the history grew too large.
+
+        `created_at` is the exchange's chat_history timestamp; a summary is
+        only saved once the turns it folds carry one.
+        """
+        conversation = self.get(key)
+        with conversation.lock:
+            conversation.turns.append(make_turn('user', user_message, created_at))
+            conversation.turns.append(make_turn('assistant', assistant_response, created_at))
+            needs_compaction = (
+                not conversation.compacting
+                and conversation.tokens() > self.token_budget * self.compact_ratio
+            )
+            if needs_compaction:
+                conversation.compacting = True
+
+        if needs_compaction:
+            self._executor.submit(self._compact, key, conversation)
+
+    def _compact(self, key: str, conversation: Conversation):
+        """Fold all but the most recent half-budget of turns into the summary."""
+        try:
+            with conversation.lock:
+                keep = select_recent(conversation.turns, self.token_budget // 2)
+                old = conversation.turns[:len(conversation.turns) - len(keep)]
+                summary = conversation.summary
+            if not old:
+                return
+
+            if self.summarizer is not None:
+                try:
+                    summary = self.summarizer(summary, old)
+                except Exception as e:
+                    # Keep the old summary; dropped turns are already outside the budget
+                    print(f"Warning: conversation summary failed: {e}")
+
+            with conversation.lock:
+                # Turns appended during summarization stay after the folded prefix
+                conversation.turns = conversation.turns[len(old):]
+                conversation.summary = summary
+            self.compactions += 1
+            # A reload skips whole exchanges up to the last one fully folded
+            folded = [turn for turn in old if turn['role'] == 'assistant']
+            if folded:
+                self._save_summary(key, summary, folded[-1].get('created_at'))
+        finally:
+            conversation.compacting = False
+
+    def _save_summary(self, key: str, summary: str, summarized_through: Optional[str]):
+        """Persist a user's summary and the timestamp of the last turn it folds."""
+        if not self.supabase or summarized_through is None:
+            return
+        row = {
+            'summary': summary,
+            'summarized_through': summarized_through,
+            'updated_at': datetime.utcnow().isoformat()
+        }
+        try:
+            table = self.supabase.table('chat_summaries')
+            if not table.update(row).eq('user_id', key).execute().data:
+                table.insert(dict(row, user_id=key)).execute()
+        except Exception as e:
+            print(f"Warning: could not save conversation summary: {e}")
+
+    def _load(self, key: str) -> Tuple[List[Dict[str, str]], str]:
+        """
+        Load a user's saved summary and the most recent turns after it.
+
+        Returns:
+            Tuple of (turns, summary)
+        """
+        if not self.supabase:
+            return [], ''
+        if self.flush is not None:
+            # The user's latest exchanges may still be queued for chat_history
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Warning: could not flush queued chat history: {e}")
+
+        summary, summarized_through = '', None
+        try:
+            saved = self.supabase.table('chat_summaries') \
+                .select('summary, summarized_through') \
+                .eq('user_id', key) \
+                .limit(1) \
+                .execute().data
+            if saved:
+                summary = saved[0]['summary'] or ''
+                summarized_through = saved[0]['summarized_through']
+        except Exception as e:
+            print(f"Warning: could not load conversation summary: {e}")
+
+        try:
+            query = self.supabase.table('chat_history') \
+                .select('user_message, assistant_response, created_at') \
+                .eq('user_id', key)
+            if summarized_through is not None:
+                # Turns up to this point are already folded into the summary
+                query = query.gt('created_at', summarized_through)
+            rows = query \
+                .order('created_at', desc=True) \
+                .limit(self.load_turns // 2) \
+                .execute().data or []
+        except Exception as e:
+            print(f"Warning: could not load chat history: {e}")
+            return [], summary
+
+        turns = []
+        for row in reversed(rows):
+            turns.append(make_turn('user', row['user_message'], row.get('created_at')))
+            turns.append(make_turn('assistant', row['assistant_response'], row.get('created_at')))
+        return turns, summary
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._conversations.stats(), compactions=self.compactions)
+
+
+def build_conversation_store(
+    supabase: Any = None,
+    summarizer: Optional[Summarizer] = None,
+    flush: Optional[Callable[[], None]] = None
+) -> ConversationStore:
+    """Build a store configured from environment settings."""
+    return ConversationStore(
+        supabase=supabase,
+        summarizer=summarizer,
+        flush=flush,
+        token_budget=int(os.getenv('CHAT_CONTEXT_TOKEN_BUDGET', DEFAULT_TOKEN_BUDGET)),
+        max_conversations=int(os.getenv('CHAT_MAX_CONVERSATIONS', DEFAULT_MAX_CONVERSATIONS))
+    )
@@ -3,7 +3,7 @@ Carbon Estimation Agent - Rule-Based, Transparent Scoring System
 Provides explainable carbon footprint estimates based on lifestyle inputs.
 """
 
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 
 class CarbonEstimator:
@@ -68,10 +68,59 @@ class CarbonEstimator:
         'device_usage': 'Device Usage'
     }
     
+    # Canonical category order used for profile encoding
+    CATEGORIES = tuple(WEIGHTS)
+    
+    # Number of distinct complete profiles (product of option counts)
+    PROFILE_COUNT = 1
+    for _options in WEIGHTS.values():
+        PROFILE_COUNT *= len(_options)
+    del _options
+    
+    # Option value -> digit lookup for each category
+    OPTION_INDEX = {
+        category: {value: index for index, value in enumerate(options)}
+        for category, options in WEIGHTS.items()
+    }
+    
     def __init__(self):
         """Initialize the carbon estimator."""
         pass
     
+    @classmethod
+    def encode_profile(cls, user_inputs: Dict[str, str]) -> Optional[int]:
+        """
+        Encode a complete set of lifestyle inputs as a small integer.
+        
+        Each category is a mixed-radix digit (option index within WEIGHTS),
+        with the first category most significant.
+        
+        Returns:
+            Profile code in range(PROFILE_COUNT), or None if any category
+            is missing or has an unknown value
+        """
+        code = 0
+        for category in cls.CATEGORIES:
+            value = user_inputs.get(category)
+            index = cls.OPTION_INDEX[category].get(value) if isinstance(value, str) else None
+            if index is None:
+                return None
+            code = code * len(cls.OPTION_INDEX[category]) + index
+        return code
+    
+    @classmethod
+    def decode_profile(cls, code: int) -> Dict[str, str]:
+        """Decode a profile code back into a lifestyle inputs dictionary."""
+        if not 0 <= code < cls.PROFILE_COUNT:
+            raise ValueError(f"Profile code out of range: {code}")
+        
+        inputs = {}
+        for category in reversed(cls.CATEGORIES):
+            options = list(cls.WEIGHTS[category])
+            code, index = divmod(code, len(options))
+            inputs[category] = options[index]
+        return {category: inputs[category] for category in cls.CATEGORIES}
+    
     def estimate_footprint(self, user_inputs: Dict[str, str]) -> Dict:
         """
         Estimate carbon footprint based on user lifestyle inputs.
@@ -138,14 +187,7 @@ class CarbonEstimator:
         Returns:
             Tuple of (level_name, description)
         """
-        if total_score < 50:
-            return ("Low", "Your lifestyle has a relatively low carbon impact. Great job!")
-        elif total_score < 100:
-            return ("Medium", "Your carbon footprint is moderate. There's room for improvement.")
-        elif total_score < 150:
-            return ("High", "Your lifestyle has a significant carbon impact. Let's work on reducing it.")
-        else:
-            return ("Very High", "Your carbon footprint is quite high. Every change matters!")
+        return footprint_level(total_score)
     
     def get_disclaimer(self) -> str:
         """Return disclaimer text for estimates."""
@@ -154,3 +196,20 @@ class CarbonEstimator:
             "not a scientific measurement. Actual carbon footprints depend on many factors "
             "including location, energy sources, and specific consumption patterns."
         )
+
+
+def footprint_level(total_score: float) -> Tuple[str, str]:
+    """
+    Categorize a footprint score into a level without building an estimator.
+    
+    Returns:
+        Tuple of (level_name, description)
+    """
+    if total_score < 50:
+        return ("Low", "Your lifestyle has a relatively low carbon impact. Great job!")
+    elif total_score < 100:
+        return ("Medium", "Your carbon footprint is moderate. There's room for improvement.")
+    elif total_score < 150:
+        return ("High", "Your lifestyle has a significant carbon impact. Let's work on reducing it.")
+    else:
+        return ("Very High", "Your carbon footprint is quite high. Every change matters!")
@@ -0,0 +1,395 @@
+"""
+Shared Gemini Client Registry
+Keeps one long-lived genai.Client per API key so every agent reuses the same
+HTTP connection pool instead of building a client on each request.
+
+google.genai (and httpx) are imported when the first client is built, not
+when this module is imported, to keep worker start-up fast.
+
+generate_text_async() and stream_text_async() are the coroutine versions
+used by the ASGI app; they go through the client's `aio` interface and
+share the same rate limiter, response cache and metrics.
+
+Upstream calls go through the `gemini` circuit breaker: during an outage
+they fail fast with CircuitOpenError (cached responses are still served).
+"""
+
+import hashlib
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterator, Optional
+
+from agents.rate_limiter import classify_error, get_rate_limiter
+from agents.single_flight import get_async_single_flight, get_single_flight
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError, get_breaker
+from utils.metrics import REGISTRY, TOKEN_BUCKETS
+from utils.tracing import current_span, span
+
+if TYPE_CHECKING:
+    import google.genai as genai
+
+
+DEFAULT_MODEL_NAME = 'models/gemini-2.5-flash'
+
+# Connection pool defaults (override with environment variables)
+DEFAULT_POOL_SIZE = 20
+DEFAULT_KEEPALIVE_SECONDS = 60.0
+
+_clients: Dict[str, 'genai.Client'] = {}
+_lock = threading.Lock()
+
+LLM_LATENCY = REGISTRY.histogram(
+    'llm_request_duration_seconds',
+    'Gemini call latency per agent, including rate limiter queueing and retries',
+    ('agent', 'mode')
+)
+LLM_REQUESTS = REGISTRY.counter(
+    'llm_requests_total',
+    'Gemini requests per agent by outcome (ok, cached, shared, throttled, rejected, error)',
+    ('agent', 'outcome')
+)
+LLM_TOKENS = REGISTRY.histogram(
+    'llm_tokens',
+    'Prompt and response tokens per Gemini call',
+    ('agent', 'kind'),
+    buckets=TOKEN_BUCKETS
+)
+
+
+def _pool_settings() -> Dict[str, float]:
+    """Read connection pool settings from the environment."""
+    return {
+        'pool_size': int(os.getenv('GEMINI_POOL_SIZE', DEFAULT_POOL_SIZE)),
+        'keepalive': float(
+            os.getenv('GEMINI_KEEPALIVE_SECONDS', DEFAULT_KEEPALIVE_SECONDS)
+        ),
+    }
+
+
+def build_client(
+    api_key: str,
+    pool_size: Optional[int] = None,
+    keepalive: Optional[float] = None,
+    base_url: Optional[str] = None
+) -> 'genai.Client':
+    """
+    Build a new genai.Client with a tuned HTTP connection pool.
+
+    Args:
+        api_key: Gemini API key
+        pool_size: Maximum open (and keep-alive) connections
+        keepalive: Seconds an idle connection is kept open
+        base_url: Override the API endpoint (e.g. a local stub server)
+
+    Returns:
+        Configured genai.Client
+    """
+    import httpx
+    import google.genai as genai
+    from google.genai import types
+
+    settings = _pool_settings()
+    pool_size = pool_size or settings['pool_size']
+    keepalive = keepalive if keepalive is not None else settings['keepalive']
+    base_url = base_url or os.getenv('GEMINI_BASE_URL')
+
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=keepalive
+    )
+    http_options = types.HttpOptions(
+        base_url=base_url,
+        client_args={'limits': limits},
+        async_client_args={'limits': limits}
+    )
+    return genai.Client(api_key=api_key, http_options=http_options)
+
+
+def get_client(api_key: str) -> 'genai.Client':
+    """
+    Return the shared client for an API key, creating it on first use.
+
+    Safe to call from any Flask worker thread; the client and its
+    connection pool live for the lifetime of the process.
+    """
+    client = _clients.get(api_key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = build_client(api_key)
+            _clients[api_key] = client
+        return client
+
+
+def prompt_key(model_name: str, prompt: str) -> str:
+    """Hash a model name and rendered prompt into a stable key."""
+    digest = hashlib.sha256()
+    digest.update(model_name.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(prompt.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _record_usage(agent: str, usage: Any):
+    """Record token counts from usage_metadata on metrics and the active span."""
+    if usage is None:
+        return
+    active = current_span()
+    if usage.prompt_token_count:
+        LLM_TOKENS.labels(agent, 'prompt').observe(usage.prompt_token_count)
+        active.set_attribute('tokens.prompt', usage.prompt_token_count)
+    if usage.candidates_token_count:
+        LLM_TOKENS.labels(agent, 'response').observe(usage.candidates_token_count)
+        active.set_attribute('tokens.response', usage.candidates_token_count)
+
+
+def _record_failure(agent: str, error: Exception):
+    if isinstance(error, CircuitOpenError):
+        outcome = 'rejected'
+    elif classify_error(error) == 'throttled':
+        outcome = 'throttled'
+    else:
+        outcome = 'error'
+    LLM_REQUESTS.labels(agent, outcome).inc()
+
+
+def is_outage(error: Exception) -> bool:
+    """True for errors that suggest Gemini is down, not quota or bad requests."""
+    if classify_error(error) == 'throttled':
+        return False
+    code = getattr(error, 'code', None)
+    return not (isinstance(code, int) and 400 <= code < 500)
+
+
+def get_gemini_breaker() -> CircuitBreaker:
+    return get_breaker('gemini', is_failure=is_outage)
+
+
+def generate_text(
+    client: 'genai.Client',
+    model_name: str,
+    prompt: str,
+    cache=None,
+    agent: str = 'other'
+) -> str:
+    """
+    Generate a completion, serving repeat prompts from the response cache.
+
+    Concurrent identical prompts share one upstream call (single-flight),
+    and upstream calls go through the shared adaptive rate limiter, which
+    queues them and retries throttled or transient failures.
+
+    Args:
+        client: Shared genai.Client
+        model_name: Model to call
+        prompt: Fully rendered prompt
+        cache: Optional ResponseCache (agents/response_cache.py)
+        agent: Label for metrics (e.g. 'analysis', 'chat')
+
+    Returns:
+        Response text
+    """
+    with span('llm.generate_content', agent=agent, model=model_name) as current:
+        text, outcome = _generate(client, model_name, prompt, cache, agent)
+        current.set_attribute('outcome', outcome)
+        return text
+
+
+def _generate(client: 'genai.Client', model_name: str, prompt: str, cache, agent: str):
+    """generate_text() body; returns (text, outcome) for metrics and tracing."""
+    if cache is not None:
+        cached = cache.get(model_name, prompt)
+        if cached is not None:
+            LLM_REQUESTS.labels(agent, 'cached').inc()
+            return cached, 'cached'
+
+    led = False
+
+    def call_upstream() -> str:
+        nonlocal led
+        led = True
+        start = time.perf_counter()
+        try:
+            with get_gemini_breaker().guard():
+                response = get_rate_limiter().call(
+                    lambda: client.models.generate_content(
+                        model=model_name,
+                        contents=prompt
+                    )
+                )
+        except Exception as e:
+            _record_failure(agent, e)
+            raise
+        LLM_LATENCY.labels(agent, 'unary').observe(time.perf_counter() - start)
+        LLM_REQUESTS.labels(agent, 'ok').inc()
+        _record_usage(agent, response.usage_metadata)
+
+        text = response.text
+        if cache is not None and text:
+            cache.set(model_name, prompt, text)
+        return text
+
+    text = get_single_flight().do(prompt_key(model_name, prompt), call_upstream)
+    if not led:
+        # Another thread made the upstream call for this prompt
+        LLM_REQUESTS.labels(agent, 'shared').inc()
+        return text, 'shared'
+    return text, 'ok'
+
+
+def stream_text(
+    client: 'genai.Client',
+    model_name: str,
+    prompt: str,
+    cache=None,
+    agent: str = 'other'
+) -> Iterator[str]:
+    """
+    Stream a completion as text chunks.
+
+    Holds one rate limiter slot for the whole stream (streams are not
+    retried). A cached response is yielded as a single chunk, and a
+    completed stream is written back to the cache.
+    """
+    if cache is not None:
+        cached = cache.get(model_name, prompt)
+        if cached is not None:
+            LLM_REQUESTS.labels(agent, 'cached').inc()
+            yield cached
+            return
+
+    chunks = []
+    usage = None
+    start = time.perf_counter()
+    with span('llm.stream_content', agent=agent, model=model_name):
+        try:
+            with get_gemini_breaker().guard(), get_rate_limiter().slot():
+                for chunk in client.models.generate_content_stream(
+                    model=model_name,
+                    contents=prompt
+                ):
+                    usage = chunk.usage_metadata or usage
+                    if chunk.text:
+                        chunks.append(chunk.text)
+                        yield chunk.text
+        except Exception as e:
+            _record_failure(agent, e)
+            raise
+        LLM_LATENCY.labels(agent, 'stream').observe(time.perf_counter() - start)
+        LLM_REQUESTS.labels(agent, 'ok').inc()
+        _record_usage(agent, usage)
+
+    if cache is not None and chunks:
+        cache.set(model_name, prompt, ''.join(chunks))
+
+
+async def generate_text_async(
+    client: 'genai.Client',
+    model_name: str,
+    prompt: str,
+    cache=None,
+    agent: str = 'other'
+) -> str:
+    """
+    generate_text() for coroutines: awaits client.aio instead of blocking
+    a thread for the whole upstream call.
+    """
+    with span('llm.generate_content', agent=agent, model=model_name) as current:
+        text, outcome = await _generate_async(client, model_name, prompt, cache, agent)
+        current.set_attribute('outcome', outcome)
+        return text
+
+
+async def _generate_async(client: 'genai.Client', model_name: str, prompt: str, cache, agent: str):
+    """generate_text_async() body; returns (text, outcome)."""
+    if cache is not None:
+        cached = cache.get(model_name, prompt)
+        if cached is not None:
+            LLM_REQUESTS.labels(agent, 'cached').inc()
+            return cached, 'cached'
+
+    async def call_upstream() -> str:
+        start = time.perf_counter()
+        try:
+            with get_gemini_breaker().guard():
+                response = await get_rate_limiter().call_async(
+                    lambda: client.aio.models.generate_content(
+                        model=model_name,
+                        contents=prompt
+                    )
+                )
+        except Exception as e:
+            _record_failure(agent, e)
+            raise
+        LLM_LATENCY.labels(agent, 'unary').observe(time.perf_counter() - start)
+        LLM_REQUESTS.labels(agent, 'ok').inc()
+        _record_usage(agent, response.usage_metadata)
+
+        text = response.text
+        if cache is not None and text:
+            cache.set(model_name, prompt, text)
+        return text
+
+    text, led = await get_async_single_flight().do(prompt_key(model_name, prompt), call_upstream)
+    if not led:
+        LLM_REQUESTS.labels(agent, 'shared').inc()
+        return text, 'shared'
+    return text, 'ok'
+
+
+async def stream_text_async(
+    client: 'genai.Client',
+    model_name: str,
+    prompt: str,
+    cache=None,
+    agent: str = 'other'
+) -> AsyncIterator[str]:
+    """stream_text() for coroutines, yielding chunks as they arrive."""
+    if cache is not None:
+        cached = cache.get(model_name, prompt)
+        if cached is not None:
+            LLM_REQUESTS.labels(agent, 'cached').inc()
+            yield cached
+            return
+
+    chunks = []
+    usage = None
+    start = time.perf_counter()
+    with span('llm.stream_content', agent=agent, model=model_name):
+        try:
+            with get_gemini_breaker().guard():
+                async with get_rate_limiter().slot_async():
+                    stream = await client.aio.models.generate_content_stream(
+                        model=model_name,
+                        contents=prompt
+                    )
+                    async for chunk in stream:
+                        usage = chunk.usage_metadata or usage
+                        if chunk.text:
+                            chunks.append(chunk.text)
+                            yield chunk.text
+        except Exception as e:
+            _record_failure(agent, e)
+            raise
+        LLM_LATENCY.labels(agent, 'stream').observe(time.perf_counter() - start)
+        LLM_REQUESTS.labels(agent, 'ok').inc()
+        _record_usage(agent, usage)
+
+    if cache is not None and chunks:
+        cache.set(model_name, prompt, ''.join(chunks))
+
+
+def reset_clients():
+    """Close and drop all shared clients (used by tests and benchmarks)."""
+    with _lock:
+        for client in _clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        _clients.clear()
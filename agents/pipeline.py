@@ -0,0 +1,292 @@
+"""
+Assessment Pipeline - Concurrent Stage Orchestration
+Runs the analysis, recommendation and challenge agents as a dependency graph
+so independent LLM calls overlap and wall time tracks the critical path.
+Stages run on a thread pool (iter_stages) or as asyncio tasks under the
+ASGI app (iter_stages_async). A stage whose LLM call fails is answered by
+the template agent (unless LLM_FALLBACK_ENABLED is off). With
+stream_analysis the analysis text is also yielded chunk by chunk as it is
+generated, so a streamed response can render it before the stage ends.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from agents.analysis_agent import ImpactAnalysisAgent
+from agents.recommendation_agent import RecommendationAgent
+from agents.challenge_agent import ChallengeAgent
+from agents.template_agent import LLM_FALLBACKS, TemplateAgent, fallback_on_error
+from utils.tracing import bind_context, span
+
+
+DEFAULT_WORKERS = 8
+
+# Yielded by iter_stages() in place of a stage name for each streamed chunk
+ANALYSIS_TOKEN = 'analysis.token'
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the process-wide thread pool used to run pipeline stages."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(os.getenv('ASSESSMENT_WORKERS', DEFAULT_WORKERS)),
+                    thread_name_prefix='assessment'
+                )
+    return _executor
+
+
+class StageSkipped(RuntimeError):
+    """Raised for a stage whose dependency failed."""
+
+
+class AssessmentPipeline:
+    """
+    Orchestrates the AI assessment stages for one footprint.
+
+    Stage graph:
+        analysis          (independent)
+        recommendations   (independent - its prompt only uses the footprint)
+        challenge         (depends on recommendations)
+    """
+
+    def __init__(
+        self,
+        api_key: str = None,
+        executor: Optional[ThreadPoolExecutor] = None,
+        stream_analysis: bool = False
+    ):
+        """
+        Initialize the pipeline and its agents.
+
+        Args:
+            api_key: Gemini API key (if None, reads from environment)
+            executor: Thread pool for stages (defaults to the shared pool)
+            stream_analysis: Also yield (ANALYSIS_TOKEN, chunk, None) for
+                each chunk of the analysis as it is generated
+        """
+        self.analysis_agent = ImpactAnalysisAgent(api_key)
+        self.recommendation_agent = RecommendationAgent(api_key)
+        self.challenge_agent = ChallengeAgent(api_key)
+        self.template_agent = TemplateAgent()
+        self.executor = executor or get_executor()
+        self.stream_analysis = stream_analysis
+
+        # Receives streamed analysis chunks during iter_stages()
+        self._emit: Optional[Callable[[Any], None]] = None
+
+        # Stages answered by the template agent: name -> reason
+        self.fallbacks: Dict[str, str] = {}
+
+        # name -> (dependencies, callable(footprint_data, results))
+        self.stages: Dict[str, Tuple[List[str], Callable[[Dict, Dict], Any]]] = {
+            'analysis': ([], self._run_analysis),
+            'recommendations': ([], self._run_recommendations),
+            'challenge': (['recommendations'], self._run_challenge),
+        }
+        # Coroutine versions of the same stages, for iter_stages_async()
+        self.async_stages: Dict[str, Callable[[Dict, Dict], Awaitable[Any]]] = {
+            'analysis': self._run_analysis_async,
+            'recommendations': self._run_recommendations_async,
+            'challenge': self._run_challenge_async,
+        }
+
+    def iter_stages(
+        self,
+        footprint_data: Dict
+    ) -> Iterator[Tuple[str, Any, Optional[Exception]]]:
+        """
+        Run all stages, yielding each one as soon as it finishes.
+
+        Args:
+            footprint_data: Output from CarbonEstimator.estimate_footprint()
+
+        Yields:
+            Tuple of (stage_name, result, error); error is None on success.
+            With stream_analysis, (ANALYSIS_TOKEN, chunk, None) tuples come
+            before the analysis stage's own
+        """
+        results: Dict[str, Any] = {}
+        failed: Dict[str, Exception] = {}
+        pending: Dict[Future, str] = {}
+        waiting = dict(self.stages)
+        # Streamed chunks and finished futures, in order: a stage's chunks
+        # are always queued before its future
+        events: queue.Queue = queue.Queue()
+        self._emit = events.put
+
+        def schedule_ready():
+            skipped = []
+            for name, (deps, func) in list(waiting.items()):
+                if any(dep in failed for dep in deps):
+                    del waiting[name]
+                    failed[name] = StageSkipped(f"Skipped because {', '.join(deps)} failed")
+                    skipped.append(name)
+                elif all(dep in results for dep in deps):
+                    del waiting[name]
+                    future = self.executor.submit(
+                        bind_context(self._run_stage), name, func, footprint_data, dict(results)
+                    )
+                    future.add_done_callback(events.put)
+                    pending[future] = name
+            return skipped
+
+        for name in schedule_ready():
+            yield name, None, failed[name]
+
+        while pending:
+            event = events.get()
+            if isinstance(event, str):
+                yield ANALYSIS_TOKEN, event, None
+                continue
+            name = pending.pop(event)
+            try:
+                results[name] = event.result()
+                yield name, results[name], None
+            except Exception as e:
+                failed[name] = e
+                yield name, None, e
+            for name in schedule_ready():
+                yield name, None, failed[name]
+
+    async def iter_stages_async(
+        self,
+        footprint_data: Dict
+    ) -> AsyncIterator[Tuple[str, Any, Optional[Exception]]]:
+        """
+        iter_stages() for coroutines: stages run as tasks on the event loop
+        instead of occupying pool threads.
+        """
+        results: Dict[str, Any] = {}
+        failed: Dict[str, Exception] = {}
+        pending: Dict[asyncio.Task, str] = {}
+        waiting = {name: deps for name, (deps, _) in self.stages.items()}
+        events: asyncio.Queue = asyncio.Queue()
+        self._emit = events.put_nowait
+
+        def schedule_ready():
+            skipped = []
+            for name, deps in list(waiting.items()):
+                if any(dep in failed for dep in deps):
+                    del waiting[name]
+                    failed[name] = StageSkipped(f"Skipped because {', '.join(deps)} failed")
+                    skipped.append(name)
+                elif all(dep in results for dep in deps):
+                    del waiting[name]
+                    task = asyncio.ensure_future(
+                        self._run_stage_async(name, self.async_stages[name], footprint_data, dict(results))
+                    )
+                    task.add_done_callback(events.put_nowait)
+                    pending[task] = name
+            return skipped
+
+        try:
+            for name in schedule_ready():
+                yield name, None, failed[name]
+
+            while pending:
+                event = await events.get()
+                if isinstance(event, str):
+                    yield ANALYSIS_TOKEN, event, None
+                    continue
+                name = pending.pop(event)
+                try:
+                    results[name] = event.result()
+                    yield name, results[name], None
+                except Exception as e:
+                    failed[name] = e
+                    yield name, None, e
+                for name in schedule_ready():
+                    yield name, None, failed[name]
+        finally:
+            # The consumer stopped early (e.g. the client disconnected)
+            for task in pending:
+                task.cancel()
+
+    def run(self, footprint_data: Dict) -> Dict[str, Any]:
+        """
+        Run all stages and wait for the whole graph.
+
+        Returns:
+            Dictionary with one entry per stage name, plus 'errors' mapping
+            failed stage names to their exceptions
+        """
+        output: Dict[str, Any] = {'errors': {}}
+        for name, result, error in self.iter_stages(footprint_data):
+            if error is not None:
+                output['errors'][name] = error
+            output[name] = result
+        return output
+
+    def _run_stage(self, name: str, func: Callable[[Dict, Dict], Any], footprint_data: Dict, results: Dict) -> Any:
+        with span(f'pipeline.{name}'):
+            try:
+                return func(footprint_data, results)
+            except Exception as e:
+                return self._fallback(name, footprint_data, e)
+
+    async def _run_stage_async(self, name: str, func: Callable[[Dict, Dict], Awaitable[Any]],
+                               footprint_data: Dict, results: Dict) -> Any:
+        with span(f'pipeline.{name}'):
+            try:
+                return await func(footprint_data, results)
+            except Exception as e:
+                return self._fallback(name, footprint_data, e)
+
+    def _fallback(self, name: str, footprint_data: Dict, error: Exception) -> Any:
+        """Answer a failed stage from the template agent, or re-raise the error."""
+        if not fallback_on_error():
+            raise error
+        print(f"Warning: {name} stage failed, serving template output: {error}")
+        LLM_FALLBACKS.labels(name, 'error').inc()
+        self.fallbacks[name] = 'error'
+        if name == 'analysis':
+            return self.template_agent.analyze(footprint_data)
+        if name == 'recommendations':
+            return self.template_agent.prioritize_recommendations(footprint_data)
+        return self.template_agent.suggest_challenge(footprint_data)
+
+    def _run_analysis(self, footprint_data: Dict, results: Dict) -> str:
+        if not self.stream_analysis:
+            return self.analysis_agent.analyze(footprint_data)
+        chunks = []
+        for text in self.analysis_agent.analyze_stream(footprint_data):
+            chunks.append(text)
+            self._emit(text)
+        return ''.join(chunks)
+
+    def _run_recommendations(self, footprint_data: Dict, results: Dict) -> str:
+        return self.recommendation_agent.prioritize_recommendations(footprint_data)
+
+    def _run_challenge(self, footprint_data: Dict, results: Dict) -> Dict[str, str]:
+        return self.challenge_agent.suggest_challenge(
+            footprint_data,
+            results['recommendations']
+        )
+
+    async def _run_analysis_async(self, footprint_data: Dict, results: Dict) -> str:
+        if not self.stream_analysis:
+            return await self.analysis_agent.analyze_async(footprint_data)
+        chunks = []
+        async for text in self.analysis_agent.analyze_stream_async(footprint_data):
+            chunks.append(text)
+            self._emit(text)
+        return ''.join(chunks)
+
+    async def _run_recommendations_async(self, footprint_data: Dict, results: Dict) -> str:
+        return await self.recommendation_agent.prioritize_recommendations_async(footprint_data)
+
+    async def _run_challenge_async(self, footprint_data: Dict, results: Dict) -> Dict[str, str]:
+        return await self.challenge_agent.suggest_challenge_async(
+            footprint_data,
+            results['recommendations']
+        )
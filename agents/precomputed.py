@@ -0,0 +1,184 @@
+"""
+Precomputed Response Store
+Read-only, memory-mapped table of LLM responses indexed by profile code,
+written by the offline precompute job (scripts/precompute.py).
+
+File layout (little-endian):
+    header:  magic "CSPC", version u32, profile_count u32, kind_count u32,
+             fingerprint (32 bytes)
+    kinds:   kind_count names, each u16 length + UTF-8 bytes
+    index:   profile_count x kind_count entries of (offset u32, length u32)
+             into the blob; length 0 means "not precomputed"
+    blob:    concatenated UTF-8 response texts
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from config.prompts import IMPACT_ANALYSIS_PROMPT, RECOMMENDATION_PROMPT
+from agents.estimator import CarbonEstimator
+from agents.llm_client import DEFAULT_MODEL_NAME
+
+
+MAGIC = b'CSPC'
+VERSION = 1
+KINDS = ('analysis', 'recommendations')
+
+_HEADER = struct.Struct('<4sIII32s')
+_ENTRY = struct.Struct('<II')
+
+
+def store_fingerprint(model_name: str = DEFAULT_MODEL_NAME) -> bytes:
+    """
+    Fingerprint of everything a precomputed response depends on.
+
+    A store whose fingerprint does not match (changed prompts, weights or
+    model) is ignored rather than serving stale text.
+    """
+    digest = hashlib.sha256()
+    for part in (
+        model_name,
+        IMPACT_ANALYSIS_PROMPT,
+        RECOMMENDATION_PROMPT,
+        json.dumps(CarbonEstimator.WEIGHTS, sort_keys=True),
+    ):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.digest()
+
+
+def write_store(
+    path: str,
+    entries: Dict[Tuple[str, int], str],
+    kinds: Tuple[str, ...] = KINDS,
+    fingerprint: Optional[bytes] = None
+):
+    """
+    Write a store file atomically.
+
+    Args:
+        path: Destination file
+        entries: Mapping of (kind, profile_code) -> response text
+        kinds: Kind names, in index column order
+        fingerprint: Store fingerprint (defaults to store_fingerprint())
+    """
+    fingerprint = fingerprint or store_fingerprint()
+    count = CarbonEstimator.PROFILE_COUNT
+
+    index = bytearray(_ENTRY.size * count * len(kinds))
+    blob: List[bytes] = []
+    offset = 0
+    for (kind, code), text in entries.items():
+        data = text.encode('utf-8')
+        slot = code * len(kinds) + kinds.index(kind)
+        _ENTRY.pack_into(index, slot * _ENTRY.size, offset, len(data))
+        blob.append(data)
+        offset += len(data)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, count, len(kinds), fingerprint))
+        for kind in kinds:
+            name = kind.encode('utf-8')
+            f.write(struct.pack('<H', len(name)) + name)
+        f.write(index)
+        for data in blob:
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class PrecomputedStore:
+    """
+    Memory-mapped lookup of precomputed responses.
+
+    Lookups are two struct unpacks and a slice of the mapping, so the
+    operating system page cache is shared by every worker process.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open and validate a store file.
+
+        Raises:
+            ValueError: If the file is not a store, or it was built for
+                different prompts, weights or model
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, kind_count, fingerprint = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a precomputed store: {path}")
+        if count != CarbonEstimator.PROFILE_COUNT or fingerprint != store_fingerprint():
+            raise ValueError(f"Precomputed store is stale: {path}")
+
+        position = _HEADER.size
+        self.kinds = []
+        for _ in range(kind_count):
+            (length,) = struct.unpack_from('<H', self._mmap, position)
+            position += 2
+            self.kinds.append(self._mmap[position:position + length].decode('utf-8'))
+            position += length
+
+        self._kind_index = {kind: i for i, kind in enumerate(self.kinds)}
+        self._index_start = position
+        self._blob_start = position + _ENTRY.size * count * kind_count
+
+    def get(self, kind: str, code: Optional[int]) -> Optional[str]:
+        """Return the precomputed text for a profile code, or None."""
+        column = self._kind_index.get(kind)
+        if column is None or code is None:
+            return None
+
+        slot = code * len(self.kinds) + column
+        offset, length = _ENTRY.unpack_from(self._mmap, self._index_start + slot * _ENTRY.size)
+        if not length:
+            return None
+        start = self._blob_start + offset
+        return self._mmap[start:start + length].decode('utf-8')
+
+    def lookup(self, kind: str, footprint_data: Dict) -> Optional[str]:
+        """Return the precomputed text for an estimator result, or None."""
+        code = CarbonEstimator.encode_profile(footprint_data.get('raw_inputs') or {})
+        return self.get(kind, code)
+
+    def close(self):
+        self._mmap.close()
+
+
+_store: Optional[PrecomputedStore] = None
+_store_loaded = False
+_store_lock = threading.Lock()
+
+
+def get_precomputed_store() -> Optional[PrecomputedStore]:
+    """
+    Return the process-wide store from PRECOMPUTE_STORE_PATH.
+
+    Returns None when the variable is unset, the file is missing, or the
+    store does not match the current prompts.
+    """
+    global _store, _store_loaded
+    if not _store_loaded:
+        with _store_lock:
+            if not _store_loaded:
+                path = os.getenv('PRECOMPUTE_STORE_PATH')
+                if path and os.path.exists(path):
+                    try:
+                        _store = PrecomputedStore(path)
+                    except (OSError, ValueError) as e:
+                        print(f"Warning: precomputed store not loaded: {e}")
+                _store_loaded = True
+    return _store
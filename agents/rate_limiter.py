@@ -0,0 +1,404 @@
+"""
+Adaptive Rate Limiter for Gemini Calls
+Token bucket plus an AIMD concurrency cap in front of every generate_content
+call. Requests wait in a FIFO queue until their deadline, and transient
+429/5xx errors are retried with jittered exponential backoff.
+
+Async callers (the ASGI app) share the same bucket and cap through
+acquire_async()/slot_async()/call_async(), which wait on the event loop
+instead of blocking a thread.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+import httpx
+
+
+T = TypeVar('T')
+
+DEFAULT_RATE = 10.0
+DEFAULT_BURST = 10
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_MIN_CONCURRENCY = 1
+DEFAULT_TIMEOUT_SECONDS = 30.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_SECONDS = 0.5
+
+# Async waiters poll the shared state at most this often
+ASYNC_POLL_SECONDS = 0.01
+
+# HTTP status codes and google.genai APIError.status values
+_TRANSIENT_CODES = frozenset((500, 502, 503, 504))
+_THROTTLE_STATUSES = frozenset(('RESOURCE_EXHAUSTED',))
+_TRANSIENT_STATUSES = frozenset(('UNAVAILABLE', 'INTERNAL', 'DEADLINE_EXCEEDED'))
+# Connection-level failures raised by the SDK's HTTP client
+_TRANSIENT_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError, TimeoutError)
+
+# release() outcome for a call abandoned part way (client disconnect,
+# cancellation): frees the slot without counting as a success or failure
+ABANDONED = 'abandoned'
+
+
+class LimiterTimeout(RuntimeError):
+    """Raised when a request's deadline passes while it is queued."""
+
+    code = 429
+
+    def __init__(self, waited: float):
+        super().__init__(f"429 rate limit: request queued {waited:.1f}s without a free slot")
+        self.waited = waited
+
+
+def classify_error(error: Exception) -> Optional[str]:
+    """
+    Classify an API error for retry purposes.
+
+    Only structured fields are matched (the HTTP status code and the SDK's
+    status name) and connection errors by type, never message text, so a
+    prompt or ID that happens to contain "500" is not retried.
+
+    Returns:
+        'throttled' for 429/quota errors, 'transient' for retryable 5xx
+        and connection errors, or None if the error should not be retried
+    """
+    code = getattr(error, 'code', None)
+    if code == 429:
+        return 'throttled'
+    if code in _TRANSIENT_CODES:
+        return 'transient'
+
+    status = getattr(error, 'status', None)
+    if isinstance(status, str):
+        if status.upper() in _THROTTLE_STATUSES:
+            return 'throttled'
+        if status.upper() in _TRANSIENT_STATUSES:
+            return 'transient'
+
+    if isinstance(error, _TRANSIENT_ERRORS):
+        return 'transient'
+    return None
+
+
+def is_throttled(error: BaseException) -> bool:
+    """True if error, or an error it was raised from or while handling, is classified as throttled."""
+    while error is not None:
+        if isinstance(error, Exception) and classify_error(error) == 'throttled':
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket (requests per second) combined with an adaptive cap on
+    concurrent requests.
+
+    The concurrency cap grows additively on success and shrinks
+    multiplicatively when the API throttles (AIMD), so workers back off
+    together instead of hammering a saturated quota.
+    """
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        burst: int = DEFAULT_BURST,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        min_concurrency: int = DEFAULT_MIN_CONCURRENCY,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff: float = DEFAULT_BACKOFF_SECONDS,
+        decrease_factor: float = 0.5
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            rate: Sustained requests per second
+            burst: Token bucket capacity
+            max_concurrency: Upper bound (and starting value) of the cap
+            min_concurrency: Lower bound of the cap
+            timeout: Default seconds a request may wait (queue + retries)
+            max_retries: Retries for throttled/transient errors
+            backoff: Base delay for exponential retry backoff
+            decrease_factor: Multiplier applied to the cap on throttling
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.decrease_factor = decrease_factor
+
+        self.concurrency_limit = float(max_concurrency)
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._in_flight = 0
+        self._waiters: deque = deque()
+        self._condition = threading.Condition()
+
+        # Metrics
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.acquired = 0
+        self.timeouts = 0
+        self.throttled = 0
+        self.abandoned = 0
+        self.retries = 0
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def acquire(self, deadline: Optional[float] = None) -> float:
+        """
+        Wait for a token and a concurrency slot.
+
+        Args:
+            deadline: time.monotonic() value after which to give up
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            LimiterTimeout: If the deadline passes first
+        """
+        start = time.monotonic()
+        deadline = deadline if deadline is not None else start + self.timeout
+        ticket = object()
+
+        with self._condition:
+            self._waiters.append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    taken, retry_in = self._try_take(ticket, now)
+                    if taken:
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise LimiterTimeout(now - start)
+                    self._condition.wait(min(retry_in, remaining) if retry_in else remaining)
+            finally:
+                self._waiters.remove(ticket)
+                self._condition.notify_all()
+            return self._record_wait(start)
+
+    async def acquire_async(self, deadline: Optional[float] = None) -> float:
+        """
+        acquire() for coroutines: waits on the event loop, polling the
+        shared state, so one thread can hold many queued requests.
+        """
+        start = time.monotonic()
+        deadline = deadline if deadline is not None else start + self.timeout
+        ticket = object()
+
+        with self._condition:
+            self._waiters.append(ticket)
+        try:
+            while True:
+                with self._condition:
+                    now = time.monotonic()
+                    taken, retry_in = self._try_take(ticket, now)
+                    if taken:
+                        return self._record_wait(start)
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise LimiterTimeout(now - start)
+                await asyncio.sleep(min(retry_in or ASYNC_POLL_SECONDS, ASYNC_POLL_SECONDS, remaining))
+        finally:
+            with self._condition:
+                self._waiters.remove(ticket)
+                self._condition.notify_all()
+
+    def _try_take(self, ticket: object, now: float):
+        """
+        Take a token and a slot for `ticket` if it may go now.
+
+        Must hold the condition. Returns (taken, seconds until a token is due).
+        """
+        # FIFO: only the head of the queue may take a slot
+        if self._waiters[0] is ticket and self._in_flight < int(self.concurrency_limit):
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self._in_flight += 1
+                return True, None
+            return False, (1 - self._tokens) / self.rate if self.rate > 0 else None
+        return False, None
+
+    def _record_wait(self, start: float) -> float:
+        """Update wait metrics (must hold the condition)."""
+        waited = time.monotonic() - start
+        self.acquired += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        return waited
+
+    def release(self, outcome: Optional[str] = None):
+        """
+        Return a concurrency slot and adapt the cap.
+
+        Args:
+            outcome: None for success, a classify_error() result, 'error',
+                or ABANDONED; only success and 'throttled' move the cap
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if outcome == 'throttled':
+                self.throttled += 1
+                self.concurrency_limit = max(
+                    float(self.min_concurrency),
+                    self.concurrency_limit * self.decrease_factor
+                )
+            elif outcome == ABANDONED:
+                self.abandoned += 1
+            elif outcome is None:
+                # Roughly +1 per window of concurrency_limit successes
+                self.concurrency_limit = min(
+                    float(self.max_concurrency),
+                    self.concurrency_limit + 1.0 / max(self.concurrency_limit, 1.0)
+                )
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, deadline: Optional[float] = None) -> Iterator[None]:
+        """Hold a slot for the duration of a block (e.g. a streamed response)."""
+        self.acquire(deadline)
+        outcome = None
+        try:
+            yield
+        except Exception as e:
+            outcome = classify_error(e) or 'error'
+            raise
+        except BaseException:
+            # GeneratorExit or cancellation: the stream was abandoned, not finished
+            outcome = ABANDONED
+            raise
+        finally:
+            self.release(outcome)
+
+    @asynccontextmanager
+    async def slot_async(self, deadline: Optional[float] = None) -> AsyncIterator[None]:
+        """slot() for coroutines (e.g. an async streamed response)."""
+        await self.acquire_async(deadline)
+        outcome = None
+        try:
+            yield
+        except Exception as e:
+            outcome = classify_error(e) or 'error'
+            raise
+        except BaseException:
+            # GeneratorExit or cancellation: the stream was abandoned, not finished
+            outcome = ABANDONED
+            raise
+        finally:
+            self.release(outcome)
+
+    def call(self, func: Callable[[], T], timeout: Optional[float] = None) -> T:
+        """
+        Run `func` under the limiter, retrying throttled and transient errors.
+
+        Retries use full-jitter exponential backoff and stop when the
+        deadline (now + timeout) would be exceeded.
+        """
+        deadline = time.monotonic() + (timeout if timeout is not None else self.timeout)
+        attempt = 0
+        while True:
+            self.acquire(deadline)
+            try:
+                result = func()
+            except BaseException as e:
+                kind = classify_error(e) if isinstance(e, Exception) else ABANDONED
+                self.release(kind or 'error')
+                if kind == ABANDONED:
+                    raise
+                if kind is None or attempt >= self.max_retries:
+                    raise
+                delay = random.uniform(0, self.backoff * (2 ** attempt))
+                if time.monotonic() + delay >= deadline:
+                    raise
+                attempt += 1
+                with self._condition:
+                    self.retries += 1
+                time.sleep(delay)
+                continue
+            self.release(None)
+            return result
+
+    async def call_async(self, func: Callable[[], Awaitable[T]], timeout: Optional[float] = None) -> T:
+        """call() for coroutines: `func` returns a fresh awaitable per attempt."""
+        deadline = time.monotonic() + (timeout if timeout is not None else self.timeout)
+        attempt = 0
+        while True:
+            await self.acquire_async(deadline)
+            try:
+                result = await func()
+            except asyncio.CancelledError:
+                # The caller went away (e.g. client disconnect); free the slot
+                self.release(ABANDONED)
+                raise
+            except Exception as e:
+                kind = classify_error(e)
+                self.release(kind or 'error')
+                if kind is None or attempt >= self.max_retries:
+                    raise
+                delay = random.uniform(0, self.backoff * (2 ** attempt))
+                if time.monotonic() + delay >= deadline:
+                    raise
+                attempt += 1
+                with self._condition:
+                    self.retries += 1
+                await asyncio.sleep(delay)
+                continue
+            self.release(None)
+            return result
+
+    def stats(self) -> Dict[str, float]:
+        """Return queue depth, wait time and adaptation metrics."""
+        with self._condition:
+            return {
+                'queue_depth': len(self._waiters),
+                'in_flight': self._in_flight,
+                'concurrency_limit': self.concurrency_limit,
+                'acquired': self.acquired,
+                'wait_seconds_total': self.wait_seconds_total,
+                'wait_seconds_max': self.wait_seconds_max,
+                'timeouts': self.timeouts,
+                'throttled': self.throttled,
+                'abandoned': self.abandoned,
+                'retries': self.retries,
+            }
+
+
+_limiter: Optional[AdaptiveRateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> AdaptiveRateLimiter:
+    """Return the process-wide limiter configured from the environment."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = AdaptiveRateLimiter(
+                    rate=float(os.getenv('GEMINI_RATE_PER_SECOND', DEFAULT_RATE)),
+                    burst=int(os.getenv('GEMINI_BURST', DEFAULT_BURST)),
+                    max_concurrency=int(os.getenv('GEMINI_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY)),
+                    min_concurrency=int(os.getenv('GEMINI_MIN_CONCURRENCY', DEFAULT_MIN_CONCURRENCY)),
+                    timeout=float(os.getenv('GEMINI_QUEUE_TIMEOUT_SECONDS', DEFAULT_TIMEOUT_SECONDS)),
+                    max_retries=int(os.getenv('GEMINI_MAX_RETRIES', DEFAULT_MAX_RETRIES)),
+                    backoff=float(os.getenv('GEMINI_RETRY_BACKOFF_SECONDS', DEFAULT_BACKOFF_SECONDS))
+                )
+    return _limiter
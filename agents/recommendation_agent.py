@@ -4,8 +4,18 @@ Prioritizes actions by impact vs feasibility using LLM reasoning.
 """
 
 import os
-import google.genai as genai
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from config.prompts import RECOMMENDATION_PROMPT
+from agents.estimator import footprint_level
+from agents.llm_client import get_client, generate_text, generate_text_async, DEFAULT_MODEL_NAME
+from agents.response_cache import get_response_cache
+from agents.precomputed import get_precomputed_store
+from utils.templates import PromptTemplate
+from utils.tracing import traced
+
+
+_RECOMMENDATION_TEMPLATE = PromptTemplate(RECOMMENDATION_PROMPT)
 
 
 class RecommendationAgent:
@@ -26,27 +36,76 @@ class RecommendationAgent:
                 "Gemini API key not found. Set GEMINI_API_KEY environment variable."
             )
         
-        # Using new google.genai Client API
-        self.client = genai.Client(api_key=self.api_key)
-        self.model_name = 'models/gemini-2.5-flash'
+        # Shared, process-wide client (reuses pooled connections)
+        self.client = get_client(self.api_key)
+        self.model_name = DEFAULT_MODEL_NAME
+        self.cache = get_response_cache()
+        self.precomputed = get_precomputed_store()
     
+    @traced('recommendations.prioritize')
     def prioritize_recommendations(
         self, 
         footprint_data: Dict,
-        analysis_text: str
+        analysis_text: Optional[str] = None
     ) -> str:
         """
         Generate prioritized recommendations based on footprint and analysis.
         
         Args:
             footprint_data: Output from CarbonEstimator.estimate_footprint()
-            analysis_text: Output from ImpactAnalysisAgent.analyze()
+            analysis_text: Output from ImpactAnalysisAgent.analyze() (optional;
+                the prompt is built from footprint data only, so this stage
+                can run concurrently with the analysis)
             
         Returns:
             Formatted recommendations with prioritization
         """
-        from config.prompts import RECOMMENDATION_PROMPT
+        if self.precomputed is not None:
+            precomputed = self.precomputed.lookup('recommendations', footprint_data)
+            if precomputed is not None:
+                return precomputed
+        
+        prompt = self._build_prompt(footprint_data)
+        
+        try:
+            return generate_text(
+                self.client,
+                self.model_name,
+                prompt,
+                cache=self.cache,
+                agent='recommendations'
+            )
+        except Exception as e:
+                raise RuntimeError(str(e))
+    
+    @traced('recommendations.prioritize')
+    async def prioritize_recommendations_async(
+        self,
+        footprint_data: Dict,
+        analysis_text: Optional[str] = None
+    ) -> str:
+        """prioritize_recommendations() for the ASGI app."""
+        if self.precomputed is not None:
+            precomputed = self.precomputed.lookup('recommendations', footprint_data)
+            if precomputed is not None:
+                return precomputed
+        
+        prompt = self._build_prompt(footprint_data)
         
+        try:
+            return await generate_text_async(
+                self.client,
+                self.model_name,
+                prompt,
+                cache=self.cache,
+                agent='recommendations'
+            )
+        except Exception as e:
+            raise RuntimeError(str(e))
+    
+    @traced('recommendations.build_prompt')
+    def _build_prompt(self, footprint_data: Dict) -> str:
+        """Build the recommendation prompt from footprint data."""
         # Extract top drivers
         top_drivers = [
             item['category'] 
@@ -57,25 +116,14 @@ class RecommendationAgent:
         lifestyle_summary = self._create_lifestyle_summary(footprint_data)
         
         # Get footprint level
-        from agents.estimator import CarbonEstimator
-        estimator = CarbonEstimator()
-        level, _ = estimator.get_footprint_level(footprint_data['total_score'])
+        level, _ = footprint_level(footprint_data['total_score'])
         
         # Build prompt
-        prompt = RECOMMENDATION_PROMPT.format(
+        return _RECOMMENDATION_TEMPLATE.render(
             top_drivers=", ".join(top_drivers),
             lifestyle_summary=lifestyle_summary,
             level=level
         )
-        
-        try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt
-            )
-            return response.text
-        except Exception as e:
-                raise RuntimeError(str(e))
     
     def _create_lifestyle_summary(self, footprint_data: Dict) -> str:
         """Create a concise lifestyle summary from footprint data."""
@@ -0,0 +1,252 @@
+"""
+LLM Response Cache
+Deterministic prompt -> response cache shared by the agents. Prompts for
+analysis and recommendations depend only on the estimator output, so repeat
+profiles are served without another Gemini call.
+"""
+
+import abc
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from agents.llm_client import prompt_key
+from utils.lru_cache import TTLCache
+
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_DISK_MAX_ENTRIES = 100000
+# The disk tier deletes expired rows and trims to its cap every this many writes
+DISK_PRUNE_EVERY = 100
+
+
+class CacheTier(abc.ABC):
+    """Interface for a cache storage tier."""
+
+    name = 'tier'
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value, or None on a miss."""
+
+    @abc.abstractmethod
+    def set(self, key: str, value: str):
+        """Store a value."""
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
+
+class MemoryTier(CacheTier):
+    """In-process LRU tier with TTL and size-based eviction."""
+
+    name = 'memory'
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl: Optional[float] = DEFAULT_TTL_SECONDS
+    ):
+        self.cache = TTLCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+
+    def get(self, key: str) -> Optional[str]:
+        return self.cache.get(key)
+
+    def set(self, key: str, value: str):
+        self.cache.set(key, value)
+
+    def stats(self) -> Dict[str, int]:
+        return self.cache.stats()
+
+
+class DiskTier(CacheTier):
+    """
+    SQLite-backed tier that survives restarts and is shared by workers.
+
+    Every DISK_PRUNE_EVERY writes (and at start-up) expired rows are deleted
+    and the oldest writes beyond max_entries are dropped, so the file stays
+    bounded.
+    """
+
+    name = 'disk'
+
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[float] = DEFAULT_TTL_SECONDS,
+        max_entries: Optional[int] = DEFAULT_DISK_MAX_ENTRIES
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self.pruned = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires_at)")
+        self.prune()
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections are not thread-safe
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._connect().execute(
+            "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            return None
+        return value
+
+    def set(self, key: str, value: str):
+        expires_at = time.time() + self.ttl if self.ttl is not None else None
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at)
+            )
+        with self._writes_lock:
+            self._writes += 1
+            due = self._writes % DISK_PRUNE_EVERY == 0
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """Delete expired rows, then the oldest writes over max_entries; returns how many."""
+        with self._connect() as conn:
+            deleted = conn.execute(
+                "DELETE FROM responses WHERE expires_at < ?", (time.time(),)
+            ).rowcount
+            if self.max_entries is not None:
+                # INSERT OR REPLACE gives a rewritten key a new rowid, so rowid order is write order
+                deleted += conn.execute(
+                    "DELETE FROM responses WHERE rowid IN ("
+                    "SELECT rowid FROM responses ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                ).rowcount
+        self.pruned += deleted
+        return deleted
+
+    def stats(self) -> Dict[str, int]:
+        return {'pruned': self.pruned}
+
+
+class ResponseCache:
+    """
+    Multi-tier response cache keyed on a hash of model name and prompt.
+
+    Tiers are checked in order; a hit in a lower tier is copied into the
+    tiers above it.
+    """
+
+    def __init__(self, tiers: List[CacheTier]):
+        self.tiers = tiers
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str) -> str:
+        """Hash a model name and rendered prompt into a cache key."""
+        return prompt_key(model_name, prompt)
+
+    def get(self, model_name: str, prompt: str) -> Optional[str]:
+        """Return the cached response for a prompt, or None."""
+        key = self.make_key(model_name, prompt)
+        for index, tier in enumerate(self.tiers):
+            try:
+                value = tier.get(key)
+            except Exception as e:
+                print(f"Warning: {tier.name} cache read failed: {e}")
+                continue
+            if value is not None:
+                for upper in self.tiers[:index]:
+                    upper.set(key, value)
+                with self._lock:
+                    self.hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, model_name: str, prompt: str, response: str):
+        """Store a response in every tier."""
+        key = self.make_key(model_name, prompt)
+        for tier in self.tiers:
+            try:
+                tier.set(key, response)
+            except Exception as e:
+                print(f"Warning: {tier.name} cache write failed: {e}")
+
+    def stats(self) -> Dict[str, object]:
+        """Return overall hit/miss counters and per-tier statistics."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'tiers': {tier.name: tier.stats() for tier in self.tiers},
+        }
+
+
+_cache: Optional[ResponseCache] = None
+_cache_built = False
+_cache_lock = threading.Lock()
+
+
+def build_response_cache() -> Optional[ResponseCache]:
+    """
+    Build a response cache from environment settings.
+
+    Returns None when LLM_CACHE_ENABLED is false.
+    """
+    if os.getenv('LLM_CACHE_ENABLED', 'true').lower() in ('0', 'false', 'no'):
+        return None
+
+    ttl = float(os.getenv('LLM_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+    tiers: List[CacheTier] = [MemoryTier(
+        max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+        max_bytes=int(os.getenv('LLM_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)),
+        ttl=ttl
+    )]
+
+    disk_path = os.getenv('LLM_CACHE_PATH')
+    if disk_path:
+        tiers.append(DiskTier(
+            disk_path,
+            ttl=ttl,
+            max_entries=int(os.getenv('LLM_CACHE_DISK_MAX_ENTRIES', DEFAULT_DISK_MAX_ENTRIES))
+        ))
+
+    return ResponseCache(tiers)
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the process-wide response cache (None if disabled)."""
+    global _cache, _cache_built
+    if not _cache_built:
+        with _cache_lock:
+            if not _cache_built:
+                _cache = build_response_cache()
+                _cache_built = True
+    return _cache
@@ -0,0 +1,151 @@
+"""
+Single-Flight Request Coalescing
+Concurrent callers asking for the same key share one upstream call: the first
+caller runs it, the rest wait and receive the same result or exception.
+AsyncSingleFlight does the same for coroutines on one event loop.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+
+T = TypeVar('T')
+
+
+class _Call:
+    """State of one in-flight call."""
+
+    __slots__ = ('event', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls by key across threads.
+
+    Only calls that overlap in time are shared; once a call finishes, the
+    next caller with the same key starts a fresh one (caching is left to
+    the response cache).
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, func: Callable[[], T]) -> T:
+        """
+        Run `func` once for all concurrent callers with the same key.
+
+        Returns:
+            func's result (shared by every waiter)
+
+        Raises:
+            Whatever func raised, re-raised in every waiter
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.calls += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    def stats(self) -> Dict[str, int]:
+        """Return upstream calls made and calls saved by coalescing."""
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'shared': self.shared,
+                'in_flight': len(self._calls),
+            }
+
+
+class AsyncSingleFlight:
+    """
+    Deduplicates concurrent coroutine calls by key.
+
+    Waiters share the leader's task through asyncio.shield, so a cancelled
+    waiter (e.g. a disconnected client) does not cancel the upstream call
+    for everyone else.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        Await `func()` once for all concurrent callers with the same key.
+
+        Returns:
+            Tuple of (result, leader); leader is False for callers that
+            shared another caller's call
+        """
+        task = self._tasks.get(key)
+        if task is not None:
+            self.shared += 1
+            return await asyncio.shield(task), False
+
+        self.calls += 1
+        task = asyncio.ensure_future(func())
+        self._tasks[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task), True
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        self._tasks.pop(key, None)
+        if not task.cancelled():
+            # Mark the error retrieved even if every caller went away
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Return upstream calls made and calls saved by coalescing."""
+        return {
+            'calls': self.calls,
+            'shared': self.shared,
+            'in_flight': len(self._tasks),
+        }
+
+
+_single_flight = SingleFlight()
+_async_single_flight = AsyncSingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the process-wide single-flight group for LLM prompts."""
+    return _single_flight
+
+
+def get_async_single_flight() -> AsyncSingleFlight:
+    """Return the single-flight group for async LLM prompts."""
+    return _async_single_flight
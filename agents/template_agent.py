@@ -0,0 +1,260 @@
+"""
+Template Agent - Deterministic Fast Path
+Builds the analysis, recommendations and One-Change Challenge from estimator
+output and the curated action catalog, with no LLM call. Served when Gemini
+misses the response deadline (LLM_DEADLINE_MS) or is unavailable.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from config.actions import ACTION_CATALOG, CHALLENGE_CATALOG, DEFAULT_CHALLENGE, DRIVER_NOTES
+from agents.estimator import CarbonEstimator, footprint_level
+from utils.metrics import REGISTRY
+from utils.tracing import bind_context
+
+
+HORIZONS = (
+    ('immediate', 'Immediate Low-Effort Change'),
+    ('medium', 'Medium-Term Improvement'),
+    ('long', 'Long-Term Lifestyle Shift'),
+)
+
+DEFAULT_DEADLINE_WORKERS = 8
+
+_LABEL_TO_CATEGORY = {label: category for category, label in CarbonEstimator.CATEGORY_LABELS.items()}
+
+LLM_FALLBACKS = REGISTRY.counter(
+    'llm_fallbacks_total',
+    'Responses served by the template agent instead of Gemini, by reason (deadline, error)',
+    ('agent', 'reason')
+)
+
+
+class TemplateAgent:
+    """
+    Rule-based stand-in for the analysis, recommendation and challenge agents.
+    Same inputs and output formats, built in microseconds.
+    """
+
+    def analyze(self, footprint_data: Dict) -> str:
+        """
+        Summarize the footprint level and explain the top three drivers.
+
+        Args:
+            footprint_data: Output from CarbonEstimator.estimate_footprint()
+
+        Returns:
+            Markdown analysis in the same shape as ImpactAnalysisAgent.analyze()
+        """
+        level, level_desc = footprint_level(footprint_data['total_score'])
+        lines = [
+            f"**Your footprint level: {level}** (score {footprint_data['total_score']:.0f}). {level_desc}",
+            "",
+            "**Your top contributing factors:**",
+        ]
+        for index, (category, value, score, percentage) in enumerate(self._drivers(footprint_data)[:3], 1):
+            label = CarbonEstimator.CATEGORY_LABELS.get(category, category)
+            lines.append("")
+            lines.append(f"**{index}. {label} ({value})**")
+            lines.append(f"- Makes up {percentage:.0f}% of your footprint (score {score:.0f}).")
+            if category in DRIVER_NOTES:
+                lines.append(f"- {DRIVER_NOTES[category]}")
+            if index == 1:
+                lines.append("- This is your biggest opportunity: small changes here go a long way.")
+        return "\n".join(lines)
+
+    def prioritize_recommendations(self, footprint_data: Dict, analysis_text: Optional[str] = None) -> str:
+        """
+        Pick one catalog action per horizon, favouring the top drivers and
+        a different category for each horizon where possible.
+
+        Returns:
+            Markdown in the same three sections as RecommendationAgent, so
+            ChallengeAgent can extract the immediate action from it
+        """
+        candidates = self._candidate_categories(footprint_data)
+        inputs = footprint_data.get('raw_inputs', {})
+        used = []
+        lines = []
+
+        for index, (horizon, heading) in enumerate(HORIZONS, 1):
+            fresh = [category for category in candidates if category not in used]
+            action = (
+                self._pick_action(fresh, inputs, horizon)
+                or self._pick_action(candidates, inputs, horizon)
+            )
+            if action is None:
+                continue
+            used.append(action['category'])
+            lines.append(f"**{index}. {heading}**")
+            lines.append(f"- **{action['title']}**: {action['detail']}")
+            lines.append(f"- Expected impact: {action['impact']}")
+            lines.append("")
+
+        if not lines:
+            return "**1. Immediate Low-Effort Change**\n- Keep up your low-carbon habits and share them with others."
+        return "\n".join(lines).rstrip()
+
+    def suggest_challenge(self, footprint_data: Dict, recommendations_text: Optional[str] = None) -> Dict[str, str]:
+        """
+        Return the catalog challenge for the top driver that has one.
+
+        Returns:
+            Dictionary with title, description, impact and success_criteria
+        """
+        inputs = footprint_data.get('raw_inputs', {})
+        for category in self._candidate_categories(footprint_data):
+            challenge = CHALLENGE_CATALOG.get(category)
+            if challenge is not None and inputs.get(category) in challenge['options']:
+                return {key: value for key, value in challenge.items() if key != 'options'}
+        return dict(DEFAULT_CHALLENGE)
+
+    def _drivers(self, footprint_data: Dict) -> List[Tuple[str, str, float, float]]:
+        """Positive-scoring categories as (category, value, score, percentage), largest first."""
+        drivers = []
+        for item in footprint_data.get('breakdown', []):
+            category = _LABEL_TO_CATEGORY.get(item['category'], item['category'])
+            drivers.append((category, item['value'], item['score'], item['percentage']))
+        return drivers
+
+    def _candidate_categories(self, footprint_data: Dict) -> List[str]:
+        # Recycling never scores positive, but "No" is an easy first step
+        categories = [driver[0] for driver in self._drivers(footprint_data)]
+        if footprint_data.get('raw_inputs', {}).get('recycling') == 'No':
+            categories.append('recycling')
+        return categories
+
+    def _pick_action(self, categories: List[str], inputs: Dict, horizon: str) -> Optional[Dict]:
+        for category in categories:
+            for action in ACTION_CATALOG.get(category, ()):
+                if action['horizon'] == horizon and inputs.get(category) in action['options']:
+                    return dict(action, category=category)
+        return None
+
+
+def llm_deadline() -> Optional[float]:
+    """LLM_DEADLINE_MS in seconds, or None when no deadline is set."""
+    deadline_ms = float(os.getenv('LLM_DEADLINE_MS', 0))
+    return deadline_ms / 1000 if deadline_ms > 0 else None
+
+
+_deadline_executor: Optional[ThreadPoolExecutor] = None
+_deadline_executor_lock = threading.Lock()
+
+# Async calls left running past their deadline (the loop only holds weak references)
+_detached_calls: Set[asyncio.Task] = set()
+
+
+def get_deadline_executor() -> ThreadPoolExecutor:
+    """
+    Return the thread pool for LLM calls run under a deadline.
+
+    Kept apart from the assessment pool, so calls still running past their
+    deadline cannot starve /api/assessment stages of threads (or the other
+    way round).
+    """
+    global _deadline_executor
+    if _deadline_executor is None:
+        with _deadline_executor_lock:
+            if _deadline_executor is None:
+                _deadline_executor = ThreadPoolExecutor(
+                    max_workers=int(os.getenv('LLM_DEADLINE_WORKERS', DEFAULT_DEADLINE_WORKERS)),
+                    thread_name_prefix='llm-deadline'
+                )
+    return _deadline_executor
+
+
+def fallback_on_error() -> bool:
+    """Whether LLM failures (429s, outages, missing key) are answered from templates."""
+    return os.getenv('LLM_FALLBACK_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
+
+def run_with_deadline(
+    call: Callable[[], Any],
+    fallback: Callable[[], Any],
+    agent: str,
+    deadline: Optional[float] = None
+) -> Tuple[Any, Optional[str]]:
+    """
+    Run an LLM call, answering from the template agent if it misses the deadline.
+
+    With a deadline the call runs on its own thread pool. A call that has
+    started keeps going after the deadline, so it still fills the response
+    cache (and a follow-up call for the same prompt joins it via
+    single-flight); one still waiting for a thread is cancelled.
+
+    Args:
+        call: Makes the LLM call
+        fallback: Builds the template result
+        agent: Label for metrics (e.g. 'analysis')
+        deadline: Seconds to wait (defaults to llm_deadline())
+
+    Returns:
+        Tuple of (result, reason): reason is None for the LLM's answer,
+        otherwise 'deadline' or 'error'
+    """
+    deadline = deadline if deadline is not None else llm_deadline()
+    try:
+        if deadline is None:
+            return call(), None
+        future = get_deadline_executor().submit(bind_context(call))
+        try:
+            return future.result(timeout=deadline), None
+        except FutureTimeoutError:
+            if future.done():
+                # The call itself raised a timeout
+                raise
+            # Only succeeds if no thread has picked the call up yet
+            future.cancel()
+            LLM_FALLBACKS.labels(agent, 'deadline').inc()
+            return fallback(), 'deadline'
+    except Exception as e:
+        if not fallback_on_error():
+            raise
+        print(f"Warning: {agent} LLM call failed, serving template response: {e}")
+        LLM_FALLBACKS.labels(agent, 'error').inc()
+        return fallback(), 'error'
+
+
+def _finish_detached(task: asyncio.Task):
+    _detached_calls.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Warning: LLM call finished after its deadline with an error: {task.exception()}")
+
+
+async def run_with_deadline_async(
+    call: Callable[[], Awaitable[Any]],
+    fallback: Callable[[], Any],
+    agent: str,
+    deadline: Optional[float] = None
+) -> Tuple[Any, Optional[str]]:
+    """
+    run_with_deadline() for coroutines.
+
+    As in the sync version, a call that misses the deadline keeps running
+    as its own task, so it still fills the response cache.
+    """
+    deadline = deadline if deadline is not None else llm_deadline()
+    try:
+        if deadline is None:
+            return await call(), None
+        task = asyncio.ensure_future(call())
+        # Unlike wait_for, wait() neither cancels the call nor raises at the deadline
+        done, _ = await asyncio.wait({task}, timeout=deadline)
+        if not done:
+            _detached_calls.add(task)
+            task.add_done_callback(_finish_detached)
+            LLM_FALLBACKS.labels(agent, 'deadline').inc()
+            return fallback(), 'deadline'
+        # A timeout raised by the call itself is an error, not a missed deadline
+        return task.result(), None
+    except Exception as e:
+        if not fallback_on_error():
+            raise
+        print(f"Warning: {agent} LLM call failed, serving template response: {e}")
+        LLM_FALLBACKS.labels(agent, 'error').inc()
+        return fallback(), 'error'
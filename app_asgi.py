@@ -0,0 +1,936 @@
+"""
+ClimateSense - ASGI Entry Point
+Async (Quart) serving mode for event-loop servers such as Hypercorn.
+
+LLM calls await the Gemini SDK's async client and database reads await the
+async Supabase client, so one worker process can hold hundreds of in-flight
+requests instead of one per thread. Routes, payloads and session cookies
+match app_ui (the WSGI app, which stays the default); the write-behind
+queue, conversation store and metrics registry are shared with it.
+
+Run with:
+    hypercorn app_asgi:app --bind 0.0.0.0:5000
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import datetime
+from itertools import chain
+
+from quart import Quart, render_template, request, jsonify, session, Response
+from quart.utils import run_sync, run_sync_iterable
+
+import app_ui
+from app_ui import (
+    FALLBACK_UPGRADE,
+    JOB_KEEPALIVE_SECONDS,
+    MAX_JOB_WAIT_SECONDS,
+    ROUTE_LATENCY,
+    SUPABASE_TIMEOUT_SECONDS,
+    ai_error_payload,
+    conversation_context,
+    conversation_store,
+    degraded_cache,
+    degraded_read,
+    history_cache,
+    job_accepted,
+    job_queue,
+    job_result_event,
+    leaderboard_service,
+    population_stats,
+    record_accepted,
+    record_chat,
+    register_user_offline,
+    report_write_error,
+    request_inputs,
+    save_challenge,
+    score_batch,
+    supabase,
+    supabase_key,
+    supabase_url,
+    tracer,
+    write_queue
+)
+from agents import (
+    CarbonEstimator,
+    ImpactAnalysisAgent,
+    RecommendationAgent,
+    ClimateChatAgent,
+    ChallengeAgent,
+    AssessmentPipeline,
+    TemplateAgent
+)
+from agents.pipeline import ANALYSIS_TOKEN
+from agents.template_agent import run_with_deadline_async
+from utils.batch_io import FORMAT_NDJSON, MIMETYPES, AsyncChunkReader, detect_format
+from utils.history_cache import CHALLENGE_LIMIT, FOOTPRINT_LIMIT, history_payload
+from utils.history_export import HISTORY_COLUMNS, decode_cursor, format_pages, iter_pages, page_limit, page_query, split_page
+from utils.job_queue import FINISHED, describe
+from utils.lazy import AsyncLazyClient
+from utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY
+from utils.sse import SSE_HEADERS, SSE_KEEPALIVE, SSE_MIMETYPE, format_sse, sse_error
+from utils.supabase_metrics import InstrumentedAsyncSupabase, is_outage
+from utils.tracing import current_span
+
+
+app = Quart(__name__)
+# Same key as the WSGI app, so sessions survive moving traffic between them
+app.secret_key = app_ui.app.secret_key
+
+
+async def create_async_supabase_client():
+    """Import supabase and build the async client (deferred until first query)."""
+    from supabase import AsyncClientOptions, create_async_client
+    options = AsyncClientOptions(postgrest_client_timeout=SUPABASE_TIMEOUT_SECONDS)
+    return InstrumentedAsyncSupabase(await create_async_client(supabase_url, supabase_key, options))
+
+
+async_supabase = (
+    AsyncLazyClient(create_async_supabase_client, name='async_supabase') if supabase else None
+)
+
+
+async def database():
+    """Return the async Supabase client, or None without credentials."""
+    if async_supabase is None:
+        return None
+    return await async_supabase.resolve()
+
+
+class RequestMetricsMiddleware:
+    """
+    Times each request until its last body chunk is sent (so streamed
+    responses are measured in full) and wraps it in a trace. The route
+    template is filled in by the before_request hook.
+    """
+
+    def __init__(self, asgi_app):
+        self.asgi_app = asgi_app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.asgi_app(scope, receive, send)
+
+        start = time.perf_counter()
+        method = scope['method']
+        headers = {key.decode('latin1').lower(): value.decode('latin1') for key, value in scope['headers']}
+        root = tracer.start_trace(
+            f"{method} {scope['path']}",
+            traceparent=headers.get('traceparent'),
+            remote_addr=(scope.get('client') or (None,))[0],
+            **{'http.method': method}
+        )
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if root is not None:
+                    root.set_attribute('http.status_code', status)
+                    message = dict(message, headers=list(message.get('headers', [])) + [
+                        (b'traceparent', tracer.traceparent(root).encode('latin1'))
+                    ])
+            await send(message)
+
+        try:
+            await self.asgi_app(scope, receive, send_with_status)
+        finally:
+            route = scope.get('route', 'unmatched')
+            ROUTE_LATENCY.labels(method, route, str(status)).observe(time.perf_counter() - start)
+            tracer.end_trace(root)
+
+
+app.asgi_app = RequestMetricsMiddleware(app.asgi_app)
+
+
+@app.before_request
+async def record_route():
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    request.scope['route'] = route
+    root = current_span()
+    root.set_attribute('http.route', route)
+    if hasattr(root, 'name'):
+        root.name = f"{request.method} {route}"
+
+
+@app.after_request
+async def add_cors_headers(response):
+    """Allow cross-origin requests, as flask_cors does for the WSGI app."""
+    response.headers.setdefault('Access-Control-Allow-Origin', '*')
+    if request.method == 'OPTIONS':
+        requested = request.headers.get('Access-Control-Request-Headers')
+        if requested:
+            response.headers['Access-Control-Allow-Headers'] = requested
+        if 'Allow' in response.headers:
+            response.headers['Access-Control-Allow-Methods'] = response.headers['Allow']
+    return response
+
+
+def handle_ai_exception(e):
+    payload, status = ai_error_payload(e)
+    return jsonify(payload), status
+
+
+def sse_response(events):
+    """Stream an async iterator of formatted SSE events."""
+    async def encode():
+        async for event in events:
+            yield event.encode('utf-8')
+    return Response(encode(), mimetype=SSE_MIMETYPE, headers=SSE_HEADERS)
+
+
+# How often job status and events poll the job store
+JOB_POLL_SECONDS = 0.25
+
+
+def wants_job():
+    """True when the client asked for a job ID (`?async=1` or `Prefer: respond-async`)."""
+    return job_queue.enabled and (
+        request.args.get('async') == '1'
+        or 'respond-async' in request.headers.get('Prefer', '')
+    )
+
+
+def job_priority():
+    """`?priority=bulk` queues behind interactive users, as in app_ui."""
+    return 'bulk' if request.args.get('priority') == 'bulk' else None
+
+
+def submit_job(kind, payload, priority=None):
+    """Queue a job for the current user, linked to the request's trace."""
+    root = current_span()
+    return job_queue.submit(
+        kind,
+        payload,
+        session['user_id'],
+        priority=priority,
+        traceparent=tracer.traceparent(root) if hasattr(root, 'trace') else None
+    )
+
+
+def enqueue_job(kind, payload):
+    body, headers = job_accepted(submit_job(kind, payload, job_priority()))
+    return jsonify(body), 202, headers
+
+
+def fallback_fields(reason, kind, payload):
+    """Response fields marking a template answer, as in app_ui."""
+    if reason is None:
+        return {}
+    fields = {'source': 'template', 'fallback_reason': reason}
+    if reason == 'deadline' and FALLBACK_UPGRADE and job_queue.enabled:
+        fields['upgrade'] = job_accepted(submit_job(kind, payload, 'bulk'))[0]
+    return fields
+
+
+async def wait_for_job(job_id, timeout, user_id):
+    """job_queue.wait() without blocking the event loop: polls the store."""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = job_queue.get(job_id, user_id)
+        if job is None or job['status'] in FINISHED or time.monotonic() >= deadline:
+            return job
+        await asyncio.sleep(JOB_POLL_SECONDS)
+
+
+@app.route('/metrics')
+async def metrics():
+    """Prometheus metrics"""
+    return Response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+@app.route('/')
+async def index():
+    """Home page - username input"""
+    return await render_template('index.html')
+
+
+@app.route('/dashboard')
+async def dashboard():
+    """Main dashboard"""
+    username = session.get('username', 'User')
+    return await render_template('dashboard.html', username=username)
+
+
+@app.route('/api/register', methods=['POST'])
+async def register_user():
+    """Register a new user"""
+    data = await request.get_json()
+    username = data.get('username', '').strip()
+
+    if not username:
+        return jsonify({'error': 'Username is required'}), 400
+
+    degraded = False
+    try:
+        db = await database()
+        if db:
+            try:
+                user_id = await find_or_create_user(db, username)
+            except Exception as e:
+                if not is_outage(e):
+                    raise
+                user_id = register_user_offline(username)
+                if user_id is None:
+                    return jsonify({
+                        'error': 'Sign-in is temporarily unavailable. Please try again shortly.',
+                        'degraded': True
+                    }), 503
+                degraded = True
+        else:
+            user_id = str(uuid.uuid4())
+
+        session['user_id'] = user_id
+        session['username'] = username
+
+        response = {
+            'success': True,
+            'user_id': user_id,
+            'username': username
+        }
+        if degraded:
+            response['degraded'] = True
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+async def find_or_create_user(db, username):
+    """Return the user's ID, creating the user if needed."""
+    existing = await db.table('users').select('*').eq('username', username).execute()
+    if existing.data:
+        user_id = existing.data[0]['id']
+    else:
+        result = await db.table('users').insert({
+            'username': username,
+            'created_at': datetime.utcnow().isoformat()
+        }).execute()
+        user_id = result.data[0]['id'] if result.data else str(uuid.uuid4())
+    degraded_cache.set(('user', username), user_id)
+    return user_id
+
+
+@app.route('/api/calculate-footprint', methods=['POST'])
+async def calculate_footprint():
+    """Calculate carbon footprint from `inputs` or a `profile_code`"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+
+    data = await request.get_json()
+    try:
+        user_inputs = request_inputs(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        estimator = CarbonEstimator()
+        footprint_data = estimator.estimate_footprint(user_inputs)
+
+        level, level_desc = estimator.get_footprint_level(footprint_data['total_score'])
+        footprint_data['level'] = level
+        footprint_data['level_description'] = level_desc
+
+        # Save to database (written in the background)
+        if supabase:
+            write_queue.enqueue('footprints', {
+                'user_id': session['user_id'],
+                'inputs': user_inputs,
+                'profile_code': estimator.encode_profile(user_inputs),
+                'total_score': footprint_data['total_score'],
+                'level': level,
+                'created_at': datetime.utcnow().isoformat()
+            })
+            await run_sync(history_cache.invalidate)(session['user_id'])
+            population_stats.record(user_inputs, footprint_data['total_score'])
+
+        return jsonify({
+            'success': True,
+            'footprint': footprint_data,
+            'disclaimer': estimator.get_disclaimer()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/calculate-footprint/batch', methods=['POST'])
+async def calculate_footprint_batch():
+    """
+    Score an uploaded CSV or NDJSON file of lifestyle inputs.
+
+    Same contract as the WSGI route. Scoring and the multi-row inserts are
+    CPU-bound and synchronous, so they run on the executor line by line; a
+    raw body is fed to them chunk by chunk as it arrives.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+
+    upload = None
+    if request.mimetype == 'multipart/form-data':
+        upload = (await request.files).get('file')
+    if upload:
+        in_format = detect_format(upload.mimetype, upload.filename)
+        binary = upload.stream
+    else:
+        in_format = detect_format(request.mimetype)
+        binary = AsyncChunkReader(request.body, asyncio.get_running_loop())
+
+    out_format = request.args.get('format', in_format)
+    if out_format not in MIMETYPES:
+        return jsonify({'error': f'Unsupported format: {out_format}'}), 400
+
+    save = supabase is not None and request.args.get('save', 'true').lower() != 'false'
+    session_user_id = session['user_id']
+
+    def generate():
+        try:
+            for line in score_batch(binary, in_format, out_format, save, session_user_id):
+                yield line.encode('utf-8')
+        finally:
+            binary.close()
+
+    return Response(run_sync_iterable(generate()), mimetype=MIMETYPES[out_format])
+
+
+@app.route('/api/analyze', methods=['POST'])
+async def analyze():
+    """AI-powered impact analysis"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+
+    data = await request.get_json()
+    footprint_data = data.get('footprint')
+
+    if not footprint_data:
+        return jsonify({'error': 'Footprint data required'}), 400
+
+    if wants_job():
+        return enqueue_job('analyze', {'footprint': footprint_data})
+
+    try:
+        # Falls back to the template agent past LLM_DEADLINE_MS or on failure
+        analysis_text, fallback = await run_with_deadline_async(
+            lambda: ImpactAnalysisAgent().analyze_async(footprint_data),
+            lambda: TemplateAgent().analyze(footprint_data),
+            agent='analysis'
+        )
+
+        response = {
+            'success': True,
+            'analysis': analysis_text
+        }
+        response.update(fallback_fields(fallback, 'analyze', {'footprint': footprint_data}))
+        return jsonify(response)
+    except Exception as e:
+        return handle_ai_exception(e)
+
+
+@app.route('/api/analyze/stream', methods=['POST'])
+async def analyze_stream():
+    """AI-powered impact analysis, streamed as Server-Sent Events"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+
+    data = await request.get_json()
+    footprint_data = data.get('footprint')
+
+    if not footprint_data:
+        return jsonify({'error': 'Footprint data required'}), 400
+
+    async def generate():
+        chunks = []
+        try:
+            analysis_agent = ImpactAnalysisAgent()
+            async for text in analysis_agent.analyze_stream_async(footprint_data):
+                chunks.append(text)
+                yield format_sse({'text': text}, event='token')
+            yield format_sse({'success': True, 'analysis': ''.join(chunks)}, event='done')
+        except Exception as e:
+            yield sse_error(*ai_error_payload(e))
+
+    return sse_response(generate())
+
+
+@app.route('/api/recommendations', methods=['POST'])
+async def get_recommendations():
+    """Get prioritized recommendations"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+
+    data = await request.get_json()
+    footprint_data = data.get('footprint')
+    analysis_text = data.get('analysis')
+
+    if not footprint_data or not analysis_text:
+        return jsonify({'error': 'Footprint and analysis data required'}), 400
+
+    if wants_job():
+        return enqueue_job('recommendations', {'footprint': footprint_data, 'analysis': analysis_text})
+
+    try:
+        recommendations, fallback = await run_with_deadline_async(
+            lambda: RecommendationAgent().prioritize_recommendations_async(footprint_data, analysis_text),
+            lambda: TemplateAgent().prioritize_recommendations(footprint_data),
+            agent='recommendations'
+        )
+
+        response = {
+            'success': True,
+            'recommendations': recommendations
+        }
+        response.update(fallback_fields(
+            fallback, 'recommendations', {'footprint': footprint_data, 'analysis': analysis_text}
+        ))
+        return jsonify(response)
+    except Exception as e:
+        return handle_ai_exception(e)
+
+
+@app.route('/api/challenge', methods=['POST'])
+async def get_challenge():
+    """Get One-Change Challenge"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+
+    data = await request.get_json()
+    footprint_data = data.get('footprint')
+    recommendations_text = data.get('recommendations')
+
+    if not footprint_data or not recommendations_text:
+        return jsonify({'error': 'Footprint and recommendations data required'}), 400
+
+    if wants_job():
+        return enqueue_job('challenge', {
+            'footprint': footprint_data,
+            'recommendations': recommendations_text,
+            'challenge_id': str(uuid.uuid4())
+        })
+
+    try:
+        challenge, fallback = await run_with_deadline_async(
+            lambda: ChallengeAgent().suggest_challenge_async(footprint_data, recommendations_text),
+            lambda: TemplateAgent().suggest_challenge(footprint_data),
+            agent='challenge'
+        )
+
+        # Queued for the write-behind thread; returns immediately
+        challenge_id = await run_sync(save_challenge)(session['user_id'], challenge)
+
+        response = {
+            'success': True,
+            'challenge': challenge,
+            'challenge_id': challenge_id
+        }
+        # The upgrade job rewrites this row rather than saving a second one
+        response.update(fallback_fields(fallback, 'challenge', {
+            'footprint': footprint_data,
+            'recommendations': recommendations_text,
+            'challenge_id': challenge_id
+        }))
+        return jsonify(response)
+    except Exception as e:
+        return handle_ai_exception(e)
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+async def job_status(job_id):
+    """Status of a background job (`?wait=N` long-polls up to 30 seconds)"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+
+    try:
+        wait = min(float(request.args.get('wait', 0)), MAX_JOB_WAIT_SECONDS)
+    except ValueError:
+        return jsonify({'error': 'wait must be a number of seconds'}), 400
+
+    job = await wait_for_job(job_id, wait, session['user_id'])
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    return jsonify(dict(describe(job), success=True))
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+async def job_events(job_id):
+    """Push a background job's result as Server-Sent Events"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+
+    user_id = session['user_id']
+    job = job_queue.get(job_id, user_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    async def generate():
+        current = job
+        yield format_sse(describe(current), event='status')
+        while current['status'] not in FINISHED:
+            status = current['status']
+            current = await wait_for_job(job_id, JOB_KEEPALIVE_SECONDS, user_id)
+            if current is None:
+                yield sse_error({'success': False, 'error': 'Job not found'}, 404)
+                return
+            if current['status'] == status:
+                yield SSE_KEEPALIVE
+            elif current['status'] not in FINISHED:
+                yield format_sse(describe(current), event='status')
+        yield job_result_event(current)
+
+    return sse_response(generate())
+
+
+@app.route('/api/assessment', methods=['POST'])
+async def assessment():
+    """
+    Run analysis, recommendations and challenge in one request.
+
+    Same contract as the WSGI route; stages run as tasks on the event loop.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+
+    data = await request.get_json()
+    footprint_data = data.get('footprint')
+
+    if not footprint_data:
+        return jsonify({'error': 'Footprint data required'}), 400
+
+    user_id = session['user_id']
+    stream = (
+        request.args.get('stream') == '1'
+        or SSE_MIMETYPE in request.headers.get('Accept', '')
+    )
+
+    try:
+        pipeline = AssessmentPipeline(stream_analysis=stream)
+    except Exception as e:
+        return handle_ai_exception(e)
+
+    async def stage_payload(name, result, error):
+        if error is not None:
+            payload, status = ai_error_payload(error)
+            return dict(payload, stage=name, status=status)
+        payload = {'success': True, 'stage': name, name: result}
+        if name in pipeline.fallbacks:
+            payload.update(source='template', fallback_reason=pipeline.fallbacks[name])
+        if name == 'challenge':
+            try:
+                payload['challenge_id'] = await run_sync(save_challenge)(user_id, result)
+            except Exception as e:
+                report_write_error('challenges', e)
+                payload['challenge_id'] = None
+        return payload
+
+    if stream:
+        async def generate():
+            async for name, result, error in pipeline.iter_stages_async(footprint_data):
+                if name == ANALYSIS_TOKEN:
+                    # The analysis as it is generated; its stage event follows
+                    yield format_sse({'stage': 'analysis', 'text': result}, event='token')
+                    continue
+                yield format_sse(await stage_payload(name, result, error), event='stage')
+            yield format_sse({'success': True}, event='done')
+
+        return sse_response(generate())
+
+    response = {'success': True, 'errors': {}}
+    async for name, result, error in pipeline.iter_stages_async(footprint_data):
+        payload = await stage_payload(name, result, error)
+        if error is not None:
+            response['errors'][name] = payload['error']
+            response[name] = None
+        else:
+            response[name] = result
+            if name == 'challenge':
+                response['challenge_id'] = payload['challenge_id']
+    response['success'] = not response['errors']
+    if pipeline.fallbacks:
+        response['fallbacks'] = pipeline.fallbacks
+    return jsonify(response)
+
+
+@app.route('/api/challenge/accept', methods=['POST'])
+async def accept_challenge():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    data = await request.get_json(force=True)
+
+    challenge_id = data.get('challenge_id')
+
+    if not challenge_id:
+        return jsonify({'error': 'Challenge ID missing'}), 400
+
+    db = await database()
+    if not db:
+        # Nothing to record without a database
+        return jsonify({'success': True})
+
+    updated = await accept_in_database(db, challenge_id)
+
+    if updated == [] and write_queue.enabled:
+        # The challenge may still be queued or in flight in the write-behind queue
+        await run_sync(write_queue.flush)()
+        updated = await accept_in_database(db, challenge_id)
+
+    if updated is None:
+        # Database down: the update is spooled and applied once it is back
+        return jsonify({'success': True, 'queued': True})
+
+    if not updated:
+        # Already accepted, or no such challenge
+        existing = await db.table('challenges').select('id').eq('id', challenge_id).execute()
+        if not existing.data:
+            return jsonify({'error': 'Challenge not found'}), 404
+        return jsonify({'success': True})
+
+    await run_sync(record_accepted)(updated[0], session['user_id'], session.get('username'))
+    return jsonify({'success': True})
+
+
+async def accept_in_database(db, challenge_id):
+    """
+    Mark a pending challenge accepted; returns the updated rows (empty if
+    none was pending), or None if the update was spooled.
+    """
+    values, match = {'accepted': True}, {'id': challenge_id, 'accepted': False}
+    try:
+        response = await db.table('challenges') \
+            .update(values) \
+            .eq('id', challenge_id) \
+            .eq('accepted', False) \
+            .execute()
+    except Exception as e:
+        if write_queue.spool is None or not is_outage(e):
+            raise
+        await run_sync(write_queue.spool_update)('challenges', values, match)
+        return None
+    return response.data
+
+
+@app.route('/api/chat', methods=['POST'])
+async def chat():
+    """Climate advisor chat"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+
+    data = await request.get_json()
+    message = data.get('message')
+    footprint_profile = data.get('footprint_profile', {})
+    current_challenge = data.get('current_challenge')
+    user_id = session['user_id']
+
+    if not message:
+        return jsonify({'error': 'Message required'}), 400
+
+    if wants_job():
+        # Chat jobs run ahead of every other kind
+        return enqueue_job('chat', {
+            'message': message,
+            'footprint_profile': footprint_profile,
+            'current_challenge': current_challenge,
+            'chat_history': data.get('chat_history')
+        })
+
+    try:
+        # A cold conversation is loaded from chat_history with the sync client
+        summary, chat_history = await run_sync(conversation_context)(user_id, data)
+        response = await ClimateChatAgent().chat_async(
+            message,
+            footprint_profile,
+            chat_history,
+            current_challenge,
+            summary
+        )
+        await run_sync(record_chat)(user_id, message, response)
+
+        return jsonify({
+            'success': True,
+            'response': response
+        })
+    except Exception as e:
+        return handle_ai_exception(e)
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+async def chat_stream():
+    """Climate advisor chat, streamed as Server-Sent Events"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+
+    data = await request.get_json()
+    message = data.get('message')
+    footprint_profile = data.get('footprint_profile', {})
+    current_challenge = data.get('current_challenge')
+    user_id = session['user_id']
+
+    if not message:
+        return jsonify({'error': 'Message required'}), 400
+
+    summary, chat_history = await run_sync(conversation_context)(user_id, data)
+
+    async def generate():
+        chunks = []
+        try:
+            chat_agent = ClimateChatAgent()
+            async for text in chat_agent.chat_stream_async(
+                message,
+                footprint_profile,
+                chat_history,
+                current_challenge,
+                summary
+            ):
+                chunks.append(text)
+                yield format_sse({'text': text}, event='token')
+            response = ''.join(chunks)
+        except Exception as e:
+            yield sse_error(*ai_error_payload(e))
+            return
+
+        try:
+            await run_sync(record_chat)(user_id, message, response)
+        except Exception as e:
+            report_write_error('chat_history', e)
+
+        yield format_sse({'success': True, 'response': response}, event='done')
+
+    return sse_response(generate())
+
+
+@app.route('/api/user-history', methods=['GET'])
+async def get_user_history():
+    """Get user's historical data (same cache and ETag contract as the WSGI route)"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+
+    try:
+        db = await database()
+        if db:
+            user_id = session['user_id']
+            key = ('history', user_id)
+            entry = history_cache.get(user_id)
+            if entry is None:
+                token = history_cache.begin(user_id)
+                try:
+                    # Both queries are in flight at once
+                    footprints, challenges = await asyncio.gather(
+                        db.table('footprints').select('*').eq('user_id', user_id).order('created_at', desc=True).limit(FOOTPRINT_LIMIT).execute(),
+                        db.table('challenges').select('*').eq('user_id', user_id).order('created_at', desc=True).limit(CHALLENGE_LIMIT).execute()
+                    )
+                except Exception as e:
+                    if not is_outage(e):
+                        raise
+                    return jsonify(degraded_read(key, history_payload([], [])))
+                entry = history_cache.put(user_id, history_payload(footprints.data, challenges.data), token)
+
+            degraded_cache.set(key, entry.payload)
+            return conditional_json(entry.body, entry.etag, 'private, no-cache')
+        else:
+            return jsonify({
+                'success': True,
+                'footprints': [],
+                'challenges': []
+            })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/user-history/<table>', methods=['GET'])
+async def get_user_history_page(table):
+    """Page through one of the user's history tables (same contract as the WSGI route)"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+    if table not in HISTORY_COLUMNS:
+        return jsonify({'error': f'Unknown history table: {table}'}), 404
+    try:
+        limit = page_limit(request.args.get('limit'))
+        cursor = request.args.get('cursor')
+        if cursor:
+            decode_cursor(cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    db = await database()
+    if not db:
+        return jsonify({'success': True, table: [], 'next_cursor': None})
+    try:
+        result = await page_query(db, table, session['user_id'], cursor, limit).execute()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 503 if is_outage(e) else 500
+    rows, next_cursor = split_page(result.data, limit)
+    return jsonify({'success': True, table: rows, 'next_cursor': next_cursor})
+
+
+@app.route('/api/user-history/<table>/export', methods=['GET'])
+async def export_user_history(table):
+    """Stream one of the user's history tables as NDJSON or CSV (same contract as the WSGI route)"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+    if table not in HISTORY_COLUMNS:
+        return jsonify({'error': f'Unknown history table: {table}'}), 404
+
+    fmt = request.args.get('format', FORMAT_NDJSON)
+    if fmt not in MIMETYPES:
+        return jsonify({'error': f'Unsupported format: {fmt}'}), 400
+
+    # Pages are fetched with the sync client on worker threads, one per chunk
+    pages = iter_pages(supabase, table, session['user_id']) if supabase else iter(())
+    try:
+        first = await run_sync(next)(pages, [])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 503 if is_outage(e) else 500
+
+    return Response(
+        run_sync_iterable(format_pages(chain([first], pages), table, fmt)),
+        mimetype=MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{table}.{fmt}"'}
+    )
+
+
+def conditional_json(body, etag, cache_control='no-cache'):
+    """Prebuilt JSON body with its ETag, or 304 (see app_ui.conditional_json)."""
+    if request.if_none_match.contains(etag):
+        response = Response('', status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+@app.route('/api/leaderboard', methods=['GET'])
+async def leaderboard():
+    """Leaderboard based on accepted challenges (same ETag contract as the WSGI route)"""
+    try:
+        if not supabase:
+            return jsonify([])
+
+        try:
+            if leaderboard_service.loaded:
+                snapshot = leaderboard_service.snapshot()
+            else:
+                # The first load pages through the challenges table with the sync client
+                snapshot = await run_sync(leaderboard_service.snapshot)()
+        except Exception as e:
+            if not is_outage(e):
+                raise
+            return jsonify({"success": True, "leaderboard": [], "degraded": True})
+
+        return conditional_json(snapshot.body, snapshot.etag)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/stats', methods=['GET'])
+async def population_statistics():
+    """Population score and category statistics (same contract as the WSGI route)"""
+    snapshot = population_stats.snapshot()
+    score = request.args.get('score', type=float)
+    if score is None:
+        return conditional_json(snapshot.body, snapshot.etag)
+    return jsonify(dict(snapshot.summary, percentile=snapshot.percentile_rank(score)))
+
+
+if __name__ == '__main__':
+    app.run(debug=True, host='0.0.0.0', port=5000)
@@ -3,9 +3,12 @@ ClimateSense - Flask Backend Application
 AI Climate Action & Carbon Footprint Reduction Agent
 """
 
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, Response, stream_with_context, g
 from flask_cors import CORS
+import io
 import os
+import time
+from itertools import chain
 from dotenv import load_dotenv
 from datetime import datetime
 import uuid
@@ -16,11 +19,44 @@ from agents import (
     ImpactAnalysisAgent,
     RecommendationAgent,
     ClimateChatAgent,
-    ChallengeAgent
+    ChallengeAgent,
+    AssessmentPipeline,
+    TemplateAgent
 )
+from agents.conversation_store import build_conversation_store
+from agents.pipeline import ANALYSIS_TOKEN
+from agents.precomputed import get_precomputed_store
+from agents.rate_limiter import get_rate_limiter, is_throttled
+from agents.response_cache import get_response_cache
+from agents.single_flight import get_single_flight
+from agents.template_agent import run_with_deadline
 
-# Supabase
-from supabase import create_client, Client
+from utils.circuit_breaker import is_circuit_open
+from utils.history_cache import build_history_cache, history_payload
+from utils.history_export import HISTORY_COLUMNS, decode_cursor, fetch_page, format_pages, iter_pages, page_limit
+from utils.lazy import LazyClient
+from utils.leaderboard import build_leaderboard
+from utils.lru_cache import TTLCache
+from utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY
+from utils.population_stats import build_population_stats
+from utils.supabase_metrics import InstrumentedSupabase, get_supabase_breaker, is_outage
+from utils.tracing import NOOP_SPAN, current_span, get_tracer
+from utils.write_behind import WriteBehindQueue
+from utils.write_spool import WriteSpool
+from utils.job_queue import FINISHED, SUCCEEDED, build_job_queue, describe
+from utils.sse import SSE_HEADERS, SSE_KEEPALIVE, SSE_MIMETYPE, format_sse, sse_error
+from utils.batch_io import (
+    FORMAT_CSV,
+    FORMAT_NDJSON,
+    MIMETYPES,
+    RESULT_COLUMNS,
+    detect_format,
+    format_csv_row,
+    format_ndjson,
+    iter_records,
+    split_record,
+    text_stream
+)
 
 load_dotenv()
 
@@ -32,12 +68,155 @@ CORS(app)
 supabase_url = os.getenv('SUPABASE_URL')
 supabase_key = os.getenv('SUPABASE_KEY')
 
+# Per-request database timeout (supabase-py defaults to 120s)
+SUPABASE_TIMEOUT_SECONDS = float(os.getenv('SUPABASE_TIMEOUT_SECONDS', 10))
+
+
+def create_supabase_client():
+    """Import supabase and build the client (deferred until first query)."""
+    from supabase import ClientOptions, create_client
+    options = ClientOptions(postgrest_client_timeout=SUPABASE_TIMEOUT_SECONDS)
+    # Every .execute() is timed per table and operation for /metrics
+    return InstrumentedSupabase(create_client(supabase_url, supabase_key, options))
+
+
 if supabase_url and supabase_key:
-    supabase: Client = create_client(supabase_url, supabase_key)
+    supabase = LazyClient(create_supabase_client, name='supabase')
 else:
     supabase = None
     print("Warning: Supabase credentials not found. Database features will be disabled.")
 
+# Background writer for footprint, challenge and chat_history inserts;
+# writes made while the database is down are spooled to disk and replayed
+write_queue = WriteBehindQueue(
+    supabase,
+    batch_size=int(os.getenv('WRITE_BEHIND_BATCH_SIZE', 200)),
+    flush_interval=float(os.getenv('WRITE_BEHIND_FLUSH_SECONDS', 1.0)),
+    enabled=os.getenv('WRITE_BEHIND_ENABLED', 'true').lower() not in ('0', 'false', 'no'),
+    spool=WriteSpool(os.getenv('WRITE_SPOOL_PATH', 'data/write_spool.jsonl')) if supabase else None,
+    is_outage=is_outage,
+    breaker=get_supabase_breaker()
+)
+if supabase:
+    write_queue.start()
+
+# Accepted-challenge counts, loaded once and updated on each accept
+leaderboard_service = build_leaderboard(supabase)
+
+# Score and category distributions of saved footprints, shared across workers
+population_stats = build_population_stats()
+if supabase:
+    population_stats.start()
+
+# Per-user /api/user-history responses, invalidated by that user's writes
+history_cache = build_history_cache(supabase)
+
+# Last successful database reads, served (marked degraded) during an outage
+degraded_cache = TTLCache(max_entries=int(os.getenv('DEGRADED_CACHE_ENTRIES', 10000)))
+
+
+def summarize_conversation(summary, turns):
+    """Fold older chat turns into a user's rolling summary."""
+    return ClimateChatAgent().summarize(summary, turns)
+
+
+# Server-side chat history: in-process LRU backed by the chat_history and
+# chat_summaries tables; a reload first writes the user's queued rows
+conversation_store = build_conversation_store(
+    supabase,
+    summarizer=summarize_conversation,
+    flush=write_queue.flush if supabase else None
+)
+
+
+# Memory-map precomputed responses (if PRECOMPUTE_STORE_PATH is set) at startup
+get_precomputed_store()
+
+# Rows per multi-row insert for bulk footprint uploads
+BATCH_INSERT_SIZE = int(os.getenv('FOOTPRINT_BATCH_INSERT_SIZE', 500))
+
+_bulk_estimator = None
+
+
+def get_bulk_estimator():
+    """Return the shared table-backed estimator used for bulk scoring."""
+    global _bulk_estimator
+    if _bulk_estimator is None:
+        # Imported lazily so NumPy is only loaded when bulk scoring is used
+        from agents.compiled_estimator import CompiledEstimator
+        _bulk_estimator = CompiledEstimator()
+    return _bulk_estimator
+
+
+# Request metrics (exposed at /metrics)
+ROUTE_LATENCY = REGISTRY.histogram(
+    'http_request_duration_seconds',
+    'Route latency until the response (including streamed bodies) is closed',
+    ('method', 'route', 'status')
+)
+WRITE_ERRORS = REGISTRY.counter(
+    'app_write_errors_total',
+    'Rows a route failed to queue or save, per table',
+    ('table',)
+)
+
+
+
+def response_cache_stats():
+    cache = get_response_cache()
+    return cache.stats() if cache else {}
+
+
+REGISTRY.register_stats('llm_rate_limiter', lambda: get_rate_limiter().stats())
+REGISTRY.register_stats('llm_single_flight', lambda: get_single_flight().stats())
+REGISTRY.register_stats('llm_response_cache', response_cache_stats)
+REGISTRY.register_stats('write_behind', write_queue.stats)
+REGISTRY.register_stats('chat_conversations', conversation_store.stats)
+REGISTRY.register_stats('leaderboard', leaderboard_service.stats)
+REGISTRY.register_stats('user_history_cache', history_cache.stats)
+REGISTRY.register_stats('population_stats', population_stats.stats)
+
+
+tracer = get_tracer()
+REGISTRY.register_stats('tracer', tracer.stats)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.trace_root = tracer.start_trace(
+        f"{request.method} {route}",
+        traceparent=request.headers.get('traceparent'),
+        remote_addr=request.remote_addr,
+        **{'http.method': request.method, 'http.route': route}
+    )
+
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.get('request_start')
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        histogram = ROUTE_LATENCY.labels(request.method, route, str(response.status_code))
+        root = g.get('trace_root')
+        if root is not None:
+            root.set_attribute('http.status_code', response.status_code)
+            response.headers['traceparent'] = tracer.traceparent(root)
+
+        # Streamed responses finish after this hook; time them until close
+        def finish():
+            histogram.observe(time.perf_counter() - start)
+            tracer.end_trace(root)
+        response.call_on_close(finish)
+    return response
+
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics"""
+    return Response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
 
 @app.route('/')
 def index():
@@ -61,56 +240,271 @@ def register_user():
     if not username:
         return jsonify({'error': 'Username is required'}), 400
     
+    degraded = False
     try:
         # Check if user exists
         if supabase:
-            existing = supabase.table('users').select('*').eq('username', username).execute()
-            if existing.data:
-                user_id = existing.data[0]['id']
-            else:
-                # Create new user
-                result = supabase.table('users').insert({
-                    'username': username,
-                    'created_at': datetime.utcnow().isoformat()
-                }).execute()
-                user_id = result.data[0]['id'] if result.data else str(uuid.uuid4())
+            try:
+                user_id = find_or_create_user(username)
+            except Exception as e:
+                if not is_outage(e):
+                    raise
+                user_id = register_user_offline(username)
+                if user_id is None:
+                    return jsonify({
+                        'error': 'Sign-in is temporarily unavailable. Please try again shortly.',
+                        'degraded': True
+                    }), 503
+                degraded = True
         else:
             user_id = str(uuid.uuid4())
         
         session['user_id'] = user_id
         session['username'] = username
         
-        return jsonify({
+        response = {
             'success': True,
             'user_id': user_id,
             'username': username
-        })
+        }
+        if degraded:
+            response['degraded'] = True
+        return jsonify(response)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def handle_ai_exception(e):
-    error_text = str(e).lower()
 
-    if "quota" in error_text or "rate" in error_text or "429" in error_text:
-        return jsonify({
+def find_or_create_user(username):
+    """Return the user's ID, creating the user if needed."""
+    existing = supabase.table('users').select('*').eq('username', username).execute()
+    if existing.data:
+        user_id = existing.data[0]['id']
+    else:
+        # Create new user
+        result = supabase.table('users').insert({
+            'username': username,
+            'created_at': datetime.utcnow().isoformat()
+        }).execute()
+        user_id = result.data[0]['id'] if result.data else str(uuid.uuid4())
+    degraded_cache.set(('user', username), user_id)
+    return user_id
+
+
+def register_user_offline(username):
+    """
+    Sign a user in while the database is down.
+
+    Only usernames this worker has resolved before can sign in (with their
+    cached ID). Returns None for anyone else: minting an ID here would
+    collide with the existing row (username is unique) for returning users
+    and orphan everything they write.
+    """
+    return degraded_cache.get(('user', username))
+
+
+def degraded_read(key, default):
+    """Response fields for a read that failed during an outage: the last good data."""
+    return dict(degraded_cache.get(key, default), degraded=True)
+
+def ai_error_payload(e):
+    """Map an AI exception to a (payload, status) pair."""
+    # The agents re-raise LLM errors as RuntimeError, so check the chain
+    if is_circuit_open(e):
+        return {
+            'success': False,
+            'error': 'AI is temporarily unavailable. Please try again in a minute.'
+        }, 503
+
+    # By status code/name, as the rate limiter does; message text can say anything
+    if is_throttled(e):
+        return {
             'success': False,
             'error': 'AI is temporarily busy. Please try again in a few seconds. "Go to New Assessment to reset in sometime."'
-        }), 429
+        }, 429
 
-    return jsonify({
+    return {
         'success': False,
         'error': 'Something went wrong while processing AI response.'
-    }), 500
+    }, 500
+
+
+def handle_ai_exception(e):
+    payload, status = ai_error_payload(e)
+    return jsonify(payload), status
+
+
+def analyze_job(payload, user_id):
+    return {
+        'success': True,
+        'analysis': ImpactAnalysisAgent().analyze(payload['footprint'])
+    }
+
+
+def recommendations_job(payload, user_id):
+    return {
+        'success': True,
+        'recommendations': RecommendationAgent().prioritize_recommendations(
+            payload['footprint'],
+            payload['analysis']
+        )
+    }
+
+
+def challenge_job(payload, user_id):
+    """
+    The challenge's row ID is fixed when the job is queued (the template
+    challenge it upgrades, or a fresh one), so a job re-run after its lease
+    expired rewrites that row instead of saving another.
+    """
+    challenge = ChallengeAgent().suggest_challenge(payload['footprint'], payload['recommendations'])
+    challenge_id = payload.get('challenge_id')
+    if not supabase:
+        challenge_id = None
+    elif challenge_id is None:
+        challenge_id = save_challenge(user_id, challenge)
+    elif not replace_challenge(user_id, challenge_id, challenge):
+        existing = supabase.table('challenges').select('id').eq('id', challenge_id).execute()
+        if existing.data:
+            # Already accepted: the user keeps the challenge they accepted
+            challenge_id = None
+        else:
+            save_challenge(user_id, challenge, challenge_id)
+    return {
+        'success': True,
+        'challenge': challenge,
+        'challenge_id': challenge_id
+    }
+
+
+def chat_job(payload, user_id):
+    summary, chat_history = conversation_context(user_id, payload)
+    response = ClimateChatAgent().chat(
+        payload['message'],
+        payload.get('footprint_profile', {}),
+        chat_history,
+        payload.get('current_challenge'),
+        summary
+    )
+    record_chat(user_id, payload['message'], response)
+    return {
+        'success': True,
+        'response': response
+    }
+
+
+# Background jobs for clients that ask for a job ID instead of waiting on
+# the LLM (e.g. behind proxies with short timeouts)
+job_queue = build_job_queue(on_error=ai_error_payload, tracer=tracer)
+job_queue.register('analyze', analyze_job)
+job_queue.register('recommendations', recommendations_job)
+job_queue.register('challenge', challenge_job)
+job_queue.register('chat', chat_job, priority='chat')
+job_queue.start()
+REGISTRY.register_stats('job_queue', job_queue.stats)
+
+# After a missed LLM deadline, queue a job that delivers the LLM's answer
+FALLBACK_UPGRADE = os.getenv('LLM_FALLBACK_UPGRADE', 'true').lower() not in ('0', 'false', 'no')
+
+# Longest ?wait= accepted by the job status endpoint, and SSE keep-alive interval
+MAX_JOB_WAIT_SECONDS = 30.0
+JOB_KEEPALIVE_SECONDS = 15.0
+
+
+def wants_job():
+    """True when the client asked for a job ID (`?async=1` or `Prefer: respond-async`)."""
+    return job_queue.enabled and (
+        request.args.get('async') == '1'
+        or 'respond-async' in request.headers.get('Prefer', '')
+    )
+
+
+def job_accepted(job_id):
+    """Return the (payload, headers) of a 202 answer for a queued job."""
+    status_url = f'/api/jobs/{job_id}'
+    return {
+        'success': True,
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': status_url,
+        'events_url': f'{status_url}/events'
+    }, {'Location': status_url}
+
+
+def job_priority():
+    """
+    Priority asked for with `?priority=bulk`, letting scripted callers queue
+    behind interactive users; None keeps the kind's default.
+    """
+    return 'bulk' if request.args.get('priority') == 'bulk' else None
+
+
+def submit_job(kind, payload, priority=None):
+    """Queue a job for the current user, linked to the request's trace."""
+    root = g.get('trace_root')
+    return job_queue.submit(
+        kind,
+        payload,
+        session['user_id'],
+        priority=priority,
+        traceparent=tracer.traceparent(root) if root else None
+    )
+
+
+def enqueue_job(kind, payload):
+    body, headers = job_accepted(submit_job(kind, payload, job_priority()))
+    return jsonify(body), 202, headers
+
+
+def fallback_fields(reason, kind, payload):
+    """
+    Response fields marking a template answer (reason from run_with_deadline).
+
+    After a missed deadline the LLM's answer is queued as a job, returned
+    under `upgrade` so the client can swap it in when it arrives. The user
+    already has an answer, so upgrades queue at bulk priority.
+    """
+    if reason is None:
+        return {}
+    fields = {'source': 'template', 'fallback_reason': reason}
+    if reason == 'deadline' and FALLBACK_UPGRADE and job_queue.enabled:
+        fields['upgrade'] = job_accepted(submit_job(kind, payload, 'bulk'))[0]
+    return fields
+
+
+def job_result_event(job):
+    """SSE event for a finished job: `done` with the route's payload, or `error`."""
+    if job['status'] == SUCCEEDED:
+        return format_sse(dict(job['result'], job_id=job['id']), event='done')
+    return sse_error(dict(job['result'], job_id=job['id']), job['status_code'])
+
+
+def request_inputs(data):
+    """
+    Lifestyle inputs from a request body: `inputs`, or a `profile_code`
+    from CarbonEstimator.encode_profile().
+
+    Raises:
+        ValueError: If the profile code is not a valid code
+    """
+    if data.get('profile_code') is not None:
+        try:
+            return CarbonEstimator.decode_profile(int(data['profile_code']))
+        except TypeError:
+            raise ValueError(f"Invalid profile code: {data['profile_code']!r}")
+    return data.get('inputs', {})
 
 
 @app.route('/api/calculate-footprint', methods=['POST'])
 def calculate_footprint():
-    """Calculate carbon footprint"""
+    """Calculate carbon footprint from `inputs` or a `profile_code`"""
     if 'user_id' not in session:
         return jsonify({'error': 'User not authenticated'}), 401
     
     data = request.json
-    user_inputs = data.get('inputs', {})
+    try:
+        user_inputs = request_inputs(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     try:
         estimator = CarbonEstimator()
@@ -121,15 +515,18 @@ def calculate_footprint():
         footprint_data['level'] = level
         footprint_data['level_description'] = level_desc
         
-        # Save to database
+        # Save to database (written in the background)
         if supabase:
-            supabase.table('footprints').insert({
+            write_queue.enqueue('footprints', {
                 'user_id': session['user_id'],
                 'inputs': user_inputs,
+                'profile_code': estimator.encode_profile(user_inputs),
                 'total_score': footprint_data['total_score'],
                 'level': level,
                 'created_at': datetime.utcnow().isoformat()
-            }).execute()
+            })
+            history_cache.invalidate(session['user_id'])
+            population_stats.record(user_inputs, footprint_data['total_score'])
         
         return jsonify({
             'success': True,
@@ -140,6 +537,137 @@ def calculate_footprint():
         return jsonify({'error': str(e)}), 500
 
 
+def score_batch(binary, in_format, out_format, save, session_user_id):
+    """
+    Score an uploaded batch, yielding one output line per record.
+
+    Args:
+        binary: Binary stream of the upload
+        in_format / out_format: 'csv' or 'ndjson'
+        save: Insert scored rows into the footprints table
+        session_user_id: Owner of every saved row; records naming a
+            different user_id are rejected
+
+    Yields:
+        Encoded output lines (a CSV header first for CSV output)
+    """
+    estimator = get_bulk_estimator()
+    categories = list(estimator.CATEGORIES)
+    
+    def emit(result):
+        if out_format == FORMAT_CSV:
+            return format_csv_row(
+                [result.get(col, '') for col in RESULT_COLUMNS]
+                + [result.get('category_scores', {}).get(cat, '') for cat in categories]
+            )
+        return format_ndjson(result)
+    
+    pending = []
+    created_at = datetime.utcnow().isoformat()
+    
+    if out_format == FORMAT_CSV:
+        yield format_csv_row(RESULT_COLUMNS + categories)
+    
+    try:
+        for line, record, error in iter_records(text_stream(binary), in_format):
+            result = {'line': line, 'id': None}
+            if record is not None:
+                inputs, metadata = split_record(record, categories)
+                result['id'] = metadata.get('id')
+                if not inputs and metadata.get('profile_code') not in (None, ''):
+                    try:
+                        inputs = estimator.decode_profile(int(metadata['profile_code']))
+                    except (TypeError, ValueError):
+                        pass
+                code = estimator.encode_profile(inputs)
+                if metadata.get('user_id') not in (None, '', session_user_id):
+                    error = 'user_id does not match the signed-in user'
+                elif code is None:
+                    error = 'Missing or invalid lifestyle inputs'
+                else:
+                    total_score = int(estimator.table['total_score'][code])
+                    level = estimator.get_level_for_code(code)[0]
+                    result['total_score'] = total_score
+                    result['level'] = level
+                    result['category_scores'] = dict(zip(
+                        categories,
+                        estimator.table['category_scores'][code].tolist()
+                    ))
+                    if save:
+                        pending.append({
+                            'user_id': session_user_id,
+                            'inputs': {cat: inputs[cat] for cat in categories},
+                            'profile_code': code,
+                            'total_score': total_score,
+                            'level': level,
+                            'created_at': created_at
+                        })
+            if error:
+                result['error'] = error
+            yield emit(result)
+            
+            if len(pending) >= BATCH_INSERT_SIZE:
+                save_footprints(pending)
+                pending = []
+        
+        if pending:
+            save_footprints(pending)
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band
+        yield emit({'line': None, 'id': None, 'error': f'Batch aborted: {e}'})
+
+
+def save_footprints(rows):
+    """Insert a batch of footprint rows, invalidate their users' history and count them."""
+    write_queue.insert('footprints', rows)
+    for user_id in {row['user_id'] for row in rows}:
+        history_cache.invalidate(user_id)
+    for row in rows:
+        population_stats.record(row['inputs'], row['total_score'])
+
+
+@app.route('/api/calculate-footprint/batch', methods=['POST'])
+def calculate_footprint_batch():
+    """
+    Score an uploaded CSV or NDJSON file of lifestyle inputs.
+
+    Accepts a multipart `file` field or a raw request body. Results stream
+    back one line per record (`?format=csv|ndjson`, defaults to the input
+    format) and rows are saved with multi-row inserts (`?save=false` skips).
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+    
+    upload = request.files.get('file')
+    if upload:
+        in_format = detect_format(upload.mimetype, upload.filename)
+        # Take ownership of the spooled upload: Flask closes request.files
+        # when the view returns, before the streamed response is consumed
+        binary, upload.stream = upload.stream, io.BytesIO()
+    else:
+        in_format = detect_format(request.mimetype)
+        binary = request.stream
+    
+    out_format = request.args.get('format', in_format)
+    if out_format not in MIMETYPES:
+        return jsonify({'error': f'Unsupported format: {out_format}'}), 400
+    
+    save = supabase is not None and request.args.get('save', 'true').lower() != 'false'
+    session_user_id = session['user_id']
+    
+    def generate():
+        try:
+            yield from score_batch(binary, in_format, out_format, save, session_user_id)
+        finally:
+            if upload:
+                binary.close()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype=MIMETYPES[out_format]
+    )
+
+
 @app.route('/api/analyze', methods=['POST'])
 def analyze():
     """AI-powered impact analysis"""
@@ -152,18 +680,57 @@ def analyze():
     if not footprint_data:
         return jsonify({'error': 'Footprint data required'}), 400
     
+    if wants_job():
+        return enqueue_job('analyze', {'footprint': footprint_data})
+    
     try:
-        analysis_agent = ImpactAnalysisAgent()
-        analysis_text = analysis_agent.analyze(footprint_data)
+        # Falls back to the template agent past LLM_DEADLINE_MS or on failure
+        analysis_text, fallback = run_with_deadline(
+            lambda: ImpactAnalysisAgent().analyze(footprint_data),
+            lambda: TemplateAgent().analyze(footprint_data),
+            agent='analysis'
+        )
         
-        return jsonify({
+        response = {
             'success': True,
             'analysis': analysis_text
-        })
+        }
+        response.update(fallback_fields(fallback, 'analyze', {'footprint': footprint_data}))
+        return jsonify(response)
     except Exception as e:
         return handle_ai_exception(e)
 
 
+@app.route('/api/analyze/stream', methods=['POST'])
+def analyze_stream():
+    """AI-powered impact analysis, streamed as Server-Sent Events"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+    
+    data = request.json
+    footprint_data = data.get('footprint')
+    
+    if not footprint_data:
+        return jsonify({'error': 'Footprint data required'}), 400
+    
+    def generate():
+        chunks = []
+        try:
+            analysis_agent = ImpactAnalysisAgent()
+            for text in analysis_agent.analyze_stream(footprint_data):
+                chunks.append(text)
+                yield format_sse({'text': text}, event='token')
+            yield format_sse({'success': True, 'analysis': ''.join(chunks)}, event='done')
+        except Exception as e:
+            yield sse_error(*ai_error_payload(e))
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype=SSE_MIMETYPE,
+        headers=SSE_HEADERS
+    )
+
+
 @app.route('/api/recommendations', methods=['POST'])
 def get_recommendations():
     """Get prioritized recommendations"""
@@ -177,14 +744,24 @@ def get_recommendations():
     if not footprint_data or not analysis_text:
         return jsonify({'error': 'Footprint and analysis data required'}), 400
     
+    if wants_job():
+        return enqueue_job('recommendations', {'footprint': footprint_data, 'analysis': analysis_text})
+    
     try:
-        rec_agent = RecommendationAgent()
-        recommendations = rec_agent.prioritize_recommendations(footprint_data, analysis_text)
+        recommendations, fallback = run_with_deadline(
+            lambda: RecommendationAgent().prioritize_recommendations(footprint_data, analysis_text),
+            lambda: TemplateAgent().prioritize_recommendations(footprint_data),
+            agent='recommendations'
+        )
         
-        return jsonify({
+        response = {
             'success': True,
             'recommendations': recommendations
-        })
+        }
+        response.update(fallback_fields(
+            fallback, 'recommendations', {'footprint': footprint_data, 'analysis': analysis_text}
+        ))
+        return jsonify(response)
     except Exception as e:
         return handle_ai_exception(e)
 
@@ -201,56 +778,301 @@ def get_challenge():
     if not footprint_data or not recommendations_text:
         return jsonify({'error': 'Footprint and recommendations data required'}), 400
     
+    if wants_job():
+        return enqueue_job('challenge', {
+            'footprint': footprint_data,
+            'recommendations': recommendations_text,
+            'challenge_id': str(uuid.uuid4())
+        })
+    
     try:
-        challenge_agent = ChallengeAgent()
-        challenge = challenge_agent.suggest_challenge(footprint_data, recommendations_text)
+        challenge, fallback = run_with_deadline(
+            lambda: ChallengeAgent().suggest_challenge(footprint_data, recommendations_text),
+            lambda: TemplateAgent().suggest_challenge(footprint_data),
+            agent='challenge'
+        )
         
         # Save challenge to database
-        if supabase:
-            insert_response = supabase.table('challenges').insert({
-            'user_id': session['user_id'],
-            'challenge_data': challenge
-            }).execute()
-        print("INSERT RESPONSE:", insert_response)
-
-        challenge_id = insert_response.data[0]['id']
-        print("CHALLENGE ID SENT:", challenge_id)
+        challenge_id = save_challenge(session['user_id'], challenge)
 
-        return jsonify({
+        response = {
              'success': True,
              'challenge': challenge,
              'challenge_id': challenge_id
-         })
-        
-        print("INSERT ERROR:", insert_response.error)
+         }
+        # The upgrade job rewrites this row rather than saving a second one
+        response.update(fallback_fields(fallback, 'challenge', {
+            'footprint': footprint_data,
+            'recommendations': recommendations_text,
+            'challenge_id': challenge_id
+        }))
+        return jsonify(response)
 
     except Exception as e:
         return handle_ai_exception(e)
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """
+    Status of a background job, with the route's payload once finished.
+
+    `?wait=N` long-polls up to N seconds (at most 30) for the job to finish.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+    
+    try:
+        wait = min(float(request.args.get('wait', 0)), MAX_JOB_WAIT_SECONDS)
+    except ValueError:
+        return jsonify({'error': 'wait must be a number of seconds'}), 400
+    
+    if wait > 0:
+        job = job_queue.wait(job_id, wait, session['user_id'])
+    else:
+        job = job_queue.get(job_id, session['user_id'])
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(dict(describe(job), success=True))
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Push a background job's result as Server-Sent Events: `status` with the
+    current state, then `done` (or `error`) once it finishes.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+    
+    user_id = session['user_id']
+    job = job_queue.get(job_id, user_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def generate():
+        current = job
+        yield format_sse(describe(current), event='status')
+        while current['status'] not in FINISHED:
+            status = current['status']
+            current = job_queue.wait(job_id, JOB_KEEPALIVE_SECONDS, user_id)
+            if current is None:
+                yield sse_error({'success': False, 'error': 'Job not found'}, 404)
+                return
+            if current['status'] == status:
+                # Comment line so proxies do not time out an idle stream
+                yield SSE_KEEPALIVE
+            elif current['status'] not in FINISHED:
+                yield format_sse(describe(current), event='status')
+        yield job_result_event(current)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype=SSE_MIMETYPE,
+        headers=SSE_HEADERS
+    )
+
+
+@app.route('/api/assessment', methods=['POST'])
+def assessment():
+    """
+    Run analysis, recommendations and challenge in one request.
+
+    Independent stages run concurrently. Returns one JSON object, or streams
+    a Server-Sent Event per stage as it finishes when the client sends
+    `Accept: text/event-stream` (or `?stream=1`), preceded by `token` events
+    carrying the analysis as it is generated.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+    
+    data = request.json
+    footprint_data = data.get('footprint')
+    
+    if not footprint_data:
+        return jsonify({'error': 'Footprint data required'}), 400
+    
+    user_id = session['user_id']
+    stream = (
+        request.args.get('stream') == '1'
+        or SSE_MIMETYPE in request.headers.get('Accept', '')
+    )
+    
+    try:
+        pipeline = AssessmentPipeline(stream_analysis=stream)
+    except Exception as e:
+        return handle_ai_exception(e)
+    
+    def stage_payload(name, result, error):
+        if error is not None:
+            payload, status = ai_error_payload(error)
+            return dict(payload, stage=name, status=status)
+        payload = {'success': True, 'stage': name, name: result}
+        if name in pipeline.fallbacks:
+            payload.update(source='template', fallback_reason=pipeline.fallbacks[name])
+        if name == 'challenge':
+            try:
+                payload['challenge_id'] = save_challenge(user_id, result)
+            except Exception as e:
+                report_write_error('challenges', e)
+                payload['challenge_id'] = None
+        return payload
+    
+    if stream:
+        def generate():
+            for name, result, error in pipeline.iter_stages(footprint_data):
+                if name == ANALYSIS_TOKEN:
+                    # The analysis as it is generated; its stage event follows
+                    yield format_sse({'stage': 'analysis', 'text': result}, event='token')
+                    continue
+                yield format_sse(stage_payload(name, result, error), event='stage')
+            yield format_sse({'success': True}, event='done')
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype=SSE_MIMETYPE,
+            headers=SSE_HEADERS
+        )
+    
+    response = {'success': True, 'errors': {}}
+    for name, result, error in pipeline.iter_stages(footprint_data):
+        payload = stage_payload(name, result, error)
+        if error is not None:
+            response['errors'][name] = payload['error']
+            response[name] = None
+        else:
+            response[name] = result
+            if name == 'challenge':
+                response['challenge_id'] = payload['challenge_id']
+    response['success'] = not response['errors']
+    if pipeline.fallbacks:
+        response['fallbacks'] = pipeline.fallbacks
+    return jsonify(response)
+
+
+def save_challenge(user_id, challenge, challenge_id=None):
+    """
+    Queue a generated challenge for insertion and return its ID.
+
+    The ID is generated here (or by the caller) rather than by the database
+    so it can be returned before the write-behind queue flushes the row.
+    Returns None without a database.
+    """
+    if not supabase:
+        return None
+    challenge_id = challenge_id or str(uuid.uuid4())
+    write_queue.enqueue('challenges', {
+        'id': challenge_id,
+        'user_id': user_id,
+        'challenge_data': challenge,
+        'accepted': False
+    })
+    history_cache.invalidate(user_id)
+    return challenge_id
+
+
+def replace_challenge(user_id, challenge_id, challenge):
+    """
+    Overwrite a saved challenge that has not been accepted yet.
+
+    Returns False if it was already accepted (the user keeps the challenge
+    they accepted) or does not exist; True if replaced or spooled.
+    """
+    pending = {'id': challenge_id, 'user_id': user_id, 'accepted': False}
+    updated = write_queue.update('challenges', {'challenge_data': challenge}, pending)
+    if updated == [] and write_queue.enabled:
+        # The template row may still be queued or in flight in the write-behind queue
+        write_queue.flush()
+        updated = write_queue.update('challenges', {'challenge_data': challenge}, pending)
+    history_cache.invalidate(user_id)
+    return updated is None or bool(updated)
+
+
 @app.route('/api/challenge/accept', methods=['POST'])
 def accept_challenge():
     if 'user_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
 
     data = request.get_json(force=True)
-    print("ACCEPT JSON:", data)
 
     challenge_id = data.get('challenge_id')
 
     if not challenge_id:
         return jsonify({'error': 'Challenge ID missing'}), 400
 
-    response = supabase.table('challenges') \
-        .update({'accepted': True}) \
-        .eq('id', challenge_id) \
-        .execute()
+    if not supabase:
+        # Nothing to record without a database
+        return jsonify({'success': True})
+
+    # Only a pending challenge matches, so each acceptance is counted once
+    pending = {'id': challenge_id, 'accepted': False}
+    updated = write_queue.update('challenges', {'accepted': True}, pending)
 
-    if not response.data:
-        return jsonify({'error': 'Challenge not found'}), 404
+    if updated == [] and write_queue.enabled:
+        # The challenge may still be queued or in flight in the write-behind queue
+        write_queue.flush()
+        updated = write_queue.update('challenges', {'accepted': True}, pending)
 
+    if updated is None:
+        # Database down: the update is spooled and applied once it is back
+        # (the leaderboard picks it up at its next reconcile)
+        return jsonify({'success': True, 'queued': True})
+
+    if not updated:
+        # Already accepted, or no such challenge
+        existing = supabase.table('challenges').select('id').eq('id', challenge_id).execute()
+        if not existing.data:
+            return jsonify({'error': 'Challenge not found'}), 404
+        return jsonify({'success': True})
+
+    record_accepted(updated[0], session['user_id'], session.get('username'))
     return jsonify({'success': True})
 
 
+def record_accepted(challenge, session_user_id, session_username):
+    """Count a newly accepted challenge on the leaderboard and in its owner's history."""
+    user_id = challenge.get('user_id')
+    if user_id:
+        history_cache.invalidate(user_id)
+        username = session_username if user_id == session_user_id else None
+        leaderboard_service.record_accept(user_id, username)
+
+
+def conversation_context(user_id, data):
+    """
+    Return (summary, recent_turns) for a chat request.
+    
+    The server-side store is authoritative; a client-posted chat_history is
+    only used (as a legacy fallback) when the store has nothing for the user.
+    """
+    summary, chat_history = conversation_store.context(user_id)
+    if not summary and not chat_history:
+        chat_history = data.get('chat_history') or []
+    return summary, chat_history
+
+
+def report_write_error(table, error):
+    """Count a failed write and record it on the request's trace (if sampled)."""
+    WRITE_ERRORS.labels(table).inc()
+    span = current_span()
+    span.record_exception(error)
+    trace = f" [trace {span.trace.trace_id}]" if span is not NOOP_SPAN else ''
+    print(f"{table.upper()} INSERT ERROR{trace}: {error}")
+
+
+def record_chat(user_id, message, response):
+    """Append a finished exchange to the conversation store and queue its row."""
+    created_at = datetime.utcnow().isoformat()
+    conversation_store.append(user_id, message, response, created_at)
+    if supabase:
+        write_queue.enqueue('chat_history', {
+            'user_id': user_id,
+            'user_message': message,
+            'assistant_response': response,
+            'created_at': created_at
+        })
+
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """Climate advisor chat"""
@@ -260,29 +1082,33 @@ def chat():
     data = request.json
     message = data.get('message')
     footprint_profile = data.get('footprint_profile', {})
-    chat_history = data.get('chat_history', [])
     current_challenge = data.get('current_challenge')
+    user_id = session['user_id']
     
     if not message:
         return jsonify({'error': 'Message required'}), 400
     
+    if wants_job():
+        # Chat jobs run ahead of every other kind
+        return enqueue_job('chat', {
+            'message': message,
+            'footprint_profile': footprint_profile,
+            'current_challenge': current_challenge,
+            'chat_history': data.get('chat_history')
+        })
+    
     try:
+        summary, chat_history = conversation_context(user_id, data)
         chat_agent = ClimateChatAgent()
         response = chat_agent.chat(
             message,
             footprint_profile,
             chat_history,
-            current_challenge
+            current_challenge,
+            summary
         )
-        
-        # Save chat to database
-        if supabase:
-            supabase.table('chat_history').insert({
-                'user_id': session['user_id'],
-                'user_message': message,
-                'assistant_response': response,
-                'created_at': datetime.utcnow().isoformat()
-            }).execute()
+        # Save chat to database (written in the background)
+        record_chat(user_id, message, response)
         
         return jsonify({
             'success': True,
@@ -294,22 +1120,81 @@ def chat():
 
 
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Climate advisor chat, streamed as Server-Sent Events"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+    
+    data = request.json
+    message = data.get('message')
+    footprint_profile = data.get('footprint_profile', {})
+    current_challenge = data.get('current_challenge')
+    user_id = session['user_id']
+    
+    if not message:
+        return jsonify({'error': 'Message required'}), 400
+    
+    summary, chat_history = conversation_context(user_id, data)
+    
+    def generate():
+        chunks = []
+        try:
+            chat_agent = ClimateChatAgent()
+            for text in chat_agent.chat_stream(
+                message,
+                footprint_profile,
+                chat_history,
+                current_challenge,
+                summary
+            ):
+                chunks.append(text)
+                yield format_sse({'text': text}, event='token')
+            response = ''.join(chunks)
+        except Exception as e:
+            yield sse_error(*ai_error_payload(e))
+            return
+        
+        # Save chat to database once the full response is known
+        try:
+            record_chat(user_id, message, response)
+        except Exception as e:
+            report_write_error('chat_history', e)
+        
+        yield format_sse({'success': True, 'response': response}, event='done')
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype=SSE_MIMETYPE,
+        headers=SSE_HEADERS
+    )
+
+
+
+
 @app.route('/api/user-history', methods=['GET'])
 def get_user_history():
-    """Get user's historical data"""
+    """
+    Get user's historical data.
+
+    Served from the per-user history cache with an ETag; a request whose
+    If-None-Match matches gets 304.
+    """
     if 'user_id' not in session:
         return jsonify({'error': 'User not authenticated'}), 401
     
     try:
         if supabase:
-            footprints = supabase.table('footprints').select('*').eq('user_id', session['user_id']).order('created_at', desc=True).limit(10).execute()
-            challenges = supabase.table('challenges').select('*').eq('user_id', session['user_id']).order('created_at', desc=True).limit(5).execute()
+            key = ('history', session['user_id'])
+            try:
+                entry = history_cache.load(session['user_id'])
+            except Exception as e:
+                if not is_outage(e):
+                    raise
+                return jsonify(degraded_read(key, history_payload([], [])))
             
-            return jsonify({
-                'success': True,
-                'footprints': footprints.data if footprints.data else [],
-                'challenges': challenges.data if challenges.data else []
-            })
+            degraded_cache.set(key, entry.payload)
+            return conditional_json(entry.body, entry.etag, 'private, no-cache')
         else:
             return jsonify({
                 'success': True,
@@ -320,28 +1205,122 @@ def get_user_history():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/user-history/<table>', methods=['GET'])
+def get_user_history_page(table):
+    """
+    Page through one of the user's history tables, newest first.
+
+    `?limit=` sets the page size (max 100); pass the previous page's
+    `next_cursor` as `?cursor=` to continue. `next_cursor` is null on the
+    last page.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+    
+    if table not in HISTORY_COLUMNS:
+        return jsonify({'error': f'Unknown history table: {table}'}), 404
+    try:
+        limit = page_limit(request.args.get('limit'))
+        cursor = request.args.get('cursor')
+        if cursor:
+            decode_cursor(cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not supabase:
+        return jsonify({'success': True, table: [], 'next_cursor': None})
+    try:
+        rows, next_cursor = fetch_page(supabase, table, session['user_id'], cursor, limit)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 503 if is_outage(e) else 500
+    return jsonify({'success': True, table: rows, 'next_cursor': next_cursor})
 
 
+@app.route('/api/user-history/<table>/export', methods=['GET'])
+def export_user_history(table):
+    """
+    Stream every row of one of the user's history tables, newest first, as
+    NDJSON or CSV (`?format=`, default ndjson).
+
+    Pages are fetched as the client reads them, so memory stays flat
+    however long the history is.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'User not authenticated'}), 401
+    if table not in HISTORY_COLUMNS:
+        return jsonify({'error': f'Unknown history table: {table}'}), 404
+    
+    fmt = request.args.get('format', FORMAT_NDJSON)
+    if fmt not in MIMETYPES:
+        return jsonify({'error': f'Unsupported format: {fmt}'}), 400
+    
+    pages = iter_pages(supabase, table, session['user_id']) if supabase else iter(())
+    try:
+        # The first page is fetched before responding so a failure gets a status code
+        first = next(pages, [])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 503 if is_outage(e) else 500
+    
+    return Response(
+        stream_with_context(format_pages(chain([first], pages), table, fmt)),
+        mimetype=MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{table}.{fmt}"'}
+    )
+
+
+def conditional_json(body, etag, cache_control='no-cache'):
+    """
+    Respond with a prebuilt JSON body and its ETag, or 304 if the client's
+    If-None-Match already names it. `no-cache` makes browsers revalidate on
+    every use, so they get the 304 while the body is unchanged.
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
 
 @app.route('/api/leaderboard', methods=['GET'])
 def leaderboard():
-    """Leaderboard based on accepted challenges"""
+    """
+    Leaderboard based on accepted challenges.
+
+    Served from the in-memory leaderboard service with an ETag; a request
+    whose If-None-Match matches the current board gets 304.
+    """
     try:
         if not supabase:
             return jsonify([])
 
-        # Count accepted challenges per user
-        response = supabase.rpc(
-            "leaderboard_accepted_challenges"
-        ).execute()
+        try:
+            snapshot = leaderboard_service.snapshot()
+        except Exception as e:
+            if not is_outage(e):
+                raise
+            # The first load failed; nothing to serve yet
+            return jsonify({"success": True, "leaderboard": [], "degraded": True})
 
-        return jsonify({
-            "success": True,
-            "leaderboard": response.data
-        })
+        return conditional_json(snapshot.body, snapshot.etag)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/stats', methods=['GET'])
+def population_statistics():
+    """
+    Score percentiles and per-category option shares across all saved
+    footprints, from in-memory counts. `?score=` adds that score's
+    percentile rank.
+    """
+    snapshot = population_stats.snapshot()
+    score = request.args.get('score', type=float)
+    if score is None:
+        return conditional_json(snapshot.body, snapshot.etag)
+    return jsonify(dict(snapshot.summary, percentile=snapshot.percentile_rank(score)))
+
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
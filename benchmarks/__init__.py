@@ -0,0 +1,4 @@
+"""
+Benchmarks for ClimateSense.
+Standalone scripts that measure performance against local stub backends.
+"""
@@ -0,0 +1,97 @@
+"""
+Client Pool Benchmark
+Compares per-request genai.Client construction with the shared client
+registry against a local stub LLM server.
+
+Usage:
+    python -m benchmarks.bench_client_pool --requests 200 --concurrency 8
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+import google.genai as genai
+from google.genai import types
+
+from agents import llm_client
+from benchmarks.stub_llm import start_stub_server
+
+
+API_KEY = 'benchmark-key'
+
+
+def _per_request_call(base_url: str) -> Callable[[], None]:
+    """Old behaviour: build a fresh client for every call."""
+    def call():
+        client = genai.Client(
+            api_key=API_KEY,
+            http_options=types.HttpOptions(base_url=base_url)
+        )
+        client.models.generate_content(
+            model=llm_client.DEFAULT_MODEL_NAME, contents='ping'
+        )
+    return call
+
+
+def _shared_call(base_url: str) -> Callable[[], None]:
+    """New behaviour: reuse the process-wide client."""
+    llm_client.reset_clients()
+    llm_client._clients[API_KEY] = llm_client.build_client(API_KEY, base_url=base_url)
+
+    def call():
+        client = llm_client.get_client(API_KEY)
+        client.models.generate_content(
+            model=llm_client.DEFAULT_MODEL_NAME, contents='ping'
+        )
+    return call
+
+
+def _run(call: Callable[[], None], requests: int, concurrency: int) -> List[float]:
+    """Run `requests` calls and return per-call latencies in milliseconds."""
+    def timed(_):
+        start = time.perf_counter()
+        call()
+        return (time.perf_counter() - start) * 1000
+
+    call()  # warm up imports and the first connection
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(timed, range(requests)))
+
+
+def _summary(label: str, latencies: List[float]) -> str:
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    return (
+        f"{label:<14} mean {statistics.mean(latencies):7.2f} ms  "
+        f"p50 {statistics.median(latencies):7.2f} ms  p95 {p95:7.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Simulated upstream latency in seconds')
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(latency=args.latency)
+    try:
+        before = _run(_per_request_call(base_url), args.requests, args.concurrency)
+        after = _run(_shared_call(base_url), args.requests, args.concurrency)
+    finally:
+        llm_client.reset_clients()
+        server.shutdown()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    print(_summary('per-request', before))
+    print(_summary('shared pool', after))
+    saved = statistics.mean(before) - statistics.mean(after)
+    print(f"per-request overhead saved: {saved:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
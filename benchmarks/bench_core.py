@@ -0,0 +1,82 @@
+"""
+Core Path Benchmark
+Times the CPU-bound request work with no I/O: CarbonEstimator scoring,
+prompt rendering in every agent, and challenge parsing on realistic and
+pathological LLM outputs.
+
+Usage:
+    python -m benchmarks.bench_core --iterations 2000 --output data/bench/core.json
+"""
+
+import argparse
+import os
+from typing import Dict
+
+from benchmarks.harness import format_row, measure, save_results
+from benchmarks.samples import PARSER_CASES, PROFILES, RECOMMENDATIONS_RESPONSE
+
+
+def run(iterations: int) -> Dict[str, Dict[str, float]]:
+    # Agents need a key to build their (unused) client
+    os.environ.setdefault('GEMINI_API_KEY', 'benchmark-key')
+    os.environ.setdefault('LLM_CACHE_ENABLED', 'false')
+
+    from agents import (
+        CarbonEstimator,
+        ChallengeAgent,
+        ClimateChatAgent,
+        ImpactAnalysisAgent,
+        RecommendationAgent
+    )
+
+    estimator = CarbonEstimator()
+    footprints = [estimator.estimate_footprint(profile) for profile in PROFILES]
+    full = footprints[0]
+
+    analysis = ImpactAnalysisAgent()
+    recommendations = RecommendationAgent()
+    challenge = ChallengeAgent()
+    chat = ClimateChatAgent()
+    history = [
+        {'role': 'user' if i % 2 == 0 else 'assistant', 'content': f"Message {i} about reducing car use."}
+        for i in range(40)
+    ]
+
+    benchmarks = {
+        'estimator.estimate_footprint': lambda: [estimator.estimate_footprint(p) for p in PROFILES],
+        'estimator.encode_profile': lambda: [CarbonEstimator.encode_profile(p) for p in PROFILES],
+        'prompt.analysis': lambda: analysis._build_prompt(full),
+        'prompt.recommendations': lambda: recommendations._build_prompt(full),
+        'prompt.challenge': lambda: challenge._build_prompt(full, RECOMMENDATIONS_RESPONSE),
+        'prompt.chat': lambda: chat._build_prompt('How do I cut my commute emissions?', full, history, None),
+    }
+    for case, texts in PARSER_CASES.items():
+        benchmarks[f'parse_challenge.{case}'] = (
+            lambda text=texts['challenge']: challenge._parse_challenge(text)
+        )
+        benchmarks[f'extract_immediate_action.{case}'] = (
+            lambda text=texts['recommendations']: challenge._extract_immediate_action(text)
+        )
+
+    results = {}
+    for name, func in benchmarks.items():
+        # Pathological inputs are slow; cap their iterations
+        count = iterations if not name.endswith(('.huge', '.marker_heavy')) else max(iterations // 20, 10)
+        results[name] = measure(func, iterations=count)
+        print(format_row(name, results[name]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--output', help='Write JSON results to this file')
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    if args.output:
+        save_results(args.output, 'core', results, {'iterations': args.iterations})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Import Time Benchmark
+Measures `import app_ui` with `python -X importtime` in fresh interpreters
+and fails if the median exceeds a budget or a deferred dependency
+(google.genai, supabase) is imported at start-up.
+
+Usage:
+    python -m benchmarks.bench_import_time --runs 5 --budget-ms 600
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+
+# Modules that must not load until the first request needs them
+DEFERRED_MODULES = ('google.genai', 'supabase', 'numpy')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _measure(module: str) -> Tuple[float, Dict[str, int]]:
+    """
+    Import `module` in a fresh interpreter.
+
+    Returns:
+        Tuple of (cumulative import time of `module` in ms,
+        {imported module name: cumulative microseconds})
+    """
+    env = dict(os.environ)
+    # Configure Supabase so the lazy client path is the one measured
+    env.setdefault('SUPABASE_URL', 'http://127.0.0.1:9')
+    env.setdefault('SUPABASE_KEY', 'benchmark-key')
+    env['PYTHONPATH'] = ROOT
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+
+    modules: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <indented module name>"
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative)
+    return modules[module] / 1000, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--module', default='app_ui')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=600.0,
+                        help='Fail if the median import time exceeds this')
+    parser.add_argument('--top', type=int, default=10,
+                        help='Show the slowest top-level imports')
+    args = parser.parse_args()
+
+    timings: List[float] = []
+    modules: Dict[str, int] = {}
+    for _ in range(args.runs):
+        elapsed, modules = _measure(args.module)
+        timings.append(elapsed)
+
+    median = statistics.median(timings)
+    print(f"import {args.module}: median {median:.1f} ms over {args.runs} runs "
+          f"(min {min(timings):.1f}, max {max(timings):.1f}, budget {args.budget_ms:.0f})")
+
+    roots = {name: us for name, us in modules.items() if '.' not in name}
+    for name, us in sorted(roots.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failures = []
+    if median > args.budget_ms:
+        failures.append(f"median {median:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+    for name in DEFERRED_MODULES:
+        if name in modules:
+            failures.append(f"{name} is imported at start-up")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
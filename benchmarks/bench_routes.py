@@ -0,0 +1,143 @@
+"""
+Route Benchmark
+End-to-end latency and throughput of the Flask routes through the test
+client, with Gemini replaced by the stub server and Supabase by the
+in-memory fake (both with configurable latency).
+
+Usage:
+    python -m benchmarks.bench_routes --llm-latency 0.2 --db-latency 0.01 \\
+        --requests 50 --concurrency 8 --output data/bench/routes.json
+"""
+
+import argparse
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.harness import format_row, summarize, save_results
+from benchmarks.samples import CHALLENGE_RESPONSE, PROFILES, RECOMMENDATIONS_RESPONSE
+
+
+def _client(app, username: str):
+    """A test client with a registered session."""
+    client = app.test_client()
+    response = client.post('/api/register', json={'username': username})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return client
+
+
+def _scenarios(footprint: Dict) -> Dict[str, Tuple[str, str, Dict]]:
+    """name -> (method, path, json body)"""
+    return {
+        'calculate-footprint': ('POST', '/api/calculate-footprint', {'inputs': PROFILES[1]}),
+        'analyze': ('POST', '/api/analyze', {'footprint': footprint}),
+        'recommendations': ('POST', '/api/recommendations', {
+            'footprint': footprint, 'analysis': 'Transport dominates.'
+        }),
+        'challenge': ('POST', '/api/challenge', {
+            'footprint': footprint, 'recommendations': RECOMMENDATIONS_RESPONSE
+        }),
+        'assessment': ('POST', '/api/assessment', {'footprint': footprint}),
+        'chat': ('POST', '/api/chat', {
+            'message': 'How can I cut my commute emissions?', 'footprint_profile': footprint
+        }),
+        'user-history': ('GET', '/api/user-history', None),
+        'leaderboard': ('GET', '/api/leaderboard', None),
+    }
+
+
+def _request(client, method: str, path: str, body) -> Callable[[], None]:
+    def call():
+        response = client.open(path, method=method, json=body)
+        response.get_data()
+        response.close()
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {path} -> {response.status_code}: {response.get_data(as_text=True)}")
+    return call
+
+
+def _run_concurrent(make_call: Callable[[int], Callable[[], None]], requests: int, concurrency: int) -> Dict[str, float]:
+    """Run `requests` calls spread over `concurrency` threads (one client each)."""
+    latencies: List[float] = []
+    lock = threading.Lock()
+    per_thread = max(requests // concurrency, 1)
+
+    def worker(index: int):
+        call = make_call(index)
+        local = []
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            call()
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='Stub Gemini latency (seconds)')
+    parser.add_argument('--db-latency', type=float, default=0.005, help='Fake Supabase latency per query (seconds)')
+    parser.add_argument('--requests', type=int, default=40, help='Requests per route and mode')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--routes', help='Comma-separated subset of routes to run')
+    parser.add_argument('--output', help='Write JSON results to this file')
+    args = parser.parse_args()
+
+    from benchmarks.fakes import install_fakes
+    app_ui, backends = install_fakes(
+        llm_latency=args.llm_latency,
+        db_latency=args.db_latency,
+        llm_text=CHALLENGE_RESPONSE
+    )
+    app = app_ui.app
+
+    try:
+        setup = _client(app, 'bench-setup')
+        footprint = setup.post('/api/calculate-footprint', json={'inputs': PROFILES[0]}).get_json()['footprint']
+        scenarios = _scenarios(footprint)
+        if args.routes:
+            wanted = set(args.routes.split(','))
+            scenarios = {name: spec for name, spec in scenarios.items() if name in wanted}
+
+        results = {}
+        for name, (method, path, body) in scenarios.items():
+            # Sequential latency on one client, then throughput across threads
+            call = _request(setup, method, path, body)
+            call()  # warm up
+            latencies = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                call()
+                latencies.append((time.perf_counter() - start) * 1000)
+            results[f'{name}.sequential'] = summarize(latencies)
+            print(format_row(f'{name}.sequential', results[f'{name}.sequential']))
+
+            clients = [_client(app, f'bench-user-{i}') for i in range(args.concurrency)]
+            results[f'{name}.concurrent'] = _run_concurrent(
+                lambda i: _request(clients[i], method, path, body),
+                args.requests,
+                args.concurrency
+            )
+            print(format_row(f'{name}.concurrent', results[f'{name}.concurrent']))
+    finally:
+        backends.close()
+
+    if args.output:
+        save_results(args.output, 'routes', results, {
+            'llm_latency': args.llm_latency,
+            'db_latency': args.db_latency,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+        })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark Comparison
+Diffs two result files written by the benchmark scripts (e.g. from two
+commits) and exits non-zero when any benchmark regressed beyond the
+threshold, so it can gate CI.
+
+Usage:
+    python -m benchmarks.compare data/bench/core-base.json data/bench/core.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List, Tuple
+
+# metric -> True when larger is better
+METRICS = {
+    'p50_ms': False,
+    'p95_ms': False,
+    'ops_per_sec': True,
+}
+
+
+def load(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def change_percent(before: float, after: float) -> float:
+    if before == 0:
+        return 0.0
+    return (after - before) / before * 100
+
+
+def compare(baseline: Dict, candidate: Dict, threshold: float) -> Tuple[List[str], List[str]]:
+    """
+    Compare matching benchmarks of two result documents.
+
+    Args:
+        baseline: Older result document
+        candidate: Newer result document
+        threshold: Percentage change (in the bad direction) counted as a regression
+
+    Returns:
+        Tuple of (report lines, regressions)
+    """
+    lines, regressions = [], []
+    before_results, after_results = baseline['results'], candidate['results']
+
+    for name in sorted(set(before_results) & set(after_results)):
+        before, after = before_results[name], after_results[name]
+        cells = []
+        for metric, higher_is_better in METRICS.items():
+            delta = change_percent(before[metric], after[metric])
+            worse = -delta if higher_is_better else delta
+            flag = ' !' if worse > threshold else ''
+            cells.append(f"{metric} {before[metric]:10.3f} -> {after[metric]:10.3f} ({delta:+6.1f}%){flag}")
+            if flag:
+                regressions.append(f"{name} {metric} {delta:+.1f}%")
+        lines.append(f"{name:<44} " + '  '.join(cells))
+
+    for name in sorted(set(before_results) - set(after_results)):
+        lines.append(f"{name:<44} only in baseline")
+    for name in sorted(set(after_results) - set(before_results)):
+        lines.append(f"{name:<44} only in candidate")
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('baseline', help='Result file from the reference commit')
+    parser.add_argument('candidate', help='Result file from the commit under test')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Regression threshold in percent')
+    args = parser.parse_args()
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    if baseline.get('config') != candidate.get('config'):
+        print(f"warning: configs differ: {baseline.get('config')} vs {candidate.get('config')}")
+    print(f"baseline {baseline.get('commit')}  candidate {candidate.get('commit')}")
+
+    lines, regressions = compare(baseline, candidate, args.threshold)
+    for line in lines:
+        print(line)
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0f}%:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"\nno regressions above {args.threshold:.0f}%")
+
+
+if __name__ == '__main__':
+    main()
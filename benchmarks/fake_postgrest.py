@@ -0,0 +1,207 @@
+"""
+Fake Supabase REST Server
+Local HTTP server speaking the subset of the PostgREST protocol that
+supabase-py sends for our tables (/rest/v1/<table> and /rest/v1/rpc/<name>),
+backed by the InMemoryDatabase from benchmarks/fakes.py. Latency, error rate
+and 429 injection are configurable so load tests can exercise the real
+client, connection handling and error paths with no network.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from benchmarks.fakes import InMemoryDatabase
+
+REST_PREFIX = '/rest/v1/'
+RPC_PREFIX = REST_PREFIX + 'rpc/'
+FILTER_OPS = ('eq', 'neq', 'lt', 'lte', 'gt', 'gte', 'in', 'is')
+# Query parameters that are not column filters
+RESERVED_PARAMS = ('select', 'order', 'limit', 'offset', 'columns', 'on_conflict')
+
+
+def _parse_value(raw: str) -> Any:
+    """Convert a PostgREST literal back to the Python value stored in the fake."""
+    if len(raw) >= 2 and raw[0] == raw[-1] == '"':
+        return raw[1:-1]
+    if raw in ('true', 'false'):
+        return raw == 'true'
+    if raw == 'null':
+        return None
+    for cast in (int, float):
+        try:
+            return cast(raw)
+        except ValueError:
+            pass
+    return raw
+
+
+def _split_top_level(raw: str) -> List[str]:
+    """Split on commas outside parentheses and double quotes."""
+    parts, depth, quoted, start = [], 0, False, 0
+    for index, char in enumerate(raw):
+        if char == '"':
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(raw[start:index])
+            start = index + 1
+    parts.append(raw[start:])
+    return [part for part in parts if part]
+
+
+def _parse_filter(column: str, value: str) -> Tuple[str, str, Any]:
+    op, _, raw = value.partition('.')
+    if op not in FILTER_OPS:
+        raise ValueError(f"Unsupported filter: {column}={value}")
+    if op == 'in':
+        return column, op, [_parse_value(item) for item in raw.strip('()').split(',') if item]
+    return column, op, _parse_value(raw)
+
+
+def _parse_logic(raw: str) -> List[List[Tuple[str, str, Any]]]:
+    """
+    Parse the body of an or=(...) filter into alternatives, each a list of
+    filters that must all hold: `a.lt.1,and(a.eq.1,b.lt.2)`.
+    """
+    alternatives = []
+    for part in _split_top_level(raw.strip()[1:-1]):
+        if part.startswith('and('):
+            alternatives.append([
+                _parse_filter(*item.split('.', 1)) for item in _split_top_level(part[3:][1:-1])
+            ])
+        else:
+            alternatives.append([_parse_filter(*part.split('.', 1))])
+    return alternatives
+
+
+def parse_query(query: str) -> Tuple[List[Tuple[str, str, Any]], List[Tuple[str, bool]], Optional[int], int]:
+    """
+    Parse a PostgREST query string.
+
+    Returns:
+        Tuple of (filters, order, limit, offset); order is a list of
+        (column, descending) pairs
+    """
+    filters, order, limit, offset = [], [], None, 0
+    for key, value in parse_qsl(query, keep_blank_values=True):
+        if key == 'order':
+            for term in value.split(','):
+                column, _, direction = term.partition('.')
+                order.append((column, direction.startswith('desc')))
+        elif key == 'limit':
+            limit = int(value)
+        elif key == 'offset':
+            offset = int(value)
+        elif key == 'or':
+            filters.append(('', 'or', _parse_logic(value)))
+        elif key in RESERVED_PARAMS:
+            continue
+        else:
+            filters.append(_parse_filter(key, value))
+    return filters, order, limit, offset
+
+
+def _make_handler(
+    database: InMemoryDatabase,
+    latency: float,
+    error_rate: float,
+    throttle_rate: float,
+    rng: random.Random
+):
+    class PostgrestHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def _send_json(self, status: int, payload: Any):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _handle(self, operation: str):
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length)) if length else None
+
+            if latency:
+                time.sleep(latency)
+            roll = rng.random()
+            if roll < throttle_rate:
+                return self._send_json(429, {'message': 'Too many requests', 'code': '429'})
+            if roll < throttle_rate + error_rate:
+                return self._send_json(503, {'message': 'Injected failure', 'code': 'PGRST000'})
+
+            url = urlsplit(self.path)
+            try:
+                if url.path.startswith(RPC_PREFIX):
+                    rows = database.rpc(url.path[len(RPC_PREFIX):], payload or {})
+                elif url.path.startswith(REST_PREFIX):
+                    filters, order, limit, offset = parse_query(url.query)
+                    rows = database.run(
+                        url.path[len(REST_PREFIX):], operation, payload,
+                        filters, order, limit, offset
+                    )
+                else:
+                    return self._send_json(404, {'message': f'Unknown path {url.path}'})
+            except (ValueError, RuntimeError) as e:
+                return self._send_json(400, {'message': str(e), 'code': 'PGRST100'})
+            self._send_json(201 if operation == 'insert' else 200, rows)
+
+        def do_GET(self):
+            self._handle('select')
+
+        def do_POST(self):
+            self._handle('insert')
+
+        def do_PATCH(self):
+            self._handle('update')
+
+        def do_DELETE(self):
+            self._handle('delete')
+
+        def log_message(self, format, *args):
+            pass
+
+    return PostgrestHandler
+
+
+def start_postgrest_server(
+    database: Optional[InMemoryDatabase] = None,
+    latency: float = 0.0,
+    error_rate: float = 0.0,
+    throttle_rate: float = 0.0,
+    seed: Optional[int] = None,
+    port: int = 0
+) -> Tuple[ThreadingHTTPServer, str, InMemoryDatabase]:
+    """
+    Start the fake PostgREST server on a background thread.
+
+    Args:
+        database: Backing tables (a fresh InMemoryDatabase by default)
+        latency: Seconds slept per request
+        error_rate: Fraction of requests answered with 503
+        throttle_rate: Fraction of requests answered with 429
+        seed: Seed for the failure injection
+
+    Returns:
+        Tuple of (server, SUPABASE_URL for create_client, database)
+    """
+    database = database or InMemoryDatabase()
+    handler = _make_handler(database, latency, error_rate, throttle_rate, random.Random(seed))
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    return server, f"http://{host}:{port}", database
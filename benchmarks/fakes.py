@@ -0,0 +1,305 @@
+"""
+In-Process Backend Fakes
+An in-memory stand-in for the Supabase tables used by app_ui (with
+configurable per-query latency), and helpers that point the Flask app at it
+and at the stub Gemini server.
+"""
+
+import copy
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.stub_llm import start_stub_server
+
+
+class FakeResponse:
+    """Mimics the postgrest APIResponse (only .data is used by the app)."""
+
+    __slots__ = ('data', 'count')
+
+    def __init__(self, data: List[Dict]):
+        self.data = data
+        self.count = len(data)
+
+
+class InMemoryDatabase:
+    """
+    Thread-safe tables of dict rows with the subset of PostgREST semantics
+    the app relies on: filters, ordering, limits, inserts returning rows,
+    updates and the leaderboard and profile-count RPCs.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        """
+        Args:
+            latency: Seconds slept per executed query (simulated round trip)
+        """
+        self.latency = latency
+        self.tables: Dict[str, List[Dict]] = defaultdict(list)
+        self.queries = 0
+        self._lock = threading.Lock()
+
+    def run(self, table: str, operation: str, payload: Any, filters: List[Tuple[str, str, Any]],
+            order: List[Tuple[str, bool]], limit: Optional[int], offset: int = 0) -> List[Dict]:
+        """Execute one query and return the affected or selected rows."""
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            self.queries += 1
+            rows = self.tables[table]
+
+            if operation == 'insert':
+                inserted = []
+                for row in payload if isinstance(payload, list) else [payload]:
+                    row = dict(row)
+                    row.setdefault('id', str(uuid.uuid4()))
+                    row.setdefault('created_at', datetime.utcnow().isoformat())
+                    rows.append(row)
+                    inserted.append(copy.deepcopy(row))
+                return inserted
+
+            matched = [row for row in rows if _matches(row, filters)]
+
+            if operation == 'update':
+                for row in matched:
+                    row.update(payload)
+                return copy.deepcopy(matched)
+            if operation == 'delete':
+                self.tables[table] = [row for row in rows if not _matches(row, filters)]
+                return matched
+
+            # Stable sorts, least significant column first
+            for column, desc in reversed(order):
+                matched.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+            end = offset + limit if limit is not None else None
+            return copy.deepcopy(matched[offset:end])
+
+    def rpc(self, name: str, params: Dict) -> List[Dict]:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.queries += 1
+            if name == 'top_profile_codes':
+                return _top_profile_codes(self.tables['footprints'], int(params.get('limit_count', 10)))
+            if name == 'accepted_challenge_counts':
+                return _accepted_challenge_counts(
+                    self.tables['challenges'], params.get('after_user'), int(params.get('limit_count', 1000))
+                )
+            if name != 'leaderboard_accepted_challenges':
+                raise RuntimeError(f"Unknown RPC: {name}")
+            counts: Dict[str, int] = defaultdict(int)
+            for row in self.tables['challenges']:
+                if row.get('accepted'):
+                    counts[row['user_id']] += 1
+            names = {row['id']: row['username'] for row in self.tables['users']}
+            board = [
+                {'username': names.get(user_id, user_id), 'accepted_count': count}
+                for user_id, count in counts.items()
+            ]
+            board.sort(key=lambda row: -row['accepted_count'])
+            return board[:int(params.get('limit_count', 10))]
+
+
+def _accepted_challenge_counts(rows: List[Dict], after_user: Optional[str], limit: int) -> List[Dict]:
+    counts: Dict[str, int] = defaultdict(int)
+    for row in rows:
+        if row.get('accepted') and row.get('user_id') and (after_user is None or row['user_id'] > after_user):
+            counts[row['user_id']] += 1
+    return [{'user_id': user_id, 'accepted_count': counts[user_id]} for user_id in sorted(counts)[:limit]]
+
+
+def _top_profile_codes(rows: List[Dict], limit: int) -> List[Dict]:
+    counts: Dict[int, int] = defaultdict(int)
+    for row in rows:
+        if row.get('profile_code') is not None:
+            counts[row['profile_code']] += 1
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return [{'profile_code': code, 'footprint_count': count} for code, count in ranked[:limit]]
+
+
+def _matches(row: Dict, filters: List[Tuple[str, str, Any]]) -> bool:
+    for column, op, value in filters:
+        if op == 'or':
+            if not any(_matches(row, alternative) for alternative in value):
+                return False
+            continue
+        current = row.get(column)
+        if op == 'eq' and current != value:
+            return False
+        if op == 'neq' and current == value:
+            return False
+        if op == 'in' and current not in value:
+            return False
+        if op == 'is' and current is not value:
+            return False
+        if op in ('lt', 'lte', 'gt', 'gte'):
+            if current is None:
+                return False
+            if op == 'lt' and not current < value:
+                return False
+            if op == 'lte' and not current <= value:
+                return False
+            if op == 'gt' and not current > value:
+                return False
+            if op == 'gte' and not current >= value:
+                return False
+    return True
+
+
+class FakeQuery:
+    """Chainable query builder mirroring supabase-py's table() API."""
+
+    def __init__(self, db: InMemoryDatabase, table: str):
+        self._db = db
+        self._table = table
+        self._operation = 'select'
+        self._payload: Any = None
+        self._filters: List[Tuple[str, str, Any]] = []
+        self._order: List[Tuple[str, bool]] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+
+    def select(self, *columns, **kwargs) -> 'FakeQuery':
+        self._operation = 'select'
+        return self
+
+    def insert(self, rows: Any, **kwargs) -> 'FakeQuery':
+        self._operation, self._payload = 'insert', rows
+        return self
+
+    def upsert(self, rows: Any, **kwargs) -> 'FakeQuery':
+        return self.insert(rows)
+
+    def update(self, values: Dict, **kwargs) -> 'FakeQuery':
+        self._operation, self._payload = 'update', values
+        return self
+
+    def delete(self, **kwargs) -> 'FakeQuery':
+        self._operation = 'delete'
+        return self
+
+    def _filter(self, column: str, op: str, value: Any) -> 'FakeQuery':
+        self._filters.append((column, op, value))
+        return self
+
+    def eq(self, column: str, value: Any) -> 'FakeQuery':
+        return self._filter(column, 'eq', value)
+
+    def neq(self, column: str, value: Any) -> 'FakeQuery':
+        return self._filter(column, 'neq', value)
+
+    def lt(self, column: str, value: Any) -> 'FakeQuery':
+        return self._filter(column, 'lt', value)
+
+    def lte(self, column: str, value: Any) -> 'FakeQuery':
+        return self._filter(column, 'lte', value)
+
+    def gt(self, column: str, value: Any) -> 'FakeQuery':
+        return self._filter(column, 'gt', value)
+
+    def gte(self, column: str, value: Any) -> 'FakeQuery':
+        return self._filter(column, 'gte', value)
+
+    def is_(self, column: str, value: Any) -> 'FakeQuery':
+        return self._filter(column, 'is', None if value in (None, 'null') else value)
+
+    def in_(self, column: str, values: List[Any]) -> 'FakeQuery':
+        return self._filter(column, 'in', list(values))
+
+    def or_(self, filters: str, **kwargs) -> 'FakeQuery':
+        from benchmarks.fake_postgrest import _parse_logic
+        return self._filter('', 'or', _parse_logic(f'({filters})'))
+
+    def order(self, column: str, desc: bool = False, **kwargs) -> 'FakeQuery':
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, count: int, **kwargs) -> 'FakeQuery':
+        self._limit = count
+        return self
+
+    def range(self, start: int, end: int) -> 'FakeQuery':
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    def execute(self) -> FakeResponse:
+        return FakeResponse(self._db.run(
+            self._table, self._operation, self._payload,
+            self._filters, self._order, self._limit, self._offset
+        ))
+
+
+class FakeRpc:
+    def __init__(self, db: InMemoryDatabase, name: str, params: Dict):
+        self._db, self._name, self._params = db, name, params
+
+    def execute(self) -> FakeResponse:
+        return FakeResponse(self._db.rpc(self._name, self._params))
+
+
+class FakeSupabase:
+    """Drop-in for supabase.Client backed by an InMemoryDatabase."""
+
+    def __init__(self, db: Optional[InMemoryDatabase] = None, latency: float = 0.0):
+        self.db = db or InMemoryDatabase(latency)
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self.db, name)
+
+    def rpc(self, name: str, params: Optional[Dict] = None, **kwargs) -> FakeRpc:
+        return FakeRpc(self.db, name, params or {})
+
+
+class FakeBackends:
+    """Handles to the fakes installed by install_fakes()."""
+
+    def __init__(self, server, base_url: str, database: InMemoryDatabase):
+        self.server = server
+        self.base_url = base_url
+        self.database = database
+
+    def close(self):
+        from agents import llm_client
+        llm_client.reset_clients()
+        self.server.shutdown()
+
+
+def install_fakes(llm_latency: float = 0.0, db_latency: float = 0.0, llm_text: Optional[str] = None):
+    """
+    Point the environment (and app_ui, imported here) at local fakes.
+
+    Must run before app_ui is imported anywhere else, since the app reads
+    its configuration at import time.
+
+    Returns:
+        Tuple of (app_ui module, FakeBackends)
+    """
+    import os
+
+    kwargs = {'latency': llm_latency}
+    if llm_text is not None:
+        kwargs['text'] = llm_text
+    server, base_url = start_stub_server(**kwargs)
+
+    os.environ['GEMINI_API_KEY'] = 'benchmark-key'
+    os.environ['GEMINI_BASE_URL'] = base_url
+    os.environ['SUPABASE_URL'] = 'http://127.0.0.1:9'
+    os.environ['SUPABASE_KEY'] = 'benchmark-key'
+    # Measure the uncached path unless a benchmark opts in
+    os.environ.setdefault('LLM_CACHE_ENABLED', 'false')
+    # The production Gemini quota would dominate; override to study it
+    os.environ.setdefault('GEMINI_RATE_PER_SECOND', '10000')
+    os.environ.setdefault('GEMINI_BURST', '10000')
+    os.environ.setdefault('GEMINI_MAX_CONCURRENCY', '1000')
+
+    import app_ui
+    from utils.supabase_metrics import InstrumentedSupabase
+
+    database = InMemoryDatabase(db_latency)
+    app_ui.supabase.set(InstrumentedSupabase(FakeSupabase(database)))
+    return app_ui, FakeBackends(server, base_url, database)
@@ -0,0 +1,118 @@
+"""
+Benchmark Harness
+Timing loop, latency summaries and JSON result files shared by the
+benchmark scripts; benchmarks/compare.py diffs two result files.
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies_ms: List[float], elapsed: Optional[float] = None) -> Dict[str, float]:
+    """
+    Summarize per-operation latencies.
+
+    Args:
+        latencies_ms: One latency per operation, in milliseconds
+        elapsed: Wall-clock seconds for the whole run (for throughput);
+            defaults to the sum of latencies (sequential runs)
+    """
+    values = sorted(latencies_ms)
+    elapsed = elapsed if elapsed is not None else sum(values) / 1000
+    return {
+        'count': len(values),
+        'mean_ms': statistics.mean(values) if values else 0.0,
+        'p50_ms': percentile(values, 0.50),
+        'p95_ms': percentile(values, 0.95),
+        'p99_ms': percentile(values, 0.99),
+        'min_ms': values[0] if values else 0.0,
+        'max_ms': values[-1] if values else 0.0,
+        'ops_per_sec': len(values) / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def measure(
+    func: Callable[[], Any],
+    iterations: int = 1000,
+    warmup: int = 10,
+    min_time: float = 0.0
+) -> Dict[str, float]:
+    """
+    Time `func` repeatedly.
+
+    Args:
+        func: Zero-argument callable to time
+        iterations: Timed calls (at least)
+        warmup: Untimed calls first (imports, caches, connections)
+        min_time: Keep going until this many seconds have been timed
+    """
+    for _ in range(warmup):
+        func()
+
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < iterations or time.perf_counter() - started < min_time:
+        start = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def format_row(name: str, stats: Dict[str, float]) -> str:
+    return (
+        f"{name:<44} p50 {stats['p50_ms']:9.3f} ms  p95 {stats['p95_ms']:9.3f} ms  "
+        f"p99 {stats['p99_ms']:9.3f} ms  {stats['ops_per_sec']:11.1f} ops/s"
+    )
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(path: str, suite: str, results: Dict[str, Dict[str, float]], config: Dict[str, Any]):
+    """
+    Write results as JSON with enough metadata to compare runs.
+
+    Args:
+        path: Output file
+        suite: Benchmark suite name
+        results: {benchmark name: summarize() output}
+        config: Parameters the run used (latencies, iterations, ...)
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    document = {
+        'suite': suite,
+        'commit': _git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'config': config,
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+    print(f"results written to {path}")
@@ -0,0 +1,414 @@
+"""
+Load Test
+Runs app_ui.app under a real threaded WSGI server and drives it with
+virtual users that follow the dashboard.js flow (register, calculate,
+the streamed /api/assessment, accept, streamed chat, leaderboard). A small
+share of visits (`--step-fallback-rate`) take the older per-step path:
+streamed analysis, recommendations, then challenge. Gemini and Supabase are replaced by local HTTP stand-ins
+(benchmarks/stub_llm.py and benchmarks/fake_postgrest.py) with configurable
+latency, error rate and 429 injection, so nothing leaves the machine.
+
+Each stage runs at a higher concurrency and reports p50/p95/p99 latency,
+error rate and throughput overall and per step. `--server asgi` serves
+app_asgi.app with Hypercorn instead, for comparing the two serving modes.
+
+The app runs in a child process so the load generator does not share its
+GIL; the stand-ins run in this process, which reports the database totals.
+
+Usage:
+    python -m benchmarks.load_test --stages 1,4,16,32 --duration 20 \\
+        --llm-latency 0.8 --llm-429-rate 0.02 --db-latency 0.02 --output data/bench/load.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.harness import format_row, save_results, summarize
+from benchmarks.samples import CHALLENGE_RESPONSE, PROFILES
+
+CHAT_MESSAGES = [
+    'How can I cut my commute emissions?',
+    'Is switching to a plant-based diet worth it?',
+    'What is the easiest change I can make this week?',
+    'How much does recycling actually help?',
+]
+
+
+class VirtualUser:
+    """One browser session: a keep-alive connection and the session cookie."""
+
+    def __init__(self, host: str, port: int, rng: random.Random, timeout: float = 60.0):
+        self.host = host
+        self.port = port
+        self.rng = rng
+        self.timeout = timeout
+        self.cookie: Optional[str] = None
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def request(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, bytes]:
+        headers = {'Accept': 'application/json, text/event-stream'}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed an idle keep-alive connection; retry once on a fresh one
+                self.close()
+                if attempt:
+                    raise
+
+        set_cookie = response.getheader('Set-Cookie')
+        if set_cookie:
+            self.cookie = set_cookie.split(';', 1)[0]
+        if response.getheader('Connection', '').lower() == 'close':
+            self.close()
+        return response.status, data
+
+    def json(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[bool, Dict]:
+        status, data = self.request(method, path, body)
+        try:
+            document = json.loads(data) if data else {}
+        except ValueError:
+            document = {}
+        return status < 400, document
+
+    def sse(self, path: str, body: Dict) -> Tuple[bool, Dict]:
+        """POST to a streaming endpoint; returns (ok, payload of the final event)."""
+        ok, events = self.sse_events(path, body)
+        event, payload = None, {}
+        for name, data in events:
+            if name in ('done', 'error'):
+                event, payload = name, data
+        return ok and event == 'done', payload
+
+    def assessment(self, body: Dict) -> Tuple[bool, Dict]:
+        """
+        POST to the streamed /api/assessment; returns (ok, payloads by stage).
+        Not ok if the stream did not finish or any stage failed.
+        """
+        ok, events = self.sse_events('/api/assessment?stream=1', body)
+        stages = {data.get('stage'): data for name, data in events if name == 'stage'}
+        finished = any(name == 'done' for name, _ in events)
+        return ok and finished and all(data.get('success') for data in stages.values()), stages
+
+    def sse_events(self, path: str, body: Dict) -> Tuple[bool, List[Tuple[str, Dict]]]:
+        """POST to a streaming endpoint; returns (ok, [(event, payload), ...])."""
+        status, data = self.request('POST', path, body)
+        if status >= 400:
+            return False, []
+        events = []
+        for block in data.decode('utf-8').split('\n\n'):
+            name, text = 'message', ''
+            for line in block.split('\n'):
+                if line.startswith('event:'):
+                    name = line[6:].strip()
+                elif line.startswith('data:'):
+                    text += line[5:].strip()
+            if text:
+                events.append((name, json.loads(text)))
+        return True, events
+
+
+def run_scenario(user: VirtualUser, record, username: str, chat_turns: int,
+                 accept_rate: float, think_time: float, step_fallback_rate: float = 0.0):
+    """
+    One visit, mirroring main.js and dashboard.js. Steps whose inputs are
+    missing after an earlier failure are skipped, as the UI would.
+
+    Args:
+        record: Callable(step, latency_ms, ok)
+        step_fallback_rate: Fraction of visits using the per-step AI routes
+            instead of /api/assessment
+    """
+    rng = user.rng
+
+    def step(name, func, *args):
+        if think_time:
+            time.sleep(rng.uniform(0, 2 * think_time))
+        start = time.perf_counter()
+        try:
+            ok, payload = func(*args)
+        except (OSError, http.client.HTTPException):
+            user.close()
+            ok, payload = False, {}
+        record(name, (time.perf_counter() - start) * 1000, ok)
+        return ok, payload
+
+    user.cookie = None
+    ok, _ = step('register', user.json, 'POST', '/api/register', {'username': username})
+    if not ok:
+        return
+    step('dashboard', lambda: (user.request('GET', '/dashboard')[0] < 400, {}))
+
+    ok, data = step('calculate-footprint', user.json, 'POST', '/api/calculate-footprint',
+                    {'inputs': rng.choice(PROFILES)})
+    footprint = data.get('footprint')
+    if not footprint:
+        return
+
+    if rng.random() >= step_fallback_rate:
+        ok, stages = step('assessment-stream', user.assessment, {'footprint': footprint})
+        data = stages.get('challenge', {})
+    else:
+        ok, data = step('analyze-stream', user.sse, '/api/analyze/stream', {'footprint': footprint})
+        # The dashboard falls back to a static analysis when the AI call fails
+        analysis = data.get('analysis') or 'Transport is the largest contributor.'
+
+        ok, data = step('recommendations', user.json, 'POST', '/api/recommendations',
+                        {'footprint': footprint, 'analysis': analysis})
+        recommendations = data.get('recommendations')
+
+        data = {}
+        if recommendations:
+            ok, data = step('challenge', user.json, 'POST', '/api/challenge',
+                            {'footprint': footprint, 'recommendations': recommendations})
+
+    challenge = data.get('challenge')
+    if data.get('challenge_id') and rng.random() < accept_rate:
+        step('challenge-accept', user.json, 'POST', '/api/challenge/accept',
+             {'challenge_id': data['challenge_id']})
+
+    for _ in range(chat_turns):
+        step('chat-stream', user.sse, '/api/chat/stream', {
+            'message': rng.choice(CHAT_MESSAGES),
+            'footprint_profile': footprint,
+            'current_challenge': challenge.get('title') if challenge else None,
+        })
+
+    step('leaderboard', user.json, 'GET', '/api/leaderboard')
+
+
+def run_stage(host: str, port: int, concurrency: int, duration: float, args, seed: int) -> Dict[str, Dict]:
+    """Run `concurrency` virtual users for `duration` seconds."""
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    scenarios = [0]
+    lock = threading.Lock()
+
+    def record(step: str, latency_ms: float, ok: bool):
+        with lock:
+            latencies[step].append(latency_ms)
+            if not ok:
+                errors[step] += 1
+
+    deadline = time.perf_counter() + duration
+
+    def worker(index: int):
+        user = VirtualUser(host, port, random.Random(seed * 1000 + index), timeout=args.timeout)
+        iteration = 0
+        try:
+            while time.perf_counter() < deadline:
+                run_scenario(user, record, f'load-c{concurrency}-u{index}-{iteration}',
+                             args.chat_turns, args.accept_rate, args.think_time, args.step_fallback_rate)
+                iteration += 1
+                with lock:
+                    scenarios[0] += 1
+        finally:
+            user.close()
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    all_latencies = [value for values in latencies.values() for value in values]
+    results['all'] = summarize(all_latencies, elapsed)
+    results['all']['errors'] = sum(errors.values())
+    results['all']['scenarios_per_sec'] = scenarios[0] / elapsed if elapsed > 0 else 0.0
+    for step, values in latencies.items():
+        results[step] = summarize(values, elapsed)
+        results[step]['errors'] = errors[step]
+    return results
+
+
+def serve_app(server: str, port: int):
+    """Child process entry: serve app_ui (werkzeug threads) or app_asgi (Hypercorn)."""
+    if server == 'asgi':
+        import asyncio
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config
+        import app_asgi
+
+        config = Config()
+        config.bind = [f'127.0.0.1:{port}']
+        config.accesslog = None
+        asyncio.run(serve(app_asgi.app, config))
+        return
+
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    import app_ui
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    make_server('127.0.0.1', port, app_ui.app, threaded=True, request_handler=QuietHandler).serve_forever()
+
+
+class AppProcess:
+    """
+    The app under test in its own process, so the virtual users and the
+    stand-in servers do not compete with it for the GIL.
+    """
+
+    def __init__(self, server: str, env: Dict[str, str]):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            self.port = probe.getsockname()[1]
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'benchmarks.load_test', '--serve', server, '--port', str(self.port)],
+            cwd=root,
+            env=env
+        )
+
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=1).close()
+                return
+            except OSError:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.shutdown()
+                    raise RuntimeError(f"{server} app did not start on port {self.port}")
+                time.sleep(0.1)
+
+    def shutdown(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--server', choices=('wsgi', 'asgi'), default='wsgi',
+                        help='Serve app_ui (werkzeug threads) or app_asgi (Hypercorn)')
+    parser.add_argument('--stages', default='1,4,16', help='Comma-separated virtual-user counts')
+    parser.add_argument('--duration', type=float, default=15.0, help='Seconds per stage')
+    parser.add_argument('--think-time', type=float, default=0.0, help='Mean pause between steps (seconds)')
+    parser.add_argument('--chat-turns', type=int, default=2)
+    parser.add_argument('--accept-rate', type=float, default=0.5, help='Fraction of challenges accepted')
+    parser.add_argument('--step-fallback-rate', type=float, default=0.1,
+                        help='Fraction of visits using the per-step AI routes instead of /api/assessment')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Client timeout per request (seconds)')
+    parser.add_argument('--llm-latency', type=float, default=0.5)
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--llm-429-rate', type=float, default=0.0)
+    parser.add_argument('--llm-rate', type=float,
+                        help='Override GEMINI_RATE_PER_SECOND/GEMINI_BURST (default: configured quota)')
+    parser.add_argument('--db-latency', type=float, default=0.01)
+    parser.add_argument('--db-error-rate', type=float, default=0.0)
+    parser.add_argument('--db-429-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Write JSON results to this file')
+    parser.add_argument('--serve', choices=('wsgi', 'asgi'), help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve_app(args.serve, args.port)
+
+    from benchmarks.fake_postgrest import start_postgrest_server
+    from benchmarks.stub_llm import start_stub_server
+
+    llm_server, llm_url = start_stub_server(
+        latency=args.llm_latency,
+        text=CHALLENGE_RESPONSE,
+        error_rate=args.llm_error_rate,
+        throttle_rate=args.llm_429_rate,
+        seed=args.seed
+    )
+    db_server, db_url, database = start_postgrest_server(
+        latency=args.db_latency,
+        error_rate=args.db_error_rate,
+        throttle_rate=args.db_429_rate,
+        seed=args.seed
+    )
+
+    env = dict(
+        os.environ,
+        GEMINI_API_KEY='load-test-key',
+        GEMINI_BASE_URL=llm_url,
+        SUPABASE_URL=db_url,
+        SUPABASE_KEY='load-test-key'
+    )
+    env.setdefault('LLM_CACHE_ENABLED', 'false')
+    if args.llm_rate:
+        env['GEMINI_RATE_PER_SECOND'] = str(args.llm_rate)
+        env['GEMINI_BURST'] = str(max(int(args.llm_rate), 1))
+
+    app_server = AppProcess(args.server, env)
+    host, port = '127.0.0.1', app_server.port
+    print(f"{args.server} app on http://{host}:{port}  gemini stub {llm_url}  postgrest {db_url}")
+
+    results = {}
+    try:
+        # One unrecorded visit pays for the lazy imports and first connections
+        warmup = VirtualUser(host, port, random.Random(args.seed), timeout=args.timeout)
+        run_scenario(warmup, lambda *unused: None, 'load-warmup', args.chat_turns, 1.0, 0.0)
+        run_scenario(warmup, lambda *unused: None, 'load-warmup-steps', args.chat_turns, 1.0, 0.0, 1.0)
+        warmup.close()
+
+        for stage, concurrency in enumerate(int(value) for value in args.stages.split(',')):
+            stage_results = run_stage(host, port, concurrency, args.duration, args, args.seed + stage)
+            overall = stage_results['all']
+            print(
+                f"\n== {concurrency} virtual users: {overall['count']} requests, "
+                f"{overall['ops_per_sec']:.1f} req/s, {overall['scenarios_per_sec']:.2f} visits/s, "
+                f"{overall['errors']} errors ({overall['errors'] / max(overall['count'], 1):.1%})"
+            )
+            for step, stats in stage_results.items():
+                print(format_row(f"{step} ({stats['errors']} err)", stats))
+                results[f'c{concurrency}.{step}'] = stats
+    finally:
+        app_server.shutdown()
+        llm_server.shutdown()
+        db_server.shutdown()
+
+    print(f"\ndatabase: {database.queries} queries, "
+          + ', '.join(f"{table}={len(rows)}" for table, rows in database.tables.items()))
+
+    if args.output:
+        save_results(args.output, 'load', results, {
+            key: value for key, value in vars(args).items() if key != 'output'
+        })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark Inputs
+Representative estimator inputs and LLM outputs, including pathological
+responses (huge, unstructured, marker-heavy) that stress the parsers.
+"""
+
+from typing import Dict, List
+
+
+PROFILES: List[Dict[str, str]] = [
+    {
+        'transport_mode': 'Car', 'vehicle_distance': 'High', 'electricity': 'High',
+        'diet': 'Non-Veg', 'air_travel': 'Frequent', 'waste': 'High',
+        'recycling': 'No', 'device_usage': 'High',
+    },
+    {
+        'transport_mode': 'Public', 'vehicle_distance': 'Medium', 'electricity': 'Medium',
+        'diet': 'Mixed', 'air_travel': 'Rare', 'waste': 'Medium',
+        'recycling': 'Yes', 'device_usage': 'Medium',
+    },
+    {
+        'transport_mode': 'Bike', 'vehicle_distance': 'Low', 'electricity': 'Low',
+        'diet': 'Veg', 'air_travel': 'Never', 'waste': 'Low',
+        'recycling': 'Yes', 'device_usage': 'Low',
+    },
+    # Partial input, as sent by a half-filled form
+    {'transport_mode': 'EV', 'diet': 'Mixed'},
+]
+
+CHALLENGE_RESPONSE = """**Challenge Title**: Car-Free Commute Week
+
+**What to do**: Replace at least three of your car commutes this week with public transit, cycling or carpooling. Plan the routes on Sunday evening so the switch is easy.
+
+**Why it matters**: Transport is your largest emission driver. Three car-free days can cut your weekly transport emissions by roughly 40%.
+
+**Success criteria**: Log each car-free commute in a note on your phone; aim for three or more by day seven."""
+
+RECOMMENDATIONS_RESPONSE = """Here are your prioritized recommendations:
+
+**Immediate Actions (Low Effort)**
+- Switch to public transit or carpooling twice a week
+- Set your thermostat 1°C lower in winter
+- Unplug devices on standby overnight
+
+**Medium-Term Changes (Moderate Effort)**
+- Try two plant-based days per week
+- Switch to a renewable electricity tariff
+
+**Long-Term Goals (Higher Effort)**
+- Consider an electric or hybrid vehicle at your next purchase
+- Replace one long-haul flight per year with rail travel"""
+
+PARSER_CASES: Dict[str, Dict[str, str]] = {
+    'realistic': {
+        'challenge': CHALLENGE_RESPONSE,
+        'recommendations': RECOMMENDATIONS_RESPONSE,
+    },
+    # No markdown markers at all: every line falls through every check
+    'unstructured': {
+        'challenge': ' '.join(['Try taking the bus more often this week.'] * 40),
+        'recommendations': '\n'.join(['You could consider cycling to work.'] * 200),
+    },
+    # ~200 KB response, e.g. a model that loops
+    'huge': {
+        'challenge': '\n'.join([CHALLENGE_RESPONSE] * 200),
+        'recommendations': '\n'.join([RECOMMENDATIONS_RESPONSE] * 200),
+    },
+    # Every line looks like a section header or keyword
+    'marker_heavy': {
+        'challenge': '\n'.join(
+            f"**Challenge Title**: T{i}\n**What to do**\n**Why it matters**\n**Success criteria**"
+            for i in range(500)
+        ),
+        'recommendations': '\n'.join(
+            f"**Immediate** low-effort {i}\n- act {i}\n**Medium** {i}" for i in range(500)
+        ),
+    },
+    'unicode': {
+        'challenge': CHALLENGE_RESPONSE.replace('commute', 'trajet 🚲 通勤'),
+        'recommendations': RECOMMENDATIONS_RESPONSE.replace('transit', 'Öffis 🚆'),
+    },
+    'empty': {
+        'challenge': '',
+        'recommendations': '',
+    },
+}
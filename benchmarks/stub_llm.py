@@ -0,0 +1,112 @@
+"""
+Stub Gemini Server
+Minimal local HTTP server that answers generateContent calls so agents can be
+exercised without network access or an API key. Errors and 429s can be
+injected at a configurable rate for load tests.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+
+STUB_TEXT = "**Challenge Title**: Stub\n\n**What to do**: Walk to work."
+
+
+def _response_json(text: str) -> bytes:
+    return json.dumps({
+        'candidates': [{
+            'content': {'role': 'model', 'parts': [{'text': text}]},
+            'finishReason': 'STOP'
+        }],
+        'usageMetadata': {'promptTokenCount': 10, 'candidatesTokenCount': 10}
+    }).encode('utf-8')
+
+
+def _error_json(code: int, status: str, message: str) -> bytes:
+    return json.dumps({
+        'error': {'code': code, 'message': message, 'status': status}
+    }).encode('utf-8')
+
+
+THROTTLED_BODY = _error_json(429, 'RESOURCE_EXHAUSTED', 'Resource has been exhausted (e.g. check quota).')
+ERROR_BODY = _error_json(500, 'INTERNAL', 'Injected failure.')
+
+
+def _make_handler(latency: float, text: str, error_rate: float = 0.0,
+                  throttle_rate: float = 0.0, rng: Optional[random.Random] = None):
+    rng = rng or random.Random()
+    body = _response_json(text)
+    # streamGenerateContent replies with one SSE event per word
+    words = text.split(' ')
+    chunks = [word + ' ' for word in words[:-1]] + words[-1:]
+    stream_body = b''.join(
+        b'data: ' + _response_json(chunk) + b'\r\n\r\n' for chunk in chunks
+    )
+
+    class StubHandler(BaseHTTPRequestHandler):
+        # HTTP/1.1 so clients can keep connections alive
+        protocol_version = 'HTTP/1.1'
+        # Headers and body are separate writes; avoid Nagle/delayed-ACK stalls
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            self.rfile.read(length)
+            if latency:
+                time.sleep(latency)
+            roll = rng.random()
+            if roll < throttle_rate:
+                return self._send(429, 'application/json', THROTTLED_BODY)
+            if roll < throttle_rate + error_rate:
+                return self._send(500, 'application/json', ERROR_BODY)
+            if 'streamGenerateContent' in self.path:
+                return self._send(200, 'text/event-stream', stream_body)
+            self._send(200, 'application/json', body)
+
+        def _send(self, status: int, content_type: str, payload: bytes):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def start_stub_server(
+    latency: float = 0.0,
+    text: str = STUB_TEXT,
+    port: int = 0,
+    error_rate: float = 0.0,
+    throttle_rate: float = 0.0,
+    seed: Optional[int] = None
+) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Start the stub server on a background thread.
+
+    Args:
+        latency: Seconds slept per request
+        text: Response text
+        port: Port to bind (0 picks a free one)
+        error_rate: Fraction of requests answered with 500
+        throttle_rate: Fraction of requests answered with 429 RESOURCE_EXHAUSTED
+        seed: Seed for the failure injection
+
+    Returns:
+        Tuple of (server, base_url)
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), _make_handler(
+        latency, text, error_rate, throttle_rate, random.Random(seed)
+    ))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    return server, f"http://{host}:{port}/"
@@ -0,0 +1,182 @@
+"""
+Curated climate action catalog for the template (non-LLM) agent.
+Keyed by estimator category and the lifestyle options each entry applies to.
+Wording follows the same principles as the prompts: encouraging,
+non-judgmental and realistic.
+"""
+
+# Why each category matters, used in the rule-based analysis
+DRIVER_NOTES = {
+    'transport_mode': "Everyday travel burns fuel on every trip, so the way you get around adds up quickly over a year.",
+    'vehicle_distance': "The further you travel, the more energy each week's journeys use, whatever the vehicle.",
+    'electricity': "Home electricity is often still generated from fossil fuels, so usage translates directly into emissions.",
+    'diet': "Meat and dairy take far more land, water and energy to produce than plant-based foods.",
+    'air_travel': "Flights are among the most carbon-intensive things a person can do; even a few trips a year make a big difference.",
+    'waste': "Waste sent to landfill releases methane, and everything thrown away carried emissions from being made.",
+    'recycling': "Recycling keeps materials in use and avoids the energy of producing new ones.",
+    'device_usage': "Devices draw power while in use and on standby, and the data centres behind them use energy too.",
+}
+
+# Actions per category: horizon is 'immediate', 'medium' or 'long';
+# options lists the lifestyle values the action suits
+ACTION_CATALOG = {
+    'transport_mode': [
+        {'horizon': 'immediate', 'options': ('Car',), 'impact': 'Medium',
+         'title': 'Swap one car trip a day',
+         'detail': 'Walk, cycle or take public transport for one short trip you would normally drive.'},
+        {'horizon': 'medium', 'options': ('Car',), 'impact': 'High',
+         'title': 'Build a car-free commute',
+         'detail': 'Try public transport, car-sharing or a bike for your commute two or three days a week.'},
+        {'horizon': 'long', 'options': ('Car',), 'impact': 'High',
+         'title': 'Plan your next vehicle',
+         'detail': 'When your car needs replacing, consider an electric vehicle or going car-light.'},
+        {'horizon': 'immediate', 'options': ('Public', 'EV'), 'impact': 'Low',
+         'title': 'Walk or cycle the short hops',
+         'detail': 'Use active travel for trips under 2 km instead of riding or driving.'},
+        {'horizon': 'medium', 'options': ('EV',), 'impact': 'Medium',
+         'title': 'Charge off-peak or on green power',
+         'detail': 'Schedule charging overnight or on a renewable electricity tariff.'},
+    ],
+    'vehicle_distance': [
+        {'horizon': 'immediate', 'options': ('High', 'Medium'), 'impact': 'Medium',
+         'title': 'Combine your errands',
+         'detail': 'Group errands into one round trip instead of several separate journeys.'},
+        {'horizon': 'medium', 'options': ('High',), 'impact': 'High',
+         'title': 'Work from home when you can',
+         'detail': 'Agree one or two remote working days a week to cut commuting distance.'},
+        {'horizon': 'long', 'options': ('High',), 'impact': 'High',
+         'title': 'Live closer to daily needs',
+         'detail': 'When you next move, weigh distance to work, schools and shops.'},
+    ],
+    'electricity': [
+        {'horizon': 'immediate', 'options': ('High', 'Medium'), 'impact': 'Low',
+         'title': 'Switch off standby power',
+         'detail': 'Turn appliances off at the wall and unplug chargers when they are not in use.'},
+        {'horizon': 'medium', 'options': ('High', 'Medium'), 'impact': 'High',
+         'title': 'Move to a renewable tariff',
+         'detail': 'Switch to a green electricity supplier and replace remaining bulbs with LEDs.'},
+        {'horizon': 'long', 'options': ('High',), 'impact': 'High',
+         'title': 'Upgrade heating and insulation',
+         'detail': 'Consider insulation, a heat pump or rooftop solar when you next renovate.'},
+    ],
+    'diet': [
+        {'horizon': 'immediate', 'options': ('Non-Veg', 'Mixed'), 'impact': 'Medium',
+         'title': 'Try meat-free days',
+         'detail': 'Make two days this week fully plant-based.'},
+        {'horizon': 'medium', 'options': ('Non-Veg', 'Mixed'), 'impact': 'High',
+         'title': 'Swap red meat for lower-impact proteins',
+         'detail': 'Replace beef and lamb with poultry, beans, lentils or tofu in your regular meals.'},
+        {'horizon': 'long', 'options': ('Non-Veg', 'Mixed'), 'impact': 'High',
+         'title': 'Make plant-based your default',
+         'detail': 'Build a repertoire of favourite vegetarian meals so meat becomes the occasional choice.'},
+        {'horizon': 'immediate', 'options': ('Veg',), 'impact': 'Low',
+         'title': 'Cut food waste',
+         'detail': 'Plan meals for the week and use up leftovers before buying more.'},
+    ],
+    'air_travel': [
+        {'horizon': 'immediate', 'options': ('Frequent', 'Rare'), 'impact': 'Medium',
+         'title': 'Replace one flight with a call',
+         'detail': 'Turn your next work trip into a video call, or check whether a train covers the route.'},
+        {'horizon': 'medium', 'options': ('Frequent',), 'impact': 'High',
+         'title': 'Set a yearly flight budget',
+         'detail': 'Decide how many flights you will take this year and fly economy and direct.'},
+        {'horizon': 'long', 'options': ('Frequent', 'Rare'), 'impact': 'High',
+         'title': 'Holiday closer to home',
+         'detail': 'Plan holidays you can reach by train or coach.'},
+    ],
+    'waste': [
+        {'horizon': 'immediate', 'options': ('High', 'Medium'), 'impact': 'Low',
+         'title': 'Carry reusables',
+         'detail': 'Bring a bottle, cup and shopping bag so you can refuse single-use items.'},
+        {'horizon': 'medium', 'options': ('High', 'Medium'), 'impact': 'Medium',
+         'title': 'Start composting',
+         'detail': 'Compost food scraps at home or use a local food waste collection.'},
+        {'horizon': 'long', 'options': ('High',), 'impact': 'Medium',
+         'title': 'Buy less, buy to last',
+         'detail': 'Choose durable, repairable and second-hand products.'},
+    ],
+    'recycling': [
+        {'horizon': 'immediate', 'options': ('No',), 'impact': 'Low',
+         'title': 'Set up a recycling corner',
+         'detail': 'Put a separate bin for paper, glass, cans and plastics next to your main one.'},
+    ],
+    'device_usage': [
+        {'horizon': 'immediate', 'options': ('High', 'Medium'), 'impact': 'Low',
+         'title': 'Turn on power saving',
+         'detail': 'Use power-saving modes, lower screen brightness and shut devices down overnight.'},
+        {'horizon': 'medium', 'options': ('High', 'Medium'), 'impact': 'Low',
+         'title': 'Stream smarter',
+         'detail': 'Download instead of re-streaming and choose standard definition on small screens.'},
+        {'horizon': 'long', 'options': ('High',), 'impact': 'Medium',
+         'title': 'Keep devices longer',
+         'detail': 'Repair and keep phones and laptops for a few more years before upgrading.'},
+    ],
+}
+
+# One-Change Challenge per category, for the lifestyle options it suits
+CHALLENGE_CATALOG = {
+    'transport_mode': {
+        'options': ('Car',),
+        'title': 'Car-Free Commute Week',
+        'description': 'Replace at least three car journeys this week with walking, cycling or public transport.',
+        'impact': 'Every trip not driven avoids its fuel emissions entirely.',
+        'success_criteria': 'Three or more car-free journeys logged by day seven.',
+    },
+    'vehicle_distance': {
+        'options': ('High', 'Medium'),
+        'title': 'Errand Bundling Week',
+        'description': 'Plan your week so errands happen in one combined trip instead of several.',
+        'impact': 'Fewer, shorter journeys cut fuel use without changing where you go.',
+        'success_criteria': 'At most two errand trips this week.',
+    },
+    'electricity': {
+        'options': ('High', 'Medium'),
+        'title': 'Standby Slayer Week',
+        'description': 'Switch appliances off at the wall every night and unplug idle chargers.',
+        'impact': 'Standby power can be a tenth of household electricity use.',
+        'success_criteria': 'Everything switched off at the wall on all seven nights.',
+    },
+    'diet': {
+        'options': ('Non-Veg', 'Mixed'),
+        'title': 'Plant-Powered Week',
+        'description': 'Eat fully plant-based meals on at least three days this week.',
+        'impact': 'Plant-based meals typically have a fraction of the footprint of meat-based ones.',
+        'success_criteria': 'Three plant-based days completed by day seven.',
+    },
+    'air_travel': {
+        'options': ('Frequent', 'Rare'),
+        'title': 'Flight-Free Planning Week',
+        'description': 'Research a train or video-call alternative for your next planned flight.',
+        'impact': 'Avoiding a single flight can save more than months of everyday changes.',
+        'success_criteria': 'An alternative found and priced for your next trip.',
+    },
+    'waste': {
+        'options': ('High', 'Medium'),
+        'title': 'Zero Single-Use Week',
+        'description': 'Refuse single-use cups, bags and bottles by carrying reusables every day.',
+        'impact': 'Less waste means less landfill methane and fewer products made.',
+        'success_criteria': 'No single-use items accepted for seven days.',
+    },
+    'recycling': {
+        'options': ('No',),
+        'title': 'Recycling Reset Week',
+        'description': 'Set up a separate recycling bin and sort paper, glass, cans and plastics all week.',
+        'impact': 'Recycled materials need far less energy than new ones.',
+        'success_criteria': 'Recycling sorted every day for seven days.',
+    },
+    'device_usage': {
+        'options': ('High', 'Medium'),
+        'title': 'Digital Power-Down Week',
+        'description': 'Turn on power-saving modes and switch devices fully off every night.',
+        'impact': 'Devices left on standby or at full brightness draw power all day.',
+        'success_criteria': 'Devices shut down overnight on all seven nights.',
+    },
+}
+
+# Used when no category has a matching entry
+DEFAULT_CHALLENGE = {
+    'title': 'Climate Awareness Week',
+    'description': 'Each day, pick one everyday habit and choose its lower-carbon version.',
+    'impact': 'Small daily choices add up and build lasting habits.',
+    'success_criteria': 'Seven lower-carbon choices made by day seven.',
+}
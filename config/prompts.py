@@ -127,3 +127,15 @@ Context from conversation history:
 {chat_history}
 
 Please provide a helpful, encouraging response that addresses their question while considering their footprint profile."""
+
+
+# Rolling summary of older chat turns (conversation store compaction)
+CHAT_SUMMARY_PROMPT = """Summarize this conversation between a user and a climate action advisor so the advisor can continue it later.
+
+Existing summary:
+{previous_summary}
+
+New messages to fold in:
+{chat_history}
+
+Write one short paragraph (under 120 words) that merges the existing summary with the new messages. Keep the user's stated circumstances, constraints, goals, questions already answered and advice already given. Omit greetings and filler. Summary:"""
@@ -0,0 +1,24 @@
+-- Compact profile codes for footprints
+-- Run this in your Supabase SQL Editor, then fill existing rows with:
+--     python -m scripts.backfill_profile_codes
+--
+-- profile_code is CarbonEstimator.encode_profile(inputs): one mixed-radix
+-- digit per category, 5832 possible values, so it fits a SMALLINT. It is
+-- NULL when the inputs were incomplete.
+
+ALTER TABLE footprints ADD COLUMN IF NOT EXISTS profile_code SMALLINT
+    CHECK (profile_code >= 0);
+
+CREATE INDEX IF NOT EXISTS idx_footprints_profile_code ON footprints(profile_code);
+
+-- Most common profiles, counted from the index rather than the JSONB inputs
+CREATE OR REPLACE FUNCTION top_profile_codes(limit_count INTEGER DEFAULT 10)
+RETURNS TABLE (profile_code SMALLINT, footprint_count BIGINT)
+LANGUAGE sql STABLE AS $$
+    SELECT f.profile_code, COUNT(*) AS footprint_count
+    FROM footprints f
+    WHERE f.profile_code IS NOT NULL
+    GROUP BY f.profile_code
+    ORDER BY footprint_count DESC, f.profile_code
+    LIMIT limit_count;
+$$;
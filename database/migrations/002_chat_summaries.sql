@@ -0,0 +1,28 @@
+-- Rolling chat summaries
+-- Run this in your Supabase SQL Editor on a database created before
+-- summaries were persisted. Until it exists, the conversation store logs a
+-- warning and reloaded conversations start without their summary.
+--
+-- A user's summary folds every chat_history row up to summarized_through;
+-- a reload reads the summary plus the rows written after it.
+
+CREATE TABLE IF NOT EXISTS chat_summaries (
+    user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    summary TEXT NOT NULL,
+    summarized_through TIMESTAMP WITH TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE chat_summaries ENABLE ROW LEVEL SECURITY;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_policies
+        WHERE tablename = 'chat_summaries'
+          AND policyname = 'Allow all operations on chat_summaries'
+    ) THEN
+        CREATE POLICY "Allow all operations on chat_summaries" ON chat_summaries FOR ALL USING (true);
+    END IF;
+END
+$$;
@@ -0,0 +1,19 @@
+-- Keyset pagination indexes for /api/user-history/<table>
+-- Run on a database created before history pagination. CONCURRENTLY keeps
+-- the tables writable while the indexes build, but cannot run inside a
+-- transaction block: run the statements one at a time (e.g. with psql),
+-- not as a single SQL Editor batch.
+--
+-- A page is "WHERE user_id = ? AND (created_at, id) < cursor ORDER BY
+-- created_at DESC, id DESC", a range scan on these indexes at any depth.
+-- If a build fails it leaves an INVALID index: DROP INDEX CONCURRENTLY it
+-- and run the statement again.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_footprints_user_created_at
+    ON footprints(user_id, created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_challenges_user_created_at
+    ON challenges(user_id, created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chat_history_user_created_at
+    ON chat_history(user_id, created_at DESC, id DESC);
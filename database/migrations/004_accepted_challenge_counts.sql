@@ -0,0 +1,25 @@
+-- Leaderboard counts aggregated in the database
+-- Run this in your Supabase SQL Editor on a database created before the
+-- in-memory leaderboard. Each worker loads its per-user counts with this
+-- function at start-up and on every reconcile.
+--
+-- The index is built CONCURRENTLY, so run that statement on its own (e.g.
+-- with psql), not in the same batch as the function.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_challenges_accepted_user_id
+    ON challenges(user_id) WHERE accepted;
+
+-- Accepted challenges per user for the leaderboard, grouped in the database
+-- and paged by user_id (pass the last user_id of a page as after_user)
+CREATE OR REPLACE FUNCTION accepted_challenge_counts(after_user UUID DEFAULT NULL, limit_count INTEGER DEFAULT 1000)
+RETURNS TABLE (user_id UUID, accepted_count BIGINT)
+LANGUAGE sql STABLE AS $$
+    SELECT c.user_id, COUNT(*) AS accepted_count
+    FROM challenges c
+    WHERE c.accepted
+      AND c.user_id IS NOT NULL
+      AND (after_user IS NULL OR c.user_id > after_user)
+    GROUP BY c.user_id
+    ORDER BY c.user_id
+    LIMIT limit_count;
+$$;
@@ -14,6 +14,8 @@ CREATE TABLE IF NOT EXISTS footprints (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     user_id UUID REFERENCES users(id) ON DELETE CASCADE,
     inputs JSONB NOT NULL,
+    -- CarbonEstimator.encode_profile(inputs); NULL for incomplete inputs
+    profile_code SMALLINT CHECK (profile_code >= 0),
     total_score DECIMAL(10, 2) NOT NULL,
     level VARCHAR(50) NOT NULL,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
@@ -37,6 +39,15 @@ CREATE TABLE IF NOT EXISTS chat_history (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Rolling chat summary per user; chat_history rows up to summarized_through
+-- are folded into it
+CREATE TABLE IF NOT EXISTS chat_summaries (
+    user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    summary TEXT NOT NULL,
+    summarized_through TIMESTAMP WITH TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
 -- Create indexes for better query performance
 CREATE INDEX IF NOT EXISTS idx_footprints_user_id ON footprints(user_id);
 CREATE INDEX IF NOT EXISTS idx_footprints_created_at ON footprints(created_at DESC);
@@ -44,12 +55,49 @@ CREATE INDEX IF NOT EXISTS idx_challenges_user_id ON challenges(user_id);
 CREATE INDEX IF NOT EXISTS idx_challenges_created_at ON challenges(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_chat_history_user_id ON chat_history(user_id);
 CREATE INDEX IF NOT EXISTS idx_chat_history_created_at ON chat_history(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_footprints_profile_code ON footprints(profile_code);
+
+-- Keyset pagination of one user's rows, newest first (/api/user-history/<table>)
+CREATE INDEX IF NOT EXISTS idx_footprints_user_created_at ON footprints(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_challenges_user_created_at ON challenges(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_chat_history_user_created_at ON chat_history(user_id, created_at DESC, id DESC);
+
+-- Leaderboard counts scan only accepted challenges, in user_id order
+CREATE INDEX IF NOT EXISTS idx_challenges_accepted_user_id ON challenges(user_id) WHERE accepted;
+
+-- Most common profiles, counted from the index rather than the JSONB inputs
+CREATE OR REPLACE FUNCTION top_profile_codes(limit_count INTEGER DEFAULT 10)
+RETURNS TABLE (profile_code SMALLINT, footprint_count BIGINT)
+LANGUAGE sql STABLE AS $$
+    SELECT f.profile_code, COUNT(*) AS footprint_count
+    FROM footprints f
+    WHERE f.profile_code IS NOT NULL
+    GROUP BY f.profile_code
+    ORDER BY footprint_count DESC, f.profile_code
+    LIMIT limit_count;
+$$;
+
+-- Accepted challenges per user for the leaderboard, grouped in the database
+-- and paged by user_id (pass the last user_id of a page as after_user)
+CREATE OR REPLACE FUNCTION accepted_challenge_counts(after_user UUID DEFAULT NULL, limit_count INTEGER DEFAULT 1000)
+RETURNS TABLE (user_id UUID, accepted_count BIGINT)
+LANGUAGE sql STABLE AS $$
+    SELECT c.user_id, COUNT(*) AS accepted_count
+    FROM challenges c
+    WHERE c.accepted
+      AND c.user_id IS NOT NULL
+      AND (after_user IS NULL OR c.user_id > after_user)
+    GROUP BY c.user_id
+    ORDER BY c.user_id
+    LIMIT limit_count;
+$$;
 
 -- Enable Row Level Security (RLS)
 ALTER TABLE users ENABLE ROW LEVEL SECURITY;
 ALTER TABLE footprints ENABLE ROW LEVEL SECURITY;
 ALTER TABLE challenges ENABLE ROW LEVEL SECURITY;
 ALTER TABLE chat_history ENABLE ROW LEVEL SECURITY;
+ALTER TABLE chat_summaries ENABLE ROW LEVEL SECURITY;
 
 -- Create policies (adjust based on your authentication setup)
 -- For now, allow all operations (you should restrict based on user authentication)
@@ -57,3 +105,4 @@ CREATE POLICY "Allow all operations on users" ON users FOR ALL USING (true);
 CREATE POLICY "Allow all operations on footprints" ON footprints FOR ALL USING (true);
 CREATE POLICY "Allow all operations on challenges" ON challenges FOR ALL USING (true);
 CREATE POLICY "Allow all operations on chat_history" ON chat_history FOR ALL USING (true);
+CREATE POLICY "Allow all operations on chat_summaries" ON chat_summaries FOR ALL USING (true);
@@ -0,0 +1,3 @@
+"""
+Offline jobs and maintenance scripts for ClimateSense.
+"""
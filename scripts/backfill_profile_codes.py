@@ -0,0 +1,96 @@
+"""
+Profile Code Backfill
+Fills footprints.profile_code for rows written before the column existed.
+Run database/migrations/001_footprint_profile_code.sql first.
+
+Rows are read in id order and updated with one request per distinct code
+on each page, so the run is a handful of requests per page rather than one
+per row. Rerunning after an interruption continues with the rows still
+missing a code.
+
+Usage:
+    python -m scripts.backfill_profile_codes
+    python -m scripts.backfill_profile_codes --page-size 2000 --dry-run
+"""
+
+import argparse
+import os
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from agents.estimator import CarbonEstimator
+
+
+DEFAULT_PAGE_SIZE = 1000
+# IDs per update request, keeping the in.(...) filter within URL limits
+UPDATE_CHUNK = 200
+
+
+def backfill(client: Any, page_size: int = DEFAULT_PAGE_SIZE, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Encode and store the profile code of every footprint without one.
+
+    Rows whose inputs are incomplete cannot be encoded and keep a NULL code.
+
+    Returns:
+        Counts of rows scanned, updated and left unencodable
+    """
+    stats = {'scanned': 0, 'updated': 0, 'unencodable': 0}
+    last_id = None
+    while True:
+        query = client.table('footprints').select('id, inputs').is_('profile_code', 'null')
+        if last_id is not None:
+            query = query.gt('id', last_id)
+        rows = query.order('id').limit(page_size).execute().data or []
+
+        ids_by_code: Dict[int, List[str]] = defaultdict(list)
+        for row in rows:
+            code = CarbonEstimator.encode_profile(row.get('inputs') or {})
+            if code is None:
+                stats['unencodable'] += 1
+            else:
+                ids_by_code[code].append(row['id'])
+
+        for code, ids in ids_by_code.items():
+            for start in range(0, len(ids), UPDATE_CHUNK):
+                chunk = ids[start:start + UPDATE_CHUNK]
+                if not dry_run:
+                    client.table('footprints').update({'profile_code': code}).in_('id', chunk).execute()
+                stats['updated'] += len(chunk)
+
+        stats['scanned'] += len(rows)
+        if len(rows) < page_size:
+            return stats
+        last_id = rows[-1]['id']
+        print(f"{stats['scanned']} rows scanned, {stats['updated']} updated")
+
+
+def main(argv: Optional[List[str]] = None):
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Backfill footprints.profile_code")
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE,
+                        help='Rows read per request')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Count what would be updated without writing')
+    args = parser.parse_args(argv)
+
+    from supabase import create_client
+
+    url = os.getenv('SUPABASE_URL')
+    key = os.getenv('SUPABASE_KEY')
+    if not (url and key):
+        raise SystemExit("SUPABASE_URL and SUPABASE_KEY are required")
+
+    stats = backfill(create_client(url, key), args.page_size, args.dry_run)
+    action = 'Would update' if args.dry_run else 'Updated'
+    print(
+        f"{action} {stats['updated']} of {stats['scanned']} rows "
+        f"({stats['unencodable']} with incomplete inputs left NULL)"
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+"""
+Precompute Job
+Warms analyses and recommendations for every lifestyle profile (or the most
+common ones in the footprints table) and writes them to a memory-mapped store
+the app loads at startup via PRECOMPUTE_STORE_PATH.
+
+Progress is appended to a journal next to the store, so an interrupted run
+resumes where it stopped.
+
+Usage:
+    python -m scripts.precompute --output data/precomputed.bin
+    python -m scripts.precompute --top 500 --concurrency 4 --rate 2
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from agents.estimator import CarbonEstimator
+from agents.analysis_agent import ImpactAnalysisAgent
+from agents.recommendation_agent import RecommendationAgent
+from agents.precomputed import KINDS, store_fingerprint, write_store
+
+
+DEFAULT_OUTPUT = 'data/precomputed.bin'
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Journal:
+    """Append-only JSONL record of finished (kind, code) results."""
+
+    def __init__(self, path: str, fingerprint: str):
+        self.path = path
+        self.fingerprint = fingerprint
+        self._lock = threading.Lock()
+        self.entries: Dict[Tuple[str, int], str] = {}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._load()
+        self._file = open(path, 'a', encoding='utf-8')
+        if os.path.getsize(path) == 0:
+            self._write({'fingerprint': fingerprint})
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            lines = f.readlines()
+        if not lines:
+            return
+
+        try:
+            header = json.loads(lines[0])
+        except ValueError:
+            header = {}
+        if header.get('fingerprint') != self.fingerprint:
+            # Prompts, weights or model changed: start over
+            stale = f"{self.path}.stale"
+            os.replace(self.path, stale)
+            print(f"Journal was built for different prompts; moved to {stale}")
+            return
+
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # partial line from an interrupted write
+            self.entries[(record['kind'], record['code'])] = record['text']
+
+    def _write(self, record: Dict):
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def add(self, kind: str, code: int, text: str):
+        with self._lock:
+            if self._file.closed:
+                return  # a worker finishing after an interrupted run was closed
+            self.entries[(kind, code)] = text
+            self._write({'kind': kind, 'code': code, 'text': text})
+
+    def snapshot(self) -> Dict[Tuple[str, int], str]:
+        """Copy of the entries, safe to iterate while workers still add."""
+        with self._lock:
+            return dict(self.entries)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def top_profile_codes(limit: int) -> List[int]:
+    """
+    Return the `limit` most common profile codes in the footprints table.
+
+    Counted in the database by the top_profile_codes function (see
+    database/migrations/001_footprint_profile_code.sql); databases without
+    it fall back to scanning and encoding every row's inputs.
+    """
+    from supabase import create_client
+
+    url = os.getenv('SUPABASE_URL')
+    key = os.getenv('SUPABASE_KEY')
+    if not (url and key):
+        raise SystemExit("SUPABASE_URL and SUPABASE_KEY are required for --top")
+
+    client = create_client(url, key)
+    try:
+        rows = client.rpc('top_profile_codes', {'limit_count': limit}).execute().data or []
+        return [row['profile_code'] for row in rows]
+    except Exception as e:
+        print(f"Warning: top_profile_codes RPC unavailable ({e}); scanning footprint inputs")
+
+    counts: Counter = Counter()
+    page_size = 1000
+    start = 0
+    while True:
+        rows = client.table('footprints').select('inputs') \
+            .range(start, start + page_size - 1).execute().data or []
+        for row in rows:
+            code = CarbonEstimator.encode_profile(row.get('inputs') or {})
+            if code is not None:
+                counts[code] += 1
+        if len(rows) < page_size:
+            break
+        start += page_size
+
+    return [code for code, _ in counts.most_common(limit)]
+
+
+def run(
+    output: str,
+    codes: List[int],
+    kinds: Tuple[str, ...],
+    concurrency: int,
+    rate: float
+) -> Dict[Tuple[str, int], str]:
+    """
+    Generate missing responses for `codes` and write the store.
+
+    Returns:
+        All journal entries (including ones from earlier runs)
+    """
+    journal = Journal(f"{output}.journal", store_fingerprint().hex())
+    estimator = CarbonEstimator()
+
+    analysis_agent = ImpactAnalysisAgent()
+    recommendation_agent = RecommendationAgent()
+    # Always ask the model, never an existing store
+    analysis_agent.precomputed = None
+    recommendation_agent.precomputed = None
+    generators = {
+        'analysis': analysis_agent.analyze,
+        'recommendations': recommendation_agent.prioritize_recommendations,
+    }
+
+    todo = [
+        (kind, code) for code in codes for kind in kinds
+        if (kind, code) not in journal.entries
+    ]
+    print(f"{len(todo)} responses to generate ({len(journal.entries)} already done)")
+
+    limiter = RateLimiter(rate)
+    progress = {'done': 0, 'failed': 0}
+    progress_lock = threading.Lock()
+    stopping = threading.Event()
+
+    def work(item: Tuple[str, int]):
+        kind, code = item
+        footprint = estimator.estimate_footprint(CarbonEstimator.decode_profile(code))
+        limiter.wait()
+        if stopping.is_set():
+            return
+        try:
+            text = generators[kind](footprint)
+        except Exception as e:
+            with progress_lock:
+                progress['failed'] += 1
+            print(f"Failed {kind} for profile {code}: {e}")
+            return
+        journal.add(kind, code, text)
+        with progress_lock:
+            progress['done'] += 1
+            if progress['done'] % 50 == 0:
+                print(f"{progress['done']}/{len(todo)} generated")
+
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        for future in [pool.submit(work, item) for item in todo]:
+            future.result()
+        pool.shutdown(wait=True)
+    except KeyboardInterrupt:
+        print("Interrupted; finishing in-flight requests, then writing partial store (rerun to resume)")
+        stopping.set()
+        # Queued profiles are dropped; only calls already running are waited for
+        pool.shutdown(wait=True, cancel_futures=True)
+    finally:
+        # Workers have stopped unless interrupted again; close() makes late adds no-ops
+        journal.close()
+        entries = journal.snapshot()
+        write_store(output, entries, kinds=KINDS)
+        print(
+            f"Wrote {len(entries)} responses to {output} "
+            f"({progress['failed']} failed this run)"
+        )
+
+    return entries
+
+
+def main(argv: Optional[List[str]] = None):
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Precompute LLM responses per profile")
+    parser.add_argument('--output', default=os.getenv('PRECOMPUTE_STORE_PATH', DEFAULT_OUTPUT))
+    parser.add_argument('--top', type=int, default=None,
+                        help='Only the N most common profiles in the footprints table')
+    parser.add_argument('--kinds', default=','.join(KINDS),
+                        help='Comma-separated subset of: ' + ', '.join(KINDS))
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=2.0,
+                        help='Maximum LLM requests per second')
+    args = parser.parse_args(argv)
+
+    kinds = tuple(kind for kind in args.kinds.split(',') if kind)
+    unknown = set(kinds) - set(KINDS)
+    if unknown:
+        parser.error(f"Unknown kinds: {', '.join(sorted(unknown))}")
+
+    if args.top:
+        codes = top_profile_codes(args.top)
+    else:
+        codes = list(range(CarbonEstimator.PROFILE_COUNT))
+
+    run(args.output, codes, kinds, args.concurrency, args.rate)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Population Stats Seed
+Counts every footprint already in the database into a seed snapshot that
+the app's population statistics merge with what workers count live.
+
+Run it once before starting workers with population stats enabled. Footprints
+saved while it runs may be counted twice, and footprints saved between the run
+and the deploy are not counted at all.
+
+Usage:
+    python -m scripts.seed_population_stats
+    python -m scripts.seed_population_stats --output data/population_stats/seed.json
+"""
+
+import argparse
+import os
+from typing import Any, List, Optional
+
+from dotenv import load_dotenv
+
+from utils.population_stats import DEFAULT_DIRECTORY, PopulationStats, write_snapshot
+
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+def count_footprints(client: Any, page_size: int = DEFAULT_PAGE_SIZE) -> PopulationStats:
+    """Page through the footprints table in id order, counting every row."""
+    stats = PopulationStats()
+    last_id = None
+    while True:
+        query = client.table('footprints').select('id, inputs, total_score')
+        if last_id is not None:
+            query = query.gt('id', last_id)
+        rows = query.order('id').limit(page_size).execute().data or []
+        for row in rows:
+            stats.add(row.get('inputs') or {}, float(row['total_score']))
+        if len(rows) < page_size:
+            return stats
+        last_id = rows[-1]['id']
+        print(f"{stats.count} footprints counted")
+
+
+def main(argv: Optional[List[str]] = None):
+    load_dotenv()
+
+    directory = os.getenv('POPULATION_STATS_DIR', DEFAULT_DIRECTORY)
+    parser = argparse.ArgumentParser(description="Seed population stats from the footprints table")
+    parser.add_argument('--output', default=os.path.join(directory, 'seed.json'))
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE)
+    args = parser.parse_args(argv)
+
+    from supabase import create_client
+
+    url = os.getenv('SUPABASE_URL')
+    key = os.getenv('SUPABASE_KEY')
+    if not (url and key):
+        raise SystemExit("SUPABASE_URL and SUPABASE_KEY are required")
+
+    stats = count_footprints(create_client(url, key), args.page_size)
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    write_snapshot(args.output, stats)
+    print(f"Wrote {stats.count} footprints to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,7 +5,6 @@ let footprintData = null;
 let analysisText = null;
 let recommendationsText = null;
 let challengeData = null;
-let chatHistory = [];
 
 document.addEventListener('DOMContentLoaded', function() {
     initializeDashboard();
@@ -146,7 +145,7 @@ async function goToStep(step) {
     
     // Load step content
     if (step === 3 && !analysisText) {
-        await loadAnalysis();
+        await loadAssessment();
     } else if (step === 4 && !recommendationsText) {
         await loadRecommendations();
     } else if (step === 5 && !challengeData) {
@@ -176,69 +175,121 @@ function updateStepDisplay() {
 }
 
 
-async function loadAnalysis() {
-    if (!footprintData) return;
+// ==========================
+// Stream Server-Sent Events from a POST endpoint
+// ==========================
+async function streamSSE(url, body, onEvent) {
+    const response = await fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(body)
+    });
 
-    showLoading();
+    if (!response.ok || !response.body) {
+        const data = await response.json().catch(() => ({}));
+        onEvent('error', data);
+        return;
+    }
 
-    try {
-        const response = await fetch('/api/analyze', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ footprint: footprintData })
-        });
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let eventName = 'message';
+            let dataText = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) {
+                    eventName = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    dataText += line.slice(5).trim();
+                }
+            });
 
-        const data = await response.json();
-        hideLoading();
+            if (dataText) {
+                onEvent(eventName, JSON.parse(dataText));
+            }
+        }
+    }
+}
 
-        // ✅ AI success
-        if (data.success) {
-            analysisText = data.analysis;
 
-            document.getElementById('analysisResults').innerHTML =
-                formatAIResponse(analysisText);
+function showAnalysisFallback() {
+    // ⚠️ AI failed → dynamic fallback using real footprint data
+    const topDrivers = getTopEmissionDrivers(footprintData);
 
-            document.getElementById('getRecommendationsBtn').style.display = 'block';
+    let fallbackHtml = `
+        <div class="info-box">
+            <strong>⚠️ AI analysis temporarily unavailable</strong>
+            <p>
+                Our AI service is currently busy. Based on your calculated
+                carbon footprint, your highest contributing categories are:
+            </p>
+            <ul>
+    `;
 
-        } else {
-            // ⚠️ AI failed → dynamic fallback using real footprint data
-            const topDrivers = getTopEmissionDrivers(footprintData);
-
-            let fallbackHtml = `
-                <div class="info-box">
-                    <strong>⚠️ AI analysis temporarily unavailable</strong>
-                    <p>
-                        Our AI service is currently busy. Based on your calculated
-                        carbon footprint, your highest contributing categories are:
-                    </p>
-                    <ul>
-            `;
+    topDrivers.forEach(driver => {
+        fallbackHtml += `
+            <li>
+                <strong>${driver.category}</strong>
+                (${driver.percentage.toFixed(1)}%)
+            </li>
+        `;
+    });
 
-            topDrivers.forEach(driver => {
-                fallbackHtml += `
-                    <li>
-                        <strong>${driver.category}</strong>
-                        (${driver.percentage.toFixed(1)}%)
-                    </li>
-                `;
-            });
+    fallbackHtml += `
+            </ul>
+            <p style="margin-top:1rem;">
+                🔁 Please try again shortly to receive a detailed AI explanation.
+            </p>
+        </div>
+    `;
 
-            fallbackHtml += `
-                    </ul>
-                    <p style="margin-top:1rem;">
-                        🔁 Please try again shortly to receive a detailed AI explanation.
-                    </p>
-                </div>
-            `;
+    document.getElementById('analysisResults').innerHTML = fallbackHtml;
+}
 
-            document.getElementById('analysisResults').innerHTML = fallbackHtml;
-        }
+
+async function loadAnalysis() {
+    if (!footprintData) return;
+
+    showLoading();
+
+    const container = document.getElementById('analysisResults');
+    let streamedText = '';
+
+    try {
+        await streamSSE('/api/analyze/stream', { footprint: footprintData }, (event, data) => {
+            if (event === 'token') {
+                // Render tokens as they arrive
+                hideLoading();
+                streamedText += data.text;
+                container.innerHTML = formatAIResponse(streamedText);
+            } else if (event === 'done') {
+                // ✅ AI success
+                analysisText = data.analysis;
+                container.innerHTML = formatAIResponse(analysisText);
+                document.getElementById('getRecommendationsBtn').style.display = 'block';
+            } else if (event === 'error') {
+                showAnalysisFallback();
+            }
+        });
+        hideLoading();
 
     } catch (error) {
         hideLoading();
         console.error('Analysis error:', error);
 
-        document.getElementById('analysisResults').innerHTML = `
+        container.innerHTML = `
             <div class="info-box">
                 <strong>⚠️ Unable to reach AI service</strong>
                 <p>
@@ -251,6 +302,67 @@ async function loadAnalysis() {
 }
 
 
+// ==========================
+// Run analysis, recommendations and challenge in one server-side pipeline
+// ==========================
+async function loadAssessment() {
+    if (!footprintData) return;
+
+    showLoading();
+    let analysisReceived = false;
+    let streamedAnalysis = '';
+
+    try {
+        await streamSSE('/api/assessment?stream=1', { footprint: footprintData }, (event, data) => {
+            if (event === 'token') {
+                // Render the analysis as it is generated; its stage event replaces it
+                hideLoading();
+                streamedAnalysis += data.text;
+                document.getElementById('analysisResults').innerHTML =
+                    formatAIResponse(streamedAnalysis);
+                return;
+            }
+            if (event !== 'stage') return;
+
+            if (data.stage === 'analysis') {
+                analysisReceived = true;
+                hideLoading();
+                if (data.success) {
+                    analysisText = data.analysis;
+                    document.getElementById('analysisResults').innerHTML =
+                        formatAIResponse(analysisText);
+                    document.getElementById('getRecommendationsBtn').style.display = 'block';
+                } else {
+                    showAnalysisFallback();
+                }
+            } else if (data.stage === 'recommendations' && data.success) {
+                // Ready before the user reaches step 4
+                recommendationsText = data.recommendations;
+                document.getElementById('recommendationsResults').innerHTML =
+                    formatAIResponse(recommendationsText);
+                document.getElementById('getChallengeBtn').style.display = 'block';
+            } else if (data.stage === 'challenge' && data.success) {
+                showChallengeResult(data);
+            }
+            // Failed later stages are retried individually by goToStep()
+        });
+        hideLoading();
+
+        if (!analysisReceived) {
+            showAnalysisFallback();
+        }
+    } catch (error) {
+        hideLoading();
+        console.error('Assessment error:', error);
+
+        // Fall back to the per-step endpoints
+        if (!analysisText) {
+            await loadAnalysis();
+        }
+    }
+}
+
+
 async function loadRecommendations() {
     if (!footprintData || !analysisText) return;
     
@@ -307,22 +419,7 @@ async function loadChallenge() {
         hideLoading();
 
         if (data.success) {
-            challengeData = data.challenge;
-
-            // Store challenge ID directly on the accept button
-            const acceptBtn = document.getElementById('acceptChallengeBtn');
-            acceptBtn.dataset.challengeId = data.challenge_id;
-            acceptBtn.style.display = 'block';
-
-            // Show other buttons
-            document.getElementById('newChallengeBtn').style.display = 'block';
-            document.getElementById('startChatBtn').style.display = 'block';
-
-            console.log("Stored challengeId on button:", acceptBtn.dataset.challengeId);
-
-            // Display challenge content
-            displayChallenge(data.challenge);
-
+            showChallengeResult(data);
         } else {
             alert('Error: ' + (data.error || 'Failed to get challenge'));
         }
@@ -334,6 +431,27 @@ async function loadChallenge() {
     }
 }
 
+// ==========================
+// Store a challenge response and show its controls
+// ==========================
+function showChallengeResult(data) {
+    challengeData = data.challenge;
+
+    // Store challenge ID directly on the accept button
+    const acceptBtn = document.getElementById('acceptChallengeBtn');
+    acceptBtn.dataset.challengeId = data.challenge_id;
+    acceptBtn.style.display = 'block';
+
+    // Show other buttons
+    document.getElementById('newChallengeBtn').style.display = 'block';
+    document.getElementById('startChatBtn').style.display = 'block';
+
+    console.log("Stored challengeId on button:", acceptBtn.dataset.challengeId);
+
+    // Display challenge content
+    displayChallenge(data.challenge);
+}
+
 // ==========================
 // Display challenge in HTML
 // ==========================
@@ -444,38 +562,46 @@ async function sendChatMessage() {
     addChatMessage('user', message);
     input.value = '';
     
-    // Add to history
-    chatHistory.push({ role: 'user', content: message });
-    
+    // Conversation history is kept server-side
     showLoading();
+    let messageContent = null;
+    let streamedText = '';
     try {
-        const response = await fetch('/api/chat', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                message: message,
-                footprint_profile: footprintData || {},
-                chat_history: chatHistory,
-                current_challenge: challengeData?.title || null
-            })
+        await streamSSE('/api/chat/stream', {
+            message: message,
+            footprint_profile: footprintData || {},
+            current_challenge: challengeData?.title || null
+        }, (event, data) => {
+            if (event === 'token') {
+                hideLoading();
+                streamedText += data.text;
+                if (!messageContent) {
+                    messageContent = addChatMessage('assistant', '');
+                }
+                messageContent.innerHTML = formatAIResponse(streamedText);
+                const container = document.getElementById('chatMessages');
+                container.scrollTop = container.scrollHeight;
+            } else if (event === 'error') {
+                showChatError(messageContent, 'Sorry, I encountered an error. Please try again.');
+            }
         });
-        
-        const data = await response.json();
         hideLoading();
-        
-        if (data.success) {
-            addChatMessage('assistant', data.response);
-            chatHistory.push({ role: 'assistant', content: data.response });
-        } else {
-            addChatMessage('assistant', 'Sorry, I encountered an error. Please try again.');
-        }
     } catch (error) {
         hideLoading();
-        addChatMessage('assistant', 'Network error. Please try again.');
+        showChatError(messageContent, 'Network error. Please try again.');
         console.error('Error:', error);
     }
 }
 
+// Replace a partly streamed reply with the error, or add it as a new message
+function showChatError(messageContent, text) {
+    if (messageContent) {
+        messageContent.innerHTML = text;
+    } else {
+        addChatMessage('assistant', text);
+    }
+}
+
 function addChatMessage(role, content) {
     const container = document.getElementById('chatMessages');
     const messageDiv = document.createElement('div');
@@ -485,6 +611,7 @@ function addChatMessage(role, content) {
     `;
     container.appendChild(messageDiv);
     container.scrollTop = container.scrollHeight;
+    return messageDiv.querySelector('.message-content');
 }
 
 function showLoading() {
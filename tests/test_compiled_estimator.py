@@ -0,0 +1,59 @@
+"""CompiledEstimator must score every profile exactly like CarbonEstimator."""
+
+import numpy as np
+import pytest
+
+from agents.compiled_estimator import CompiledEstimator
+from agents.estimator import CarbonEstimator
+
+
+@pytest.fixture(scope='module')
+def estimators():
+    return CarbonEstimator(), CompiledEstimator()
+
+
+def test_every_profile_matches_rule_based(estimators):
+    reference, compiled = estimators
+    for code in range(CarbonEstimator.PROFILE_COUNT):
+        inputs = CarbonEstimator.decode_profile(code)
+        expected = reference.estimate_footprint(inputs)
+        assert compiled.estimate_footprint(inputs) == expected, inputs
+        assert compiled.get_level_for_code(code) == reference.get_footprint_level(expected['total_score'])
+
+
+def test_encode_decode_round_trip():
+    for code in range(CarbonEstimator.PROFILE_COUNT):
+        assert CarbonEstimator.encode_profile(CarbonEstimator.decode_profile(code)) == code
+
+
+def test_incomplete_inputs_fall_back_to_rule_based(estimators):
+    reference, compiled = estimators
+    inputs = {'transport_mode': 'Car', 'diet': 'Veg', 'electricity': 'Unknown'}
+    assert CarbonEstimator.encode_profile(inputs) is None
+    assert compiled.estimate_footprint(inputs) == reference.estimate_footprint(inputs)
+
+
+def test_batch_matches_single_lookups(estimators):
+    reference, compiled = estimators
+    codes = np.arange(0, CarbonEstimator.PROFILE_COUNT, 7)
+    result = compiled.estimate_batch(codes, include_categories=True)
+    for position, code in enumerate(codes.tolist()):
+        expected = reference.estimate_footprint(CarbonEstimator.decode_profile(code))
+        assert int(result['total_score'][position]) == expected['total_score']
+        assert result['category_scores'][position].tolist() == [
+            expected['category_scores'][category] for category in CarbonEstimator.CATEGORIES
+        ]
+        level = CompiledEstimator.LEVELS[result['level_index'][position]]
+        assert level == reference.get_footprint_level(expected['total_score'])
+
+
+def test_encode_batch_marks_incomplete_profiles(estimators):
+    _, compiled = estimators
+    profiles = [CarbonEstimator.decode_profile(42), {'diet': 'Veg'}]
+    assert compiled.encode_batch(profiles).tolist() == [42, -1]
+
+
+def test_batch_rejects_out_of_range_codes(estimators):
+    _, compiled = estimators
+    with pytest.raises(ValueError):
+        compiled.estimate_batch(np.array([0, CarbonEstimator.PROFILE_COUNT]))
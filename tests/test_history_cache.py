@@ -0,0 +1,120 @@
+"""History cache: loads racing writes must not pin stale history; shared invalidations."""
+
+import sqlite3
+import time
+
+import pytest
+
+from utils.history_cache import SharedInvalidations, UserHistoryCache
+
+
+PAYLOAD = {'success': True, 'footprints': [], 'challenges': []}
+
+
+def test_load_started_before_a_write_is_served_but_not_cached():
+    cache = UserHistoryCache(settle_seconds=0)
+    token = cache.begin('u1')
+    cache.invalidate('u1')
+    entry = cache.put('u1', PAYLOAD, token)
+    assert entry.payload == PAYLOAD
+    assert cache.get('u1') is None
+
+
+def test_load_within_the_settle_window_is_not_cached():
+    cache = UserHistoryCache(settle_seconds=0.2)
+    cache.invalidate('u1')
+    # Started after the write, but the write may not have been flushed yet
+    cache.put('u1', PAYLOAD, cache.begin('u1'))
+    assert cache.get('u1') is None
+
+    time.sleep(0.25)
+    cache.put('u1', PAYLOAD, cache.begin('u1'))
+    assert cache.get('u1') is not None
+
+
+def test_write_by_another_user_does_not_block_caching():
+    cache = UserHistoryCache(settle_seconds=10)
+    token = cache.begin('u1')
+    cache.invalidate('u2')
+    cache.put('u1', PAYLOAD, token)
+    assert cache.get('u1') is not None
+
+
+def test_invalidate_drops_the_cached_entry():
+    cache = UserHistoryCache(settle_seconds=0)
+    cache.put('u1', PAYLOAD, cache.begin('u1'))
+    assert cache.get('u1') is not None
+    cache.invalidate('u1')
+    assert cache.get('u1') is None
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_same_payload_gets_the_same_etag():
+    cache = UserHistoryCache(settle_seconds=0)
+    first = cache.put('u1', PAYLOAD, cache.begin('u1'))
+    second = cache.put('u2', dict(PAYLOAD), cache.begin('u2'))
+    assert first.etag == second.etag
+
+
+@pytest.fixture
+def shared_cache(tmp_path):
+    path = str(tmp_path / 'invalidations.db')
+    cache = UserHistoryCache(settle_seconds=0, shared=SharedInvalidations(path, poll_interval=0))
+    # The first read positions the worker in the log
+    assert cache.get('u1') is None
+    cache.put('u1', PAYLOAD, cache.begin('u1'))
+    cache.put('u2', PAYLOAD, cache.begin('u2'))
+    return cache, path
+
+
+def publish_from_other_worker(path, user_id):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "INSERT INTO invalidations (user_id, pid, written_at) VALUES (?, ?, ?)",
+        (user_id, 0, time.time())
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_other_workers_invalidations_are_applied(shared_cache):
+    cache, path = shared_cache
+    publish_from_other_worker(path, 'u1')
+    assert cache.get('u1') is None
+    assert cache.get('u2') is not None
+    assert cache.stats()['remote_invalidations'] == 1
+
+
+def test_own_invalidations_are_published_in_the_background(shared_cache):
+    cache, path = shared_cache
+    cache.invalidate('u1')
+    cache.invalidate('u1')
+    cache.shared.flush()
+    rows = sqlite3.connect(path).execute("SELECT user_id FROM invalidations").fetchall()
+    # Duplicates within a batch are written once (the writer may have split the batch)
+    assert 1 <= len(rows) <= 2 and {row[0] for row in rows} == {'u1'}
+    # ...and not applied a second time when read back
+    assert cache.get('u2') is not None
+
+
+def test_idle_worker_keeps_its_cache(shared_cache):
+    cache, _ = shared_cache
+    cache.shared._last_poll = 0.0
+    assert cache.get('u1') is not None
+
+
+def test_pruned_log_clears_the_cache(shared_cache):
+    cache, path = shared_cache
+    publish_from_other_worker(path, 'u3')
+    conn = sqlite3.connect(path)
+    # Pruned before this worker read it
+    conn.execute("DELETE FROM invalidations")
+    conn.commit()
+    conn.close()
+    assert cache.get('u1') is None
+    assert cache.get('u2') is None
+
+    # Back in step: later entries are applied one by one again
+    cache.put('u2', PAYLOAD, cache.begin('u2'))
+    publish_from_other_worker(path, 'u1')
+    assert cache.get('u2') is not None
@@ -0,0 +1,109 @@
+"""Keyset cursors: encoding, validation, and walking every row exactly once."""
+
+import json
+import uuid
+
+import pytest
+
+from benchmarks.fakes import FakeSupabase
+from utils.batch_io import FORMAT_CSV, FORMAT_NDJSON
+from utils.history_export import (
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+    format_pages,
+    iter_pages,
+    page_limit,
+    split_page,
+)
+
+
+def test_cursor_round_trip():
+    row = {'created_at': '2026-10-17T10:00:00.123456+00:00', 'id': str(uuid.uuid4())}
+    cursor = encode_cursor(row)
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == (row['created_at'], row['id'])
+
+
+def raw_cursor(value):
+    return encode_cursor({'created_at': value[0], 'id': value[1]}) if isinstance(value, tuple) else value
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    'bm90IGpzb24',  # "not json"
+    raw_cursor(('yesterday', str(uuid.uuid4()))),
+    raw_cursor(('2026-10-17T10:00:00', 'not-a-uuid')),
+    # A filter injection attempt through the id
+    raw_cursor(('2026-10-17T10:00:00', '1",id.gt."0')),
+    raw_cursor((None, str(uuid.uuid4()))),
+])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_page_limit():
+    assert page_limit(None) == 20
+    assert page_limit('5') == 5
+    assert page_limit(str(MAX_PAGE_SIZE * 10)) == MAX_PAGE_SIZE
+    for raw in ('0', '-1', 'ten'):
+        with pytest.raises(ValueError):
+            page_limit(raw)
+
+
+def test_split_page_only_returns_a_cursor_when_more_rows_follow():
+    rows = [{'created_at': f'2026-10-17T10:00:0{i}', 'id': str(uuid.uuid4())} for i in range(3)]
+    assert split_page(rows[:2], 2) == (rows[:2], None)
+    page, cursor = split_page(rows, 2)
+    assert page == rows[:2]
+    assert decode_cursor(cursor) == (rows[1]['created_at'], rows[1]['id'])
+    assert split_page(None, 2) == ([], None)
+
+
+@pytest.fixture
+def supabase():
+    client = FakeSupabase()
+    rows = client.db.tables['footprints']
+    # Ties on created_at exercise the id tie-breaker across page boundaries
+    for second in range(7):
+        for _ in range(3):
+            rows.append({
+                'id': str(uuid.uuid4()),
+                'user_id': 'u1',
+                'created_at': f'2026-10-17T10:00:{second:02d}+00:00',
+                'total_score': second,
+                'level': 'Low',
+                'profile_code': None,
+                'inputs': {},
+            })
+    rows.append({'id': str(uuid.uuid4()), 'user_id': 'u2', 'created_at': '2026-10-17T10:00:03+00:00'})
+    return client
+
+
+@pytest.mark.parametrize('page_size', [1, 2, 4, 21, 50])
+def test_pages_cover_every_row_once_newest_first(supabase, page_size):
+    pages = list(iter_pages(supabase, 'footprints', 'u1', page_size=page_size))
+    rows = [row for page in pages for row in page]
+    expected = sorted(
+        (row for row in supabase.db.tables['footprints'] if row['user_id'] == 'u1'),
+        key=lambda row: (row['created_at'], row['id']),
+        reverse=True
+    )
+    assert [row['id'] for row in rows] == [row['id'] for row in expected]
+    assert len(rows) == 21
+    assert all(len(page) <= page_size for page in pages)
+
+
+def test_format_pages_ends_with_an_error_record_when_a_page_fails():
+    def pages():
+        yield [{'id': '1', 'created_at': 'now', 'accepted': True, 'challenge_data': {'title': 'x'}}]
+        raise RuntimeError('database went away')
+
+    ndjson = list(format_pages(pages(), 'challenges', FORMAT_NDJSON))
+    assert json.loads(ndjson[0])['challenge_data'] == {'title': 'x'}
+    assert 'database went away' in json.loads(ndjson[-1])['error']
+
+    csv = ''.join(format_pages(pages(), 'challenges', FORMAT_CSV)).splitlines()
+    assert csv[0] == 'id,created_at,accepted,challenge_data'
+    assert csv[-1].startswith('ERROR:')
@@ -0,0 +1,152 @@
+"""Job leases: expiry and requeue, renewal by running workers, and priorities."""
+
+import threading
+import time
+
+import pytest
+
+from utils.job_queue import (
+    FAILED,
+    PRIORITIES,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    JobQueue,
+    MemoryJobStore,
+    SQLiteJobStore,
+)
+
+
+def make_job(job_id, priority='interactive', created_at=None):
+    return {
+        'id': job_id,
+        'kind': 'echo',
+        'payload': {'value': job_id},
+        'user_id': 'user-1',
+        'priority': PRIORITIES[priority],
+        'traceparent': None,
+        'status': QUEUED,
+        'result': None,
+        'status_code': None,
+        'created_at': created_at if created_at is not None else time.time(),
+        'started_at': None,
+        'finished_at': None,
+        'attempts': 0,
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteJobStore(str(tmp_path / 'jobs.db'))
+
+
+def test_expired_lease_is_requeued(store):
+    store.add(make_job('a'))
+    claimed = store.claim(lease_seconds=10)
+    assert claimed['status'] == RUNNING and claimed['attempts'] == 1
+
+    # Lease still valid: nothing to recover
+    assert store.recover(time.time(), max_attempts=3) == 0
+    assert store.get('a')['status'] == RUNNING
+
+    assert store.recover(time.time() + 11, max_attempts=3) == 1
+    assert store.get('a')['status'] == QUEUED
+    again = store.claim(lease_seconds=10)
+    assert again['id'] == 'a' and again['attempts'] == 2
+
+
+def test_job_fails_after_max_attempts(store):
+    store.add(make_job('a'))
+    for _ in range(2):
+        store.claim(lease_seconds=10)
+        store.recover(time.time() + 11, max_attempts=2)
+    job = store.get('a')
+    assert job['status'] == FAILED
+    assert job['status_code'] == 500
+    assert job['result']['success'] is False
+
+
+def test_renewed_lease_is_not_requeued(store):
+    store.add(make_job('a'))
+    store.claim(lease_seconds=1)
+    store.renew(['a'], lease_seconds=60)
+    assert store.recover(time.time() + 2, max_attempts=3) == 0
+    assert store.get('a')['status'] == RUNNING
+
+
+def test_finished_job_is_neither_renewed_nor_requeued(store):
+    store.add(make_job('a'))
+    store.claim(lease_seconds=1)
+    store.finish('a', SUCCEEDED, {'success': True}, 200)
+    store.renew(['a'], lease_seconds=60)
+    assert store.recover(time.time() + 120, max_attempts=3) == 0
+    assert store.get('a')['status'] == SUCCEEDED
+
+
+def test_claim_order_is_priority_then_age(store):
+    now = time.time()
+    store.add(make_job('bulk', 'bulk', now))
+    store.add(make_job('late', 'interactive', now + 1))
+    store.add(make_job('early', 'interactive', now))
+    store.add(make_job('chat', 'chat', now + 2))
+    assert [store.claim(60)['id'] for _ in range(4)] == ['chat', 'early', 'late', 'bulk']
+    assert store.claim(60) is None
+
+
+def test_memory_store_claims_each_job_once():
+    store = MemoryJobStore()
+    store.add(make_job('a'))
+    assert store.claim(60)['id'] == 'a'
+    assert store.claim(60) is None
+
+
+def test_heartbeat_keeps_a_long_job_from_running_twice(tmp_path):
+    runs = []
+    release = threading.Event()
+
+    def slow(payload, user_id):
+        runs.append(payload)
+        release.wait(5)
+        return {'success': True}
+
+    queue = JobQueue(
+        SQLiteJobStore(str(tmp_path / 'jobs.db')),
+        workers=2,
+        poll_interval=0.05,
+        lease_seconds=0.6
+    )
+    queue.register('slow', slow)
+    queue.start()
+    try:
+        job_id = queue.submit('slow', {'n': 1})
+        # Several lease periods; without renewal the second worker would requeue and rerun it
+        time.sleep(2.0)
+        release.set()
+        job = queue.wait(job_id, timeout=5)
+    finally:
+        queue.stop()
+    assert job['status'] == SUCCEEDED
+    assert job['attempts'] == 1
+    assert len(runs) == 1
+
+
+def test_handler_errors_are_stored_with_on_error_payload(tmp_path):
+    def broken(payload, user_id):
+        raise ValueError('bad payload')
+
+    queue = JobQueue(
+        MemoryJobStore(),
+        workers=1,
+        poll_interval=0.05,
+        on_error=lambda e: ({'success': False, 'error': str(e)}, 422)
+    )
+    queue.register('broken', broken)
+    queue.start()
+    try:
+        job = queue.wait(queue.submit('broken', {}, user_id='user-1'), timeout=5, user_id='user-1')
+    finally:
+        queue.stop()
+    assert job['status'] == FAILED
+    assert job['status_code'] == 422
+    assert job['result'] == {'success': False, 'error': 'bad payload'}
+    assert queue.get(job['id'], user_id='someone-else') is None
@@ -0,0 +1,171 @@
+"""Error classification and AIMD adaptation of the Gemini rate limiter."""
+
+import asyncio
+
+import httpx
+import pytest
+from google.genai import errors
+
+from agents.rate_limiter import (
+    ABANDONED,
+    AdaptiveRateLimiter,
+    LimiterTimeout,
+    classify_error,
+    is_throttled,
+)
+
+
+def api_error(cls, code, status, message='error'):
+    return cls(code, {'error': {'code': code, 'status': status, 'message': message}})
+
+
+def wrapped(error):
+    """The error as the agents re-raise it: a RuntimeError with the original as context."""
+    try:
+        try:
+            raise error
+        except Exception as e:
+            raise RuntimeError(str(e))
+    except RuntimeError as outer:
+        return outer
+
+
+@pytest.mark.parametrize('error, expected', [
+    (api_error(errors.ClientError, 429, 'RESOURCE_EXHAUSTED'), 'throttled'),
+    (api_error(errors.ServerError, 503, 'UNAVAILABLE'), 'transient'),
+    (api_error(errors.ServerError, 500, 'INTERNAL'), 'transient'),
+    (api_error(errors.ClientError, 400, 'INVALID_ARGUMENT'), None),
+    (LimiterTimeout(1.0), 'throttled'),
+    (httpx.ConnectError('refused'), 'transient'),
+    (httpx.ReadTimeout('slow'), 'transient'),
+    (TimeoutError(), 'transient'),
+])
+def test_classify_error_uses_structured_fields(error, expected):
+    assert classify_error(error) == expected
+
+
+@pytest.mark.parametrize('message', [
+    'HTTP 500 while parsing prompt 500',
+    'rate limit 429 quota exceeded',
+    'failed to generate a moderate answer',
+])
+def test_classify_error_ignores_message_text(message):
+    assert classify_error(RuntimeError(message)) is None
+    assert not is_throttled(RuntimeError(message))
+
+
+def test_is_throttled_follows_the_exception_chain():
+    assert is_throttled(wrapped(api_error(errors.ClientError, 429, 'RESOURCE_EXHAUSTED')))
+    assert not is_throttled(wrapped(api_error(errors.ServerError, 503, 'UNAVAILABLE')))
+
+
+def limiter(**kwargs):
+    options = dict(rate=1000.0, burst=1000, max_concurrency=8, min_concurrency=1, timeout=1.0, backoff=0.0)
+    options.update(kwargs)
+    return AdaptiveRateLimiter(**options)
+
+
+def test_throttling_halves_the_cap_down_to_the_minimum():
+    rl = limiter()
+    for expected in (4.0, 2.0, 1.0, 1.0):
+        rl.acquire()
+        rl.release('throttled')
+        assert rl.concurrency_limit == expected
+    assert rl.throttled == 4
+
+
+def test_successes_grow_the_cap_additively_up_to_the_maximum():
+    rl = limiter(max_concurrency=4)
+    rl.concurrency_limit = 2.0
+    for _ in range(2):
+        rl.acquire()
+        rl.release(None)
+    # +1/limit per success: about +1 per window of `limit` successes
+    assert 2.8 < rl.concurrency_limit < 3.0
+    for _ in range(100):
+        rl.acquire()
+        rl.release(None)
+    assert rl.concurrency_limit == 4.0
+
+
+def test_errors_and_abandoned_calls_leave_the_cap_alone():
+    rl = limiter()
+    rl.concurrency_limit = 3.0
+    for outcome in ('transient', 'error', ABANDONED):
+        rl.acquire()
+        rl.release(outcome)
+    assert rl.concurrency_limit == 3.0
+    assert rl.abandoned == 1
+    assert rl.stats()['in_flight'] == 0
+
+
+def test_acquire_times_out_when_the_cap_is_full():
+    rl = limiter(max_concurrency=1)
+    rl.acquire()
+    with pytest.raises(LimiterTimeout):
+        rl.acquire(deadline=0)
+    assert rl.timeouts == 1
+    rl.release(None)
+    rl.acquire()
+
+
+def test_call_retries_throttled_errors_then_succeeds():
+    rl = limiter()
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise api_error(errors.ClientError, 429, 'RESOURCE_EXHAUSTED')
+        return 'ok'
+
+    assert rl.call(flaky) == 'ok'
+    assert len(attempts) == 3
+    assert rl.retries == 2
+    assert rl.throttled == 2
+
+
+def test_call_does_not_retry_unclassified_errors():
+    rl = limiter()
+    attempts = []
+
+    def broken():
+        attempts.append(1)
+        raise ValueError('bad prompt')
+
+    with pytest.raises(ValueError):
+        rl.call(broken)
+    assert len(attempts) == 1
+    assert rl.stats()['in_flight'] == 0
+
+
+def test_abandoned_stream_frees_its_slot_without_adapting():
+    rl = limiter()
+    rl.concurrency_limit = 3.0
+
+    def stream():
+        with rl.slot():
+            yield 'chunk'
+            yield 'chunk'
+
+    chunks = stream()
+    next(chunks)
+    chunks.close()
+    assert rl.stats()['in_flight'] == 0
+    assert rl.abandoned == 1
+    assert rl.concurrency_limit == 3.0
+
+
+def test_cancelled_async_call_frees_its_slot():
+    rl = limiter()
+
+    async def main():
+        task = asyncio.ensure_future(rl.call_async(lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert rl.stats()['in_flight'] == 0
+    assert rl.abandoned == 1
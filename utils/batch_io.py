@@ -0,0 +1,156 @@
+"""
+Streaming batch input/output helpers.
+Parses uploaded CSV or NDJSON lifestyle inputs one record at a time and
+formats per-record results, so bulk jobs never hold a whole upload in memory.
+"""
+
+import asyncio
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, IO, Iterator, List, Optional, Tuple
+
+
+FORMAT_CSV = 'csv'
+FORMAT_NDJSON = 'ndjson'
+
+MIMETYPES = {
+    FORMAT_CSV: 'text/csv',
+    FORMAT_NDJSON: 'application/x-ndjson',
+}
+
+# Columns written for CSV output (categories are appended by the caller)
+RESULT_COLUMNS = ['line', 'id', 'total_score', 'level', 'error']
+
+
+def detect_format(content_type: Optional[str], filename: Optional[str] = None) -> str:
+    """
+    Work out the upload format from a filename or content type.
+
+    Defaults to NDJSON when nothing identifies the payload as CSV.
+    """
+    if filename and filename.lower().endswith('.csv'):
+        return FORMAT_CSV
+    if filename and filename.lower().endswith(('.ndjson', '.jsonl')):
+        return FORMAT_NDJSON
+    if content_type and 'csv' in content_type.lower():
+        return FORMAT_CSV
+    return FORMAT_NDJSON
+
+
+def text_stream(binary: IO[bytes]) -> io.TextIOWrapper:
+    """Wrap a binary upload stream for incremental UTF-8 line reading."""
+    if not isinstance(binary, io.BufferedIOBase):
+        binary = io.BufferedReader(binary)
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+
+class AsyncChunkReader(io.RawIOBase):
+    """
+    Blocking binary stream over an async iterator of byte chunks.
+
+    For ASGI request bodies: a worker thread reads the upload as a file
+    while the event loop receives it, pulling one chunk at a time so only
+    the chunk being parsed is held in memory.
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes], loop: asyncio.AbstractEventLoop):
+        """
+        Args:
+            chunks: Async iterator of body chunks (e.g. Quart's request.body)
+            loop: Event loop the iterator belongs to; must not be the
+                calling thread's running loop
+        """
+        self._chunks = chunks.__aiter__()
+        self._loop = loop
+        self._buffer = b''
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer and not self._eof:
+            future = asyncio.run_coroutine_threadsafe(self._next_chunk(), self._loop)
+            chunk = future.result()
+            if chunk is None:
+                self._eof = True
+            else:
+                self._buffer = chunk
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    async def _next_chunk(self) -> Optional[bytes]:
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return None
+
+
+def iter_records(
+    stream: IO[str],
+    fmt: str
+) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Lazily parse records from a text stream.
+
+    Args:
+        stream: Text stream positioned at the start of the upload
+        fmt: FORMAT_CSV or FORMAT_NDJSON
+
+    Yields:
+        Tuple of (line_number, record, error); record is None when the
+        line could not be parsed and error explains why
+    """
+    if fmt == FORMAT_CSV:
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, {k: (v or '').strip() for k, v in record.items() if k}, None
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, "Each line must be a JSON object"
+            continue
+        yield line_number, record, None
+
+
+def split_record(record: Dict[str, Any], categories: List[str]) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """
+    Separate lifestyle inputs from metadata in a parsed record.
+
+    Accepts either flat records ({"diet": "Veg", ..., "id": "emp-1"}) or
+    nested ones ({"inputs": {...}, "id": "emp-1"}).
+
+    Returns:
+        Tuple of (inputs, metadata)
+    """
+    if isinstance(record.get('inputs'), dict):
+        metadata = {k: v for k, v in record.items() if k != 'inputs'}
+        return record['inputs'], metadata
+
+    inputs = {k: v for k, v in record.items() if k in categories}
+    metadata = {k: v for k, v in record.items() if k not in categories}
+    return inputs, metadata
+
+
+def format_ndjson(result: Dict[str, Any]) -> str:
+    """Serialize one result as an NDJSON line."""
+    return json.dumps(result, separators=(',', ':')) + '\n'
+
+
+def format_csv_row(values: List[Any]) -> str:
+    """Serialize one row of values as a CSV line."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
@@ -0,0 +1,224 @@
+"""
+Circuit breakers for external dependencies (Gemini, Supabase).
+After repeated failures a breaker opens and calls fail fast instead of each
+waiting out a network timeout; after a cool-down it lets a few probe calls
+through (half-open) and closes again once one succeeds.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+
+from utils.metrics import REGISTRY
+
+T = TypeVar('T')
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+
+# Gauge values for the state metric
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_SECONDS = 30.0
+DEFAULT_HALF_OPEN_CALLS = 1
+
+CIRCUIT_TRANSITIONS = REGISTRY.counter(
+    'circuit_breaker_transitions_total',
+    'Circuit breaker state changes per dependency and new state',
+    ('name', 'state')
+)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} is unavailable (circuit open); next probe in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def is_circuit_open(error: BaseException) -> bool:
+    """True if error, or an error it was raised from or while handling, is a CircuitOpenError."""
+    while error is not None:
+        if isinstance(error, CircuitOpenError):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Errors for which is_failure() returns False (e.g. 4xx responses, quota
+    errors) say nothing about the dependency's health and leave the
+    breaker unchanged.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_SECONDS,
+        half_open_calls: int = DEFAULT_HALF_OPEN_CALLS,
+        is_failure: Optional[Callable[[Exception], bool]] = None
+    ):
+        """
+        Initialize the breaker.
+
+        Args:
+            name: Dependency name (used in errors and metrics)
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds to stay open before probing
+            half_open_calls: Probe calls allowed at once while half-open
+            is_failure: Decides whether an exception counts (default: all)
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.is_failure = is_failure
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected (open and not yet due a probe)."""
+        with self._lock:
+            return self._state == OPEN and time.monotonic() < self._opened_at + self.reset_timeout
+
+    def retry_in(self) -> float:
+        with self._lock:
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """Reserve a call; False means fail fast."""
+        with self._lock:
+            if self._state == OPEN:
+                if time.monotonic() < self._opened_at + self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self._transition(HALF_OPEN)
+                self._probes = 0
+            if self._state == HALF_OPEN:
+                if self._probes >= self.half_open_calls:
+                    self.rejected += 1
+                    return False
+                self._probes += 1
+            return True
+
+    def check(self):
+        """Reserve a call or raise CircuitOpenError."""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_in())
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._state == HALF_OPEN:
+                self._transition(CLOSED)
+
+    def record_failure(self, error: Optional[Exception] = None):
+        with self._lock:
+            if error is not None and self.is_failure is not None and not self.is_failure(error):
+                # Not a health signal; free the probe slot if this was one
+                self._release_probe()
+                return
+            self._failures += 1
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+                self.opened += 1
+                self._transition(OPEN)
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """Run the block as one call: fail fast if open, record the outcome."""
+        self.check()
+        try:
+            yield
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        except BaseException:
+            # Cancelled or closed mid-call (e.g. client disconnect): no verdict
+            with self._lock:
+                self._release_probe()
+            raise
+        self.record_success()
+
+    def call(self, func: Callable[[], T]) -> T:
+        with self.guard():
+            return func()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'state': STATE_VALUES[self._state],
+                'consecutive_failures': self._failures,
+                'opened': self.opened,
+                'rejected': self.rejected,
+            }
+
+    def _release_probe(self):
+        # Caller holds the lock
+        if self._state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+
+    def _transition(self, state: str):
+        # Caller holds the lock
+        self._state = state
+        CIRCUIT_TRANSITIONS.labels(self.name, state).inc()
+        print(f"Circuit breaker {self.name}: {state}")
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str, is_failure: Optional[Callable[[Exception], bool]] = None) -> CircuitBreaker:
+    """
+    Return the process-wide breaker for a dependency, creating it on first use.
+
+    Thresholds come from CIRCUIT_FAILURE_THRESHOLD / CIRCUIT_RESET_SECONDS /
+    CIRCUIT_HALF_OPEN_CALLS, and the breaker's stats are exported as
+    `circuit_<name>_*` gauges.
+    """
+    breaker = _breakers.get(name)
+    if breaker is not None:
+        return breaker
+
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', DEFAULT_FAILURE_THRESHOLD)),
+                reset_timeout=float(os.getenv('CIRCUIT_RESET_SECONDS', DEFAULT_RESET_SECONDS)),
+                half_open_calls=int(os.getenv('CIRCUIT_HALF_OPEN_CALLS', DEFAULT_HALF_OPEN_CALLS)),
+                is_failure=is_failure
+            )
+            _breakers[name] = breaker
+            REGISTRY.register_stats(
+                f'circuit_{name}',
+                breaker.stats,
+                f'{name} circuit breaker (state: 0 closed, 1 half-open, 2 open)'
+            )
+        return breaker
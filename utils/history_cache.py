@@ -0,0 +1,369 @@
+"""
+Read-through cache for /api/user-history.
+Each user's recent footprints and challenges are loaded with both queries in
+flight at once, serialized once, and served from memory (with an ETag) until
+a write for that user invalidates them or the TTL expires. Invalidations are
+shared with the other workers on the host through a small SQLite log.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from utils.lru_cache import TTLCache
+from utils.tracing import bind_context
+
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 300.0
+DEFAULT_SETTLE_SECONDS = 2.0
+DEFAULT_INVALIDATION_PATH = os.path.join('data', 'history_invalidations.db')
+DEFAULT_POLL_SECONDS = 1.0
+# Shared invalidations older than this are deleted from the log
+INVALIDATION_RETENTION_SECONDS = 300.0
+# How long a write is remembered: longer than any load can take
+WRITE_MEMORY_SECONDS = 60.0
+
+FOOTPRINT_LIMIT = 10
+CHALLENGE_LIMIT = 5
+
+
+class HistoryEntry:
+    """One user's history payload, its serialized body and ETag."""
+
+    __slots__ = ('payload', 'body', 'etag')
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.payload = payload
+        self.body = json.dumps(payload, default=str).encode('utf-8')
+        self.etag = hashlib.sha1(self.body).hexdigest()[:20]
+
+
+class SharedInvalidations:
+    """
+    Append-only log of invalidated user IDs in a SQLite file shared by the
+    workers on one host. Each worker publishes its own writes from a
+    background thread, batched, and polls for everyone else's at most once
+    per poll interval. The file is opened on first use.
+    """
+
+    def __init__(self, path: str, poll_interval: float = DEFAULT_POLL_SECONDS):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._seq: Optional[int] = None
+        self._last_poll = 0.0
+        self._last_prune = 0.0
+        self._reset_threads()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_threads)
+
+        self.received = 0
+        self.published = 0
+
+    def _reset_threads(self):
+        # Also run in a forked child: the parent's locks, connections and
+        # writer thread are unusable there (the parent writes its own backlog)
+        self._local = threading.local()
+        self._poll_lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._pending: List[str] = []
+        self._writer: Optional[threading.Thread] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread, and never one inherited across a fork
+        if getattr(self._local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS invalidations ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, "
+                "pid INTEGER NOT NULL, written_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    def publish(self, user_id: str):
+        """Tell the other workers that a user's history changed (written in the background)."""
+        with self._condition:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._run,
+                    name='history-invalidations',
+                    daemon=True
+                )
+                self._writer.start()
+                atexit.register(self.flush)
+            self._pending.append(user_id)
+            self._condition.notify()
+
+    def flush(self):
+        """Write queued invalidations now, including a batch already in flight."""
+        with self._flush_lock:
+            self._write(self._take_pending())
+
+    def poll(self) -> Optional[list]:
+        """
+        Return user IDs other workers invalidated since the last poll ([] if
+        polled too recently), or None if the log was pruned past entries
+        this worker never read, so everything must go.
+        """
+        now = time.monotonic()
+        if now - self._last_poll < self.poll_interval or not self._poll_lock.acquire(blocking=False):
+            return []
+        try:
+            self._last_poll = now
+            conn = self._connect()
+            if self._seq is None:
+                # First poll: nothing is cached yet, so earlier entries do not matter
+                self._seq = self._last_seq(conn)
+                return []
+            rows = conn.execute(
+                "SELECT seq, user_id, pid FROM invalidations WHERE seq > ? ORDER BY seq",
+                (self._seq,)
+            ).fetchall()
+            first = conn.execute("SELECT MIN(seq) FROM invalidations").fetchone()[0]
+            if first is None:
+                first = self._last_seq(conn) + 1
+            # Entries after our position were deleted before we read them
+            missed = first > self._seq + 1
+            if rows:
+                self._seq = rows[-1][0]
+            elif missed:
+                self._seq = first - 1
+            if missed:
+                return None
+            users = [user_id for _, user_id, pid in rows if pid != os.getpid()]
+            self.received += len(users)
+            return users
+        finally:
+            self._poll_lock.release()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+            # Take the batch under the flush lock so flush() waits for it
+            with self._flush_lock:
+                self._write(self._take_pending())
+
+    def _take_pending(self) -> List[str]:
+        with self._condition:
+            users, self._pending = self._pending, []
+        return users
+
+    def _write(self, users: List[str]):
+        if not users:
+            return
+        now = time.time()
+        pid = os.getpid()
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT INTO invalidations (user_id, pid, written_at) VALUES (?, ?, ?)",
+                    [(user_id, pid, now) for user_id in dict.fromkeys(users)]
+                )
+                if now - self._last_prune >= INVALIDATION_RETENTION_SECONDS / 10:
+                    self._last_prune = now
+                    conn.execute(
+                        "DELETE FROM invalidations WHERE written_at < ?",
+                        (now - INVALIDATION_RETENTION_SECONDS,)
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            print(f"Warning: could not share history cache invalidations: {e}")
+            return
+        self.published += len(users)
+
+    @staticmethod
+    def _last_seq(conn: sqlite3.Connection) -> int:
+        """Highest sequence number ever assigned, including deleted entries."""
+        row = conn.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'invalidations'"
+        ).fetchone()
+        return row[0] if row else 0
+
+
+class UserHistoryCache:
+    """
+    Per-user history, bounded by entry count and total body size.
+
+    Writes go through the write-behind queue, so a row may reach the
+    database up to a flush interval after invalidate(). A load is served
+    but not cached if the user wrote while it ran or less than
+    `settle_seconds` before, so a read racing the flush cannot pin stale
+    history.
+
+    Other workers' writes arrive through `shared` within its poll interval;
+    without it (or for workers on other hosts) only the TTL bounds how long
+    another worker's write goes unseen.
+    """
+
+    def __init__(
+        self,
+        supabase: Any = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+        ttl: Optional[float] = DEFAULT_TTL_SECONDS,
+        settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+        shared: Optional[SharedInvalidations] = None
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            supabase: Sync Supabase client used by load()
+            max_entries: Maximum number of users cached
+            max_bytes: Maximum total size of cached bodies (None for no limit)
+            ttl: Seconds before a cached history is reloaded (None for no expiry)
+            settle_seconds: How long after a write loads are not cached
+            shared: Invalidation log shared with the host's other workers
+        """
+        self.supabase = supabase
+        self.settle_seconds = settle_seconds
+        self.shared = shared
+        self._entries = TTLCache(
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            ttl=ttl,
+            sizeof=lambda entry: len(entry.body)
+        )
+        # user_id -> (generation, monotonic time) of the user's last write
+        self._writes = TTLCache(max_entries=max_entries, ttl=settle_seconds + WRITE_MEMORY_SECONDS)
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self.invalidations = 0
+
+    def get(self, user_id: str) -> Optional[HistoryEntry]:
+        """Return the cached history, or None on a miss."""
+        self._sync()
+        return self._entries.get(user_id)
+
+    def begin(self, user_id: str) -> int:
+        """Return a token to pass to put() for a load starting now."""
+        with self._lock:
+            return self._generation
+
+    def put(self, user_id: str, payload: Dict[str, Any], token: int) -> HistoryEntry:
+        """
+        Wrap a freshly loaded payload, caching it unless the user wrote
+        since begin() or their last write may not have landed yet.
+        """
+        entry = HistoryEntry(payload)
+        with self._lock:
+            write = self._writes.get(user_id)
+            if write is None or (
+                write[0] <= token and time.monotonic() - write[1] >= self.settle_seconds
+            ):
+                self._entries.set(user_id, entry)
+        return entry
+
+    def invalidate(self, user_id: str):
+        """Drop a user's cached history after a write, in every worker."""
+        self._invalidate_local(user_id)
+        if self.shared is not None:
+            self.shared.publish(user_id)
+
+    def _invalidate_local(self, user_id: str):
+        with self._lock:
+            self._generation += 1
+            self._writes.set(user_id, (self._generation, time.monotonic()))
+            self._entries.delete(user_id)
+            self.invalidations += 1
+
+    def _sync(self):
+        """Apply invalidations published by other workers."""
+        if self.shared is None:
+            return
+        try:
+            users = self.shared.poll()
+        except sqlite3.Error as e:
+            print(f"Warning: could not read shared history cache invalidations: {e}")
+            return
+        if users is None:
+            self._entries.clear()
+            return
+        for user_id in users:
+            self._invalidate_local(user_id)
+
+    def load(self, user_id: str) -> HistoryEntry:
+        """Return the user's history, from the cache or from the database."""
+        entry = self.get(user_id)
+        if entry is not None:
+            return entry
+        token = self.begin(user_id)
+        return self.put(user_id, self._fetch(user_id), token)
+
+    def stats(self) -> Dict[str, int]:
+        return dict(
+            self._entries.stats(),
+            invalidations=self.invalidations,
+            remote_invalidations=self.shared.received if self.shared is not None else 0
+        )
+
+    def _fetch(self, user_id: str) -> Dict[str, Any]:
+        """Run the footprints and challenges queries concurrently."""
+        challenges = self._get_executor().submit(bind_context(
+            lambda: self.supabase.table('challenges').select('*').eq('user_id', user_id)
+            .order('created_at', desc=True).limit(CHALLENGE_LIMIT).execute()
+        ))
+        footprints = self.supabase.table('footprints').select('*').eq('user_id', user_id) \
+            .order('created_at', desc=True).limit(FOOTPRINT_LIMIT).execute()
+        return history_payload(footprints.data, challenges.result().data)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=int(os.getenv('HISTORY_QUERY_WORKERS', 4)),
+                        thread_name_prefix='history'
+                    )
+        return self._executor
+
+
+def history_payload(footprints: Optional[list], challenges: Optional[list]) -> Dict[str, Any]:
+    """The /api/user-history response body."""
+    return {
+        'success': True,
+        'footprints': footprints if footprints else [],
+        'challenges': challenges if challenges else []
+    }
+
+
+def build_history_cache(supabase: Any = None) -> UserHistoryCache:
+    """Build a cache configured from environment settings."""
+    # Long enough for a write-behind flush to land
+    flush_seconds = float(os.getenv('WRITE_BEHIND_FLUSH_SECONDS', 1.0))
+    path = os.getenv('HISTORY_CACHE_INVALIDATION_PATH', DEFAULT_INVALIDATION_PATH)
+    shared = SharedInvalidations(
+        path,
+        poll_interval=float(os.getenv('HISTORY_CACHE_POLL_SECONDS', DEFAULT_POLL_SECONDS))
+    ) if path else None
+    return UserHistoryCache(
+        supabase=supabase,
+        max_entries=int(os.getenv('HISTORY_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+        max_bytes=int(os.getenv('HISTORY_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)),
+        ttl=float(os.getenv('HISTORY_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS)),
+        settle_seconds=max(DEFAULT_SETTLE_SECONDS, flush_seconds * 2),
+        shared=shared
+    )
@@ -0,0 +1,159 @@
+"""
+Keyset pagination and streaming export of a user's full history.
+Pages are ordered newest first by (created_at, id) and continue from an
+opaque cursor naming the last row seen, so each page is an index range scan
+no matter how deep the client has paged. Exports walk the same pages lazily
+and format them as NDJSON or CSV, one chunk per page.
+"""
+
+import base64
+import binascii
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.batch_io import FORMAT_CSV, format_csv_row, format_ndjson
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+DEFAULT_EXPORT_PAGE_SIZE = 500
+
+# Exportable tables and the columns returned for each
+HISTORY_COLUMNS = {
+    'footprints': ['id', 'created_at', 'total_score', 'level', 'profile_code', 'inputs'],
+    'challenges': ['id', 'created_at', 'accepted', 'challenge_data'],
+    'chat_history': ['id', 'created_at', 'user_message', 'assistant_response'],
+}
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Cursor continuing after `row`."""
+    raw = json.dumps([row['created_at'], row['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Unpack a cursor into (created_at, id).
+
+    Raises:
+        ValueError: If the cursor was not produced by encode_cursor()
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        # Both end up inside a filter expression, so only accept what they claim to be
+        datetime.fromisoformat(created_at)
+        uuid.UUID(row_id)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    return created_at, row_id
+
+
+def page_limit(raw: Optional[str], default: int = DEFAULT_PAGE_SIZE) -> int:
+    """
+    Parse a `limit` query parameter, capped at MAX_PAGE_SIZE.
+
+    Raises:
+        ValueError: If it is not a positive integer
+    """
+    if raw is None:
+        return default
+    limit = int(raw)
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def page_query(supabase: Any, table: str, user_id: str, cursor: Optional[str], limit: int) -> Any:
+    """
+    Build the query for one page (sync or async client).
+
+    Fetches one row more than `limit` so the caller can tell whether
+    another page follows without a second round trip.
+    """
+    query = supabase.table(table).select(','.join(HISTORY_COLUMNS[table])).eq('user_id', user_id)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.or_(
+            f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{row_id}")'
+        )
+    return query.order('created_at', desc=True).order('id', desc=True).limit(limit + 1)
+
+
+def split_page(rows: Optional[List[Dict[str, Any]]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Trim a page_query() result to `limit` rows; returns (rows, next_cursor)."""
+    rows = rows or []
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1])
+
+
+def fetch_page(
+    supabase: Any,
+    table: str,
+    user_id: str,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Fetch one page of a user's rows, newest first.
+
+    Returns:
+        Tuple of (rows, next_cursor); next_cursor is None on the last page
+    """
+    return split_page(page_query(supabase, table, user_id, cursor, limit).execute().data, limit)
+
+
+def iter_pages(
+    supabase: Any,
+    table: str,
+    user_id: str,
+    page_size: Optional[int] = None
+) -> Iterator[List[Dict[str, Any]]]:
+    """Lazily yield every page of a user's rows; each is fetched when asked for."""
+    if page_size is None:
+        page_size = int(os.getenv('HISTORY_EXPORT_PAGE_SIZE', DEFAULT_EXPORT_PAGE_SIZE))
+    cursor = None
+    while True:
+        rows, cursor = fetch_page(supabase, table, user_id, cursor, page_size)
+        yield rows
+        if cursor is None:
+            return
+
+
+def format_pages(pages: Iterable[List[Dict[str, Any]]], table: str, fmt: str) -> Iterator[str]:
+    """
+    Serialize pages of rows as NDJSON or CSV (with a header row).
+    JSON columns are written to CSV as JSON text.
+
+    If fetching a page fails, the headers are already sent, so the export
+    ends with an error record instead: `{"error": ...}` in NDJSON, or a
+    one-column row starting `ERROR:` in CSV.
+    """
+    columns = HISTORY_COLUMNS[table]
+    if fmt == FORMAT_CSV:
+        yield format_csv_row(columns)
+    try:
+        for rows in pages:
+            if fmt == FORMAT_CSV:
+                yield ''.join(format_csv_row([_csv_value(row.get(column)) for column in columns]) for row in rows)
+            else:
+                yield ''.join(format_ndjson(row) for row in rows)
+    except Exception as e:
+        print("HISTORY EXPORT ERROR:", e)
+        message = f'Export aborted: {e}'
+        if fmt == FORMAT_CSV:
+            yield format_csv_row([f'ERROR: {message}'])
+        else:
+            yield format_ndjson({'error': message})
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(',', ':'))
+    return value
@@ -0,0 +1,625 @@
+"""
+Background Job Queue
+Runs long AI calls on a worker pool so a route can answer with a job ID at
+once; clients then poll the job or subscribe to it over SSE.
+
+Jobs are plain dicts kept in a store: MemoryJobStore (one process) or
+SQLiteJobStore, which survives restarts and can be shared by several
+workers on one host. Handlers are registered by kind, so a job is fully
+described by (kind, payload) and can be re-run after a crash.
+"""
+
+import abc
+import atexit
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Lower runs first: chat replies ahead of per-request stages ahead of bulk work
+PRIORITIES = {
+    'chat': 0,
+    'interactive': 10,
+    'bulk': 100,
+}
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+FINISHED = (SUCCEEDED, FAILED)
+
+DEFAULT_WORKERS = 4
+DEFAULT_POLL_SECONDS = 1.0
+DEFAULT_LEASE_SECONDS = 300.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RESULT_TTL_SECONDS = 3600.0
+
+Handler = Callable[[Dict[str, Any], Optional[str]], Dict[str, Any]]
+
+
+def default_error_payload(error: Exception) -> Tuple[Dict[str, Any], int]:
+    return {'success': False, 'error': str(error)}, 500
+
+
+def describe(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a job for the status endpoint (no payload or owner)."""
+    view = {
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+    }
+    if job['status'] in FINISHED:
+        view['result'] = job['result']
+        view['status_code'] = job['status_code']
+    return view
+
+
+class JobStore(abc.ABC):
+    """Interface for job storage."""
+
+    name = 'store'
+
+    @abc.abstractmethod
+    def add(self, job: Dict[str, Any]):
+        """Store a new queued job."""
+
+    @abc.abstractmethod
+    def claim(self, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """Mark the highest-priority queued job as running and return it."""
+
+    @abc.abstractmethod
+    def finish(self, job_id: str, status: str, result: Dict[str, Any], status_code: int):
+        """Record a job's result."""
+
+    @abc.abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job, or None if it does not exist."""
+
+    def renew(self, job_ids: List[str], lease_seconds: float):
+        """Extend the leases of running jobs (stores without leases ignore this)."""
+
+    def recover(self, now: float, max_attempts: int) -> int:
+        """Requeue running jobs whose lease expired; returns how many."""
+        return 0
+
+    def after_fork(self):
+        """Drop locks and connections inherited by a forked child."""
+
+    @abc.abstractmethod
+    def purge(self, finished_before: float) -> int:
+        """Delete finished jobs older than a timestamp; returns how many."""
+
+    @abc.abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs in each status."""
+
+
+class MemoryJobStore(JobStore):
+    """In-process store; jobs are lost when the process exits."""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._heap: List[Tuple[int, int, str]] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def after_fork(self):
+        self._lock = threading.Lock()
+
+    def add(self, job: Dict[str, Any]):
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+            heapq.heappush(self._heap, (job['priority'], next(self._seq), job['id']))
+
+    def claim(self, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            while self._heap:
+                _, _, job_id = heapq.heappop(self._heap)
+                job = self._jobs.get(job_id)
+                if job is None or job['status'] != QUEUED:
+                    continue
+                job['status'] = RUNNING
+                job['started_at'] = time.time()
+                job['attempts'] += 1
+                return dict(job)
+        return None
+
+    def finish(self, job_id: str, status: str, result: Dict[str, Any], status_code: int):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(
+                    status=status,
+                    result=result,
+                    status_code=status_code,
+                    finished_at=time.time()
+                )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def purge(self, finished_before: float) -> int:
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job['status'] in FINISHED and job['finished_at'] < finished_before
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+    def counts(self) -> Dict[str, int]:
+        counts = {status: 0 for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job['status']] += 1
+        return counts
+
+
+class SQLiteJobStore(JobStore):
+    """
+    SQLite-backed store that survives restarts and is shared by every
+    process pointing at the same file.
+
+    Running jobs hold a lease that their worker renews while it runs them; a
+    job whose worker died is requeued once the lease expires, up to
+    max_attempts.
+    """
+
+    name = 'sqlite'
+
+    COLUMNS = (
+        'id', 'kind', 'payload', 'user_id', 'priority', 'traceparent', 'status',
+        'result', 'status_code', 'created_at', 'started_at', 'finished_at', 'attempts'
+    )
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+            "user_id TEXT, priority INTEGER NOT NULL, traceparent TEXT, "
+            "status TEXT NOT NULL, result TEXT, status_code INTEGER, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, "
+            "lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority, created_at)"
+        )
+
+    def after_fork(self):
+        # SQLite connections must not be used across fork()
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; autocommit so claim() controls its own
+        # transaction with BEGIN IMMEDIATE
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _to_job(self, row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = {column: row[column] for column in self.COLUMNS}
+        job['payload'] = json.loads(job['payload'])
+        if job['result'] is not None:
+            job['result'] = json.loads(job['result'])
+        return job
+
+    def add(self, job: Dict[str, Any]):
+        row = dict(job, payload=json.dumps(job['payload']), result=None)
+        self._connect().execute(
+            f"INSERT INTO jobs ({', '.join(self.COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in self.COLUMNS)})",
+            [row[column] for column in self.COLUMNS]
+        )
+
+    def claim(self, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock first, so two processes
+        # cannot both select the same queued job
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? "
+                "ORDER BY priority, created_at LIMIT 1",
+                (QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (RUNNING, now, now + lease_seconds, row['id'])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row['id'])
+
+    def finish(self, job_id: str, status: str, result: Dict[str, Any], status_code: int):
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, status_code = ?, "
+            "finished_at = ?, lease_expires = NULL WHERE id = ?",
+            (status, json.dumps(result), status_code, time.time(), job_id)
+        )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return self._to_job(row)
+
+    def renew(self, job_ids: List[str], lease_seconds: float):
+        if not job_ids:
+            return
+        self._connect().execute(
+            f"UPDATE jobs SET lease_expires = ? WHERE status = ? "
+            f"AND id IN ({', '.join('?' for _ in job_ids)})",
+            [time.time() + lease_seconds, RUNNING, *job_ids]
+        )
+
+    def recover(self, now: float, max_attempts: int) -> int:
+        conn = self._connect()
+        interrupted = json.dumps({'success': False, 'error': 'Job was interrupted. Please try again.'})
+        conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, status_code = 500, finished_at = ?, "
+            "lease_expires = NULL WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+            (FAILED, interrupted, now, RUNNING, now, max_attempts)
+        )
+        return conn.execute(
+            "UPDATE jobs SET status = ?, lease_expires = NULL "
+            "WHERE status = ? AND lease_expires < ?",
+            (QUEUED, RUNNING, now)
+        ).rowcount
+
+    def purge(self, finished_before: float) -> int:
+        return self._connect().execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+            (SUCCEEDED, FAILED, finished_before)
+        ).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        counts = {status: 0 for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)}
+        for row in self._connect().execute(
+            "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"
+        ):
+            counts[row['status']] = row['n']
+        return counts
+
+
+class JobQueue:
+    """
+    Priority job queue with a pool of worker threads.
+
+    Handlers take (payload, user_id) and return the JSON payload the
+    blocking route would have answered with; exceptions are mapped to
+    (payload, status) by on_error.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int = DEFAULT_WORKERS,
+        poll_interval: float = DEFAULT_POLL_SECONDS,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        result_ttl: float = DEFAULT_RESULT_TTL_SECONDS,
+        on_error: Callable[[Exception], Tuple[Dict[str, Any], int]] = default_error_payload,
+        tracer: Any = None,
+        enabled: bool = True
+    ):
+        """
+        Initialize the queue.
+
+        Args:
+            store: Where jobs and results are kept
+            workers: Worker threads, i.e. jobs run concurrently by this process
+            poll_interval: Idle workers re-check the store this often (seconds),
+                which picks up jobs submitted by other processes
+            lease_seconds: A running job whose lease is not renewed within
+                this is presumed crashed and requeued (SQLite store only);
+                workers renew their jobs' leases every third of it
+            max_attempts: Runs per job before an interrupted job is failed
+            result_ttl: Finished jobs are deleted after this many seconds
+            on_error: Maps a handler exception to (payload, status)
+            tracer: Optional Tracer; each job runs as its own trace
+            enabled: If False, routes should run the work inline
+        """
+        self.store = store
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.result_ttl = result_ttl
+        self.on_error = on_error
+        self.tracer = tracer
+        self.enabled = enabled
+
+        self._handlers: Dict[str, Tuple[Handler, int]] = {}
+        self._condition = threading.Condition()
+        self._signals = 0
+        self._finished = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._running: set = set()
+        self._stopping = False
+        self._stopped = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._last_maintenance = 0.0
+        self._hooks_registered = False
+
+        self.busy = 0
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.recovered = 0
+
+    def register(self, kind: str, handler: Handler, priority: str = 'interactive'):
+        """Register the handler (and default priority) for a job kind."""
+        self._handlers[kind] = (handler, PRIORITIES[priority])
+
+    def start(self):
+        """
+        Start the worker threads (idempotent) and stop them at exit.
+
+        Threads do not survive fork(), so a server that imports the app
+        before forking workers gets them restarted in each child.
+        """
+        if not self.enabled or self._threads:
+            return
+        if not self._hooks_registered:
+            self._hooks_registered = True
+            atexit.register(self.stop)
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=self._after_fork)
+        self._maintain(force=True)
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._run,
+                name=f'job-worker-{index}',
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the workers; queued jobs stay in the store."""
+        with self._condition:
+            if self._stopping:
+                return
+            self._stopping = True
+            self._condition.notify_all()
+        self._stopped.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+    def submit(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        user_id: Optional[str] = None,
+        priority: Optional[str] = None,
+        traceparent: Optional[str] = None
+    ) -> str:
+        """
+        Queue a job and return its ID.
+
+        Args:
+            kind: Registered job kind (e.g. 'analyze')
+            payload: JSON-serializable handler input
+            user_id: Owner; only they can read the job
+            priority: Name from PRIORITIES (defaults to the kind's priority)
+            traceparent: Links the job's trace to the submitting request
+        """
+        _, default_priority = self._handlers[kind]
+        job_id = str(uuid.uuid4())
+        self.store.add({
+            'id': job_id,
+            'kind': kind,
+            'payload': payload,
+            'user_id': user_id,
+            'priority': PRIORITIES[priority] if priority else default_priority,
+            'traceparent': traceparent,
+            'status': QUEUED,
+            'result': None,
+            'status_code': None,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'attempts': 0,
+        })
+        with self._stats_lock:
+            self.submitted += 1
+        with self._condition:
+            self._signals += 1
+            self._condition.notify()
+        return job_id
+
+    def get(self, job_id: str, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Return a job, or None if it does not exist or belongs to someone else."""
+        job = self.store.get(job_id)
+        if job is None or (user_id is not None and job['user_id'] != user_id):
+            return None
+        return job
+
+    def wait(self, job_id: str, timeout: float, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Block until a job finishes or the timeout passes.
+
+        Returns:
+            The job (finished or not), or None if it does not exist
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id, user_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job['status'] in FINISHED or remaining <= 0:
+                return job
+            # Woken by local workers; the poll covers jobs run by other processes
+            with self._finished:
+                self._finished.wait(min(remaining, self.poll_interval))
+
+    def stats(self) -> Dict[str, int]:
+        counts = self.store.counts()
+        return {
+            'queued': counts[QUEUED],
+            'running': counts[RUNNING],
+            'busy_workers': self.busy,
+            'workers': self.workers if self._threads else 0,
+            'submitted': self.submitted,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'recovered': self.recovered,
+        }
+
+    def _after_fork(self):
+        """In a forked child: replace inherited locks and restart the workers."""
+        started = bool(self._threads) and not self._stopping
+        self._condition = threading.Condition()
+        self._finished = threading.Condition()
+        self._stats_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._stopping = False
+        self._signals = 0
+        self._threads = []
+        self._running = set()
+        self.busy = 0
+        self.store.after_fork()
+        if started:
+            self.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if self._stopping:
+                    return
+            self._maintain()
+            try:
+                job = self.store.claim(self.lease_seconds)
+            except Exception as e:
+                print(f"JOB QUEUE ERROR: claim failed: {e}")
+                job = None
+            if job is None:
+                with self._condition:
+                    if not self._stopping and self._signals == 0:
+                        self._condition.wait(self.poll_interval)
+                    self._signals = max(0, self._signals - 1)
+                continue
+            self._execute(job)
+
+    def _heartbeat(self):
+        """Renew the leases of jobs running in this process until stopped."""
+        while not self._stopped.wait(self.lease_seconds / 3):
+            with self._stats_lock:
+                running = list(self._running)
+            try:
+                self.store.renew(running, self.lease_seconds)
+            except Exception as e:
+                print(f"JOB QUEUE ERROR: lease renewal failed: {e}")
+
+    def _execute(self, job: Dict[str, Any]):
+        with self._stats_lock:
+            self.busy += 1
+            self._running.add(job['id'])
+        root = None
+        if self.tracer is not None:
+            root = self.tracer.start_trace(
+                f"job {job['kind']}",
+                traceparent=job['traceparent'],
+                **{'job.id': job['id'], 'job.attempt': job['attempts']}
+            )
+        try:
+            handler, _ = self._handlers[job['kind']]
+            result, status, status_code = handler(job['payload'], job['user_id']), SUCCEEDED, 200
+        except Exception as e:
+            if root is not None:
+                root.record_exception(e)
+            result, status_code = self.on_error(e)
+            status = FAILED
+        finally:
+            if self.tracer is not None:
+                self.tracer.end_trace(root)
+
+        try:
+            self.store.finish(job['id'], status, result, status_code)
+        except Exception as e:
+            print(f"JOB QUEUE ERROR: could not store result of {job['id']}: {e}")
+        with self._stats_lock:
+            self.busy -= 1
+            self._running.discard(job['id'])
+            if status == SUCCEEDED:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+        with self._finished:
+            self._finished.notify_all()
+
+    def _maintain(self, force: bool = False):
+        """Requeue expired leases and purge old results, at most once per lease/10."""
+        now = time.time()
+        interval = min(self.lease_seconds / 10, 60.0)
+        with self._stats_lock:
+            if not force and now - self._last_maintenance < interval:
+                return
+            self._last_maintenance = now
+        try:
+            recovered = self.store.recover(now, self.max_attempts)
+            self.store.purge(now - self.result_ttl)
+        except Exception as e:
+            print(f"JOB QUEUE ERROR: maintenance failed: {e}")
+            return
+        if recovered:
+            with self._stats_lock:
+                self.recovered += recovered
+            print(f"Job queue: requeued {recovered} interrupted jobs")
+
+
+def build_job_queue(on_error=default_error_payload, tracer=None) -> JobQueue:
+    """
+    Build a job queue from environment settings.
+
+    JOB_STORE_PATH selects the SQLite store; otherwise jobs live in memory.
+    """
+    path = os.getenv('JOB_STORE_PATH')
+    store = SQLiteJobStore(path) if path else MemoryJobStore()
+    return JobQueue(
+        store,
+        workers=int(os.getenv('JOB_QUEUE_WORKERS', DEFAULT_WORKERS)),
+        lease_seconds=float(os.getenv('JOB_LEASE_SECONDS', DEFAULT_LEASE_SECONDS)),
+        max_attempts=int(os.getenv('JOB_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)),
+        result_ttl=float(os.getenv('JOB_RESULT_TTL_SECONDS', DEFAULT_RESULT_TTL_SECONDS)),
+        on_error=on_error,
+        tracer=tracer,
+        enabled=os.getenv('JOB_QUEUE_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+    )
@@ -0,0 +1,101 @@
+"""
+Lazy construction helpers.
+Defers importing and building heavyweight clients (e.g. Supabase) until the
+first attribute access, so importing the app stays cheap for worker boot.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+
+class LazyClient:
+    """
+    Proxy that builds its target on first attribute access.
+
+    The proxy is always truthy, so it can stand in for a configured client
+    in `if supabase:` checks without triggering construction.
+    """
+
+    def __init__(self, factory: Callable[[], Any], name: str = 'client'):
+        """
+        Args:
+            factory: Zero-argument callable returning the real object
+            name: Label used in repr()
+        """
+        self._factory = factory
+        self._name = name
+        self._target = None
+        self._lock = threading.Lock()
+
+    def resolve(self) -> Any:
+        """Return the real object, building it on first use."""
+        target = self._target
+        if target is None:
+            with self._lock:
+                if self._target is None:
+                    self._target = self._factory()
+                target = self._target
+        return target
+
+    def set(self, target: Any):
+        """Install the target directly (e.g. a fake backend in benchmarks)."""
+        with self._lock:
+            self._target = target
+
+    @property
+    def loaded(self) -> bool:
+        return self._target is not None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.resolve(), name)
+
+    def __bool__(self) -> bool:
+        return True
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f"<LazyClient {self._name} ({state})>"
+
+
+class AsyncLazyClient:
+    """
+    LazyClient for clients built by a coroutine (e.g. supabase's
+    create_async_client). Call sites await resolve() for the real object.
+    """
+
+    def __init__(self, factory: Callable[[], Awaitable[Any]], name: str = 'client'):
+        """
+        Args:
+            factory: Zero-argument coroutine function returning the real object
+            name: Label used in repr()
+        """
+        self._factory = factory
+        self._name = name
+        self._target = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def resolve(self) -> Any:
+        """Return the real object, building it on first use."""
+        if self._target is None:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if self._target is None:
+                    self._target = await self._factory()
+        return self._target
+
+    def set(self, target: Any):
+        """Install the target directly (e.g. a fake backend in benchmarks)."""
+        self._target = target
+
+    @property
+    def loaded(self) -> bool:
+        return self._target is not None
+
+    def __bool__(self) -> bool:
+        return True
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f"<AsyncLazyClient {self._name} ({state})>"
@@ -0,0 +1,296 @@
+"""
+In-memory leaderboard of accepted challenges.
+Per-user counts are loaded with the accepted_challenge_counts database
+function (aggregated in the database, not downloaded row by row), bumped in
+place when a challenge is accepted, and reconciled the same way in the
+background.
+The top entries live in a bounded min-heap, so an accept is O(log K) and a
+read returns a prebuilt snapshot with an ETag for conditional requests.
+"""
+
+import hashlib
+import heapq
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+DEFAULT_SIZE = 10
+DEFAULT_RECONCILE_SECONDS = 300.0
+# Users per accepted_challenge_counts call (PostgREST caps rows per response)
+PAGE_SIZE = 1000
+
+
+class TopK:
+    """
+    The K largest counts, as a min-heap with lazy deletion.
+
+    A key's older heap entries are skipped when they reach the top, and the
+    heap is rebuilt once stale entries outnumber live ones. Counts only grow
+    between rebuilds, so a key outside the top K can only get in by beating
+    the current minimum.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        # key -> (count, seq) of its live heap entry
+        self._members: Dict[str, Tuple[int, int]] = {}
+        self._heap: List[Tuple[int, int, str]] = []
+        self._seq = 0
+
+    def offer(self, key: str, count: int) -> bool:
+        """Record a key's new count. Returns True if the top K changed."""
+        if key in self._members:
+            self._push(key, count)
+            return True
+        if len(self._members) < self.size:
+            self._push(key, count)
+            return True
+
+        self._prune()
+        lowest, _, lowest_key = self._heap[0]
+        if count <= lowest:
+            return False
+        heapq.heappop(self._heap)
+        del self._members[lowest_key]
+        self._push(key, count)
+        return True
+
+    def rebuild(self, counts: Dict[str, int]) -> List[str]:
+        """Replace the contents with the K largest of `counts`; returns their keys."""
+        self._members = {}
+        self._heap = []
+        for key, count in heapq.nlargest(self.size, counts.items(), key=lambda item: item[1]):
+            self._push(key, count)
+        return list(self._members)
+
+    def items(self) -> List[Tuple[str, int]]:
+        return [(key, count) for key, (count, _) in self._members.items()]
+
+    def _push(self, key: str, count: int):
+        self._seq += 1
+        # Among equal counts the most recent arrival is evicted first
+        self._members[key] = (count, self._seq)
+        heapq.heappush(self._heap, (count, -self._seq, key))
+        if len(self._heap) > 2 * self.size + 16:
+            self._heap = [(count, -seq, key) for key, (count, seq) in self._members.items()]
+            heapq.heapify(self._heap)
+
+    def _prune(self):
+        while self._heap:
+            count, neg_seq, key = self._heap[0]
+            if self._members.get(key) == (count, -neg_seq):
+                return
+            heapq.heappop(self._heap)
+
+
+class Snapshot:
+    """One version of the leaderboard, serialized once for every reader."""
+
+    __slots__ = ('version', 'entries', 'body', 'etag')
+
+    def __init__(self, version: int, entries: List[Dict[str, Any]]):
+        self.version = version
+        self.entries = entries
+        self.body = json.dumps({'success': True, 'leaderboard': entries}).encode('utf-8')
+        # Content-based, so every worker gives the same board the same tag
+        self.etag = hashlib.sha1(self.body).hexdigest()[:20]
+
+
+class LeaderboardService:
+    """
+    Accepted-challenge counts per user with a top-K view.
+
+    Accepts recorded while a reconcile is running are applied again on top
+    of the loaded counts; one may be counted twice until the next reconcile.
+    A user who joins the board between reconciles without a known username
+    is listed by ID until then.
+    """
+
+    def __init__(
+        self,
+        supabase: Any = None,
+        size: int = DEFAULT_SIZE,
+        reconcile_interval: float = DEFAULT_RECONCILE_SECONDS
+    ):
+        """
+        Initialize the service (nothing is loaded until first use).
+
+        Args:
+            supabase: Supabase client to load counts from (None for an empty board)
+            size: Entries on the leaderboard
+            reconcile_interval: Seconds between reloads from the database
+        """
+        self.supabase = supabase
+        self.size = size
+        self.reconcile_interval = reconcile_interval
+
+        self._counts: Dict[str, int] = {}
+        self._names: Dict[str, str] = {}
+        self._top = TopK(size)
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self._reconciling = False
+        # Accepts seen since the running load started, replayed after it
+        self._during_load: Optional[List[Tuple[str, Optional[str]]]] = None
+        self._version = 0
+        self._snapshot: Optional[Snapshot] = None
+
+        self.accepts = 0
+        self.reconciles = 0
+        self.reconcile_errors = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def snapshot(self) -> Snapshot:
+        """
+        Return the current leaderboard, loading it on first use.
+
+        A stale board is served as is while a background reconcile runs.
+        Raises the database error if the first load fails.
+        """
+        if not self.loaded:
+            with self._load_lock:
+                # Concurrent first requests share one load
+                if not self.loaded:
+                    self._load()
+        elif time.monotonic() - self._loaded_at >= self.reconcile_interval:
+            self._start_reconcile()
+
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != self._version:
+                self._snapshot = Snapshot(self._version, self._ranked())
+            return self._snapshot
+
+    def record_accept(self, user_id: str, username: Optional[str] = None):
+        """Count one newly accepted challenge for a user."""
+        with self._lock:
+            self.accepts += 1
+            if self._during_load is not None:
+                self._during_load.append((user_id, username))
+            if not self.loaded:
+                return
+            self._apply(user_id, username)
+
+    def load(self):
+        """Reload every count from the database and rebuild the top K."""
+        with self._load_lock:
+            self._load()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'users': len(self._counts),
+            'version': self._version,
+            'accepts': self.accepts,
+            'reconciles': self.reconciles,
+            'reconcile_errors': self.reconcile_errors,
+        }
+
+    def _load(self):
+        # Caller holds the load lock
+        with self._lock:
+            self._during_load = []
+        try:
+            counts = self._fetch_counts()
+            top = TopK(self.size)
+            names = self._fetch_names(top.rebuild(counts))
+        except Exception:
+            with self._lock:
+                self._during_load = None
+            raise
+
+        with self._lock:
+            replay, self._during_load = self._during_load, None
+            self._counts = counts
+            self._names = names
+            self._top = top
+            for user_id, username in replay:
+                self._apply(user_id, username)
+            self._version += 1
+            self._loaded_at = time.monotonic()
+            self.reconciles += 1
+
+    def _apply(self, user_id: str, username: Optional[str]):
+        # Caller holds the lock
+        if username:
+            self._names[user_id] = username
+        count = self._counts.get(user_id, 0) + 1
+        self._counts[user_id] = count
+        if self._top.offer(user_id, count):
+            self._version += 1
+
+    def _ranked(self) -> List[Dict[str, Any]]:
+        # Caller holds the lock; K entries, sorted only when the board changed
+        ranked = sorted(
+            self._top.items(),
+            key=lambda item: (-item[1], self._names.get(item[0], item[0]))
+        )
+        return [
+            {'username': self._names.get(user_id, user_id), 'accepted_count': count}
+            for user_id, count in ranked
+        ]
+
+    def _start_reconcile(self):
+        with self._lock:
+            if self._reconciling:
+                return
+            self._reconciling = True
+        threading.Thread(target=self._reconcile, name='leaderboard-reconcile', daemon=True).start()
+
+    def _reconcile(self):
+        try:
+            self.load()
+        except Exception as e:
+            self.reconcile_errors += 1
+            # Try again after another interval rather than on every request
+            self._loaded_at = time.monotonic()
+            print(f"Warning: leaderboard reconcile failed: {e}")
+        finally:
+            self._reconciling = False
+
+    def _fetch_counts(self) -> Dict[str, int]:
+        """
+        Count accepted challenges per user in the database.
+
+        Pages are keyed on user_id, so each call resumes the grouped index
+        scan where the last one stopped instead of re-counting with OFFSET.
+        """
+        counts: Dict[str, int] = {}
+        if not self.supabase:
+            return counts
+
+        after_user = None
+        while True:
+            rows = self.supabase.rpc('accepted_challenge_counts', {
+                'after_user': after_user,
+                'limit_count': PAGE_SIZE
+            }).execute().data or []
+            for row in rows:
+                counts[row['user_id']] = row['accepted_count']
+            if len(rows) < PAGE_SIZE:
+                break
+            after_user = rows[-1]['user_id']
+        return counts
+
+    def _fetch_names(self, user_ids: List[str]) -> Dict[str, str]:
+        """Look up usernames (only needed for users on the board)."""
+        if not self.supabase or not user_ids:
+            return {}
+        rows = self.supabase.table('users').select('id, username') \
+            .in_('id', user_ids) \
+            .execute().data or []
+        return {row['id']: row['username'] for row in rows}
+
+
+def build_leaderboard(supabase: Any = None) -> LeaderboardService:
+    """Build a leaderboard configured from environment settings."""
+    return LeaderboardService(
+        supabase=supabase,
+        size=int(os.getenv('LEADERBOARD_SIZE', DEFAULT_SIZE)),
+        reconcile_interval=float(os.getenv('LEADERBOARD_RECONCILE_SECONDS', DEFAULT_RECONCILE_SECONDS))
+    )
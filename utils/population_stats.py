@@ -0,0 +1,384 @@
+"""
+Population statistics over saved footprints.
+Every saved footprint updates an in-memory score histogram and per-category
+option counters, so /api/stats answers "where do I sit" without scanning
+the footprints table. Each worker snapshots its counts to a JSON file in a
+shared directory and merges its peers' files into the view it serves.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+from glob import escape, glob
+from typing import Any, Dict, Optional
+
+from agents.estimator import CarbonEstimator
+from utils.write_spool import pid_alive
+
+
+DEFAULT_DIRECTORY = 'data/population_stats'
+DEFAULT_SNAPSHOT_SECONDS = 30.0
+
+# Percentiles included in every summary
+PERCENTILES = (10, 25, 50, 75, 90)
+
+WORKER_PREFIX = 'worker-'
+
+
+class PopulationStats:
+    """
+    Score histogram and per-category option counts.
+
+    Scores are small integers (the sum of CarbonEstimator.WEIGHTS), so an
+    exact count per score replaces a quantile sketch: it is smaller, has
+    no error, and merges by adding counts.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.scores: Dict[int, int] = {}
+        self.categories: Dict[str, Dict[str, int]] = {
+            category: {} for category in CarbonEstimator.CATEGORIES
+        }
+
+    def add(self, inputs: Dict[str, Any], total_score: float, count: int = 1):
+        """Count one footprint (or `count` identical ones)."""
+        score = int(round(total_score))
+        self.count += count
+        self.scores[score] = self.scores.get(score, 0) + count
+        for category, options in CarbonEstimator.OPTION_INDEX.items():
+            value = inputs.get(category)
+            if isinstance(value, str) and value in options:
+                counts = self.categories[category]
+                counts[value] = counts.get(value, 0) + count
+
+    def merge(self, other: 'PopulationStats'):
+        """Add another worker's (or snapshot's) counts to these."""
+        self.count += other.count
+        for score, count in other.scores.items():
+            self.scores[score] = self.scores.get(score, 0) + count
+        for category, counts in other.categories.items():
+            merged = self.categories.setdefault(category, {})
+            for value, count in counts.items():
+                merged[value] = merged.get(value, 0) + count
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'scores': {str(score): count for score, count in self.scores.items()},
+            'categories': self.categories,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PopulationStats':
+        stats = cls()
+        stats.count = int(data.get('count', 0))
+        stats.scores = {int(score): int(count) for score, count in data.get('scores', {}).items()}
+        for category, counts in data.get('categories', {}).items():
+            stats.categories[category] = {value: int(count) for value, count in counts.items()}
+        return stats
+
+
+class StatsSnapshot:
+    """One merged view of the population, summarized once for every reader."""
+
+    __slots__ = ('version', 'summary', 'body', 'etag', '_below', '_low', '_count')
+
+    def __init__(self, version: int, stats: PopulationStats):
+        self.version = version
+        self._count = stats.count
+
+        # _below[i] = footprints scoring under _low + i, for O(1) percentile ranks
+        scores = sorted(stats.scores)
+        self._low = scores[0] if scores else 0
+        high = scores[-1] if scores else 0
+        self._below = [0] * (high - self._low + 2)
+        for score in range(self._low, high + 1):
+            index = score - self._low
+            self._below[index + 1] = self._below[index] + stats.scores.get(score, 0)
+
+        self.summary = {
+            'success': True,
+            'count': stats.count,
+            'score': self._score_summary(stats, scores),
+            'categories': {
+                category: {
+                    value: {'count': count, 'share': round(100.0 * count / stats.count, 2)}
+                    for value, count in counts.items()
+                }
+                for category, counts in stats.categories.items()
+            } if stats.count else {},
+        }
+        self.body = json.dumps(self.summary).encode('utf-8')
+        self.etag = hashlib.sha1(self.body).hexdigest()[:20]
+
+    def percentile_rank(self, score: float) -> Optional[float]:
+        """
+        Percentage of footprints scoring below `score` (ties count half),
+        or None before anything has been counted.
+        """
+        if not self._count:
+            return None
+        offset = int(round(score)) - self._low
+        if offset < 0:
+            below, equal = 0, 0
+        elif offset >= len(self._below) - 1:
+            below, equal = self._count, 0
+        else:
+            below = self._below[offset]
+            equal = self._below[offset + 1] - below
+        return round(100.0 * (below + equal / 2) / self._count, 2)
+
+    def _score_summary(self, stats: PopulationStats, scores: list) -> Dict[str, Any]:
+        if not stats.count:
+            return {}
+        percentiles = {}
+        targets = iter((p, p / 100 * stats.count) for p in PERCENTILES)
+        p, target = next(targets)
+        seen = 0
+        for score in scores:
+            seen += stats.scores[score]
+            while p is not None and seen >= target:
+                percentiles[f'p{p}'] = score
+                p, target = next(targets, (None, None))
+        return {
+            'mean': round(sum(score * count for score, count in stats.scores.items()) / stats.count, 2),
+            'min': scores[0],
+            'max': scores[-1],
+            'percentiles': percentiles,
+        }
+
+
+class PopulationStatsService:
+    """
+    This worker's counts plus its peers' snapshot files.
+
+    Each worker writes `worker-<pid>.json`; any other JSON file in the
+    directory (e.g. a seed built from the footprints table) is merged as a
+    read-only contribution. At start-up a worker adopts the files of
+    workers that are no longer running, so restarts neither lose nor
+    double count footprints.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = DEFAULT_DIRECTORY,
+        snapshot_interval: float = DEFAULT_SNAPSHOT_SECONDS
+    ):
+        """
+        Initialize the service (nothing is read until start()).
+
+        Args:
+            directory: Shared snapshot directory (None keeps counts in memory only)
+            snapshot_interval: Seconds between writing this worker's file and
+                re-reading its peers'
+        """
+        self.directory = directory
+        self.snapshot_interval = snapshot_interval
+
+        self._local = PopulationStats()
+        self._peers: Dict[str, PopulationStats] = {}
+        self._peer_mtimes: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._version = 0
+        self._snapshot: Optional[StatsSnapshot] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._hooks_registered = False
+
+        self.snapshots_written = 0
+        self.adopted = 0
+
+    @property
+    def path(self) -> Optional[str]:
+        """This worker's snapshot file (by current PID, so forked workers differ)."""
+        if self.directory is None:
+            return None
+        return os.path.join(self.directory, f'{WORKER_PREFIX}{os.getpid()}.json')
+
+    def start(self):
+        """
+        Adopt dead workers' counts, load peers and start snapshotting (idempotent).
+
+        Threads do not survive fork(), so a server that imports the app
+        before forking workers gets each child started as a worker of its own.
+        """
+        if self.directory is None or self._thread is not None:
+            return
+        if not self._hooks_registered:
+            self._hooks_registered = True
+            atexit.register(self.stop)
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=self._after_fork)
+        os.makedirs(self.directory, exist_ok=True)
+        self._adopt()
+        self.refresh()
+        self._thread = threading.Thread(target=self._run, name='population-stats', daemon=True)
+        self._thread.start()
+
+    def record(self, inputs: Dict[str, Any], total_score: float):
+        """Count one saved footprint."""
+        with self._lock:
+            self._local.add(inputs, total_score)
+            self._dirty = True
+            self._version += 1
+
+    def snapshot(self) -> StatsSnapshot:
+        """Return the merged statistics, rebuilt only when something changed."""
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != self._version:
+                merged = PopulationStats()
+                merged.merge(self._local)
+                for peer in self._peers.values():
+                    merged.merge(peer)
+                self._snapshot = StatsSnapshot(self._version, merged)
+            return self._snapshot
+
+    def save(self):
+        """Write this worker's counts to its snapshot file if they changed."""
+        if self.path is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            # A copy, so recording can continue while the file is written
+            local = PopulationStats.from_dict(self._local.to_dict())
+            self._dirty = False
+        write_snapshot(self.path, local)
+        self.snapshots_written += 1
+
+    def refresh(self):
+        """Re-read peers' snapshot files that changed since the last read."""
+        if self.directory is None:
+            return
+        peers: Dict[str, PopulationStats] = {}
+        mtimes: Dict[str, float] = {}
+        changed = False
+        for path in glob(os.path.join(escape(self.directory), '*.json')):
+            if path == self.path:
+                continue
+            try:
+                mtime = os.path.getmtime(path)
+                if path in self._peers and self._peer_mtimes.get(path) == mtime:
+                    peers[path] = self._peers[path]
+                else:
+                    peers[path] = read_snapshot(path)
+                    changed = True
+            except (OSError, ValueError) as e:
+                # Removed or being replaced between glob and read; next refresh sees it
+                print(f"Warning: skipped population stats snapshot {path}: {e}")
+                continue
+            mtimes[path] = mtime
+
+        with self._lock:
+            if changed or set(peers) != set(self._peers):
+                self._version += 1
+            self._peers = peers
+            self._peer_mtimes = mtimes
+
+    def stop(self):
+        """Stop snapshotting and write a final snapshot."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5.0)
+        self.save()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'local_count': self._local.count,
+            'peers': len(self._peers),
+            'snapshots_written': self.snapshots_written,
+            'adopted': self.adopted,
+        }
+
+    def _after_fork(self):
+        """
+        In a forked child: start over with empty counts (the parent keeps
+        its own, including any it adopted, in its own snapshot file).
+        """
+        started = self._thread is not None and not self._stop.is_set()
+        self._local = PopulationStats()
+        self._peers = {}
+        self._peer_mtimes = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._version += 1
+        self._snapshot = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.snapshots_written = 0
+        self.adopted = 0
+        if started:
+            self.start()
+
+    def _run(self):
+        while not self._stop.wait(self.snapshot_interval):
+            try:
+                self.save()
+                self.refresh()
+            except Exception as e:
+                print(f"Warning: population stats snapshot failed: {e}")
+
+    def _adopt(self):
+        """
+        Merge snapshot files left by workers that have exited into our own
+        counts. A file is claimed by renaming it first, so two new workers
+        never both adopt it; claims left by a crash are adopted again.
+        """
+        pattern = os.path.join(escape(self.directory), f'{WORKER_PREFIX}*.json')
+        claimed_pattern = pattern + '.claimed-*'
+        for path in glob(pattern) + glob(claimed_pattern):
+            if '.claimed-' in path:
+                owner = path.rsplit('-', 1)[-1]
+            else:
+                owner = os.path.basename(path)[len(WORKER_PREFIX):-len('.json')]
+            # A file with our own PID is from an earlier process (e.g. PID 1 in a container)
+            if owner.isdigit() and int(owner) != os.getpid() and pid_alive(int(owner)):
+                continue
+
+            claimed = f"{path.split('.claimed-')[0]}.claimed-{os.getpid()}"
+            try:
+                os.replace(path, claimed)
+                stats = read_snapshot(claimed)
+            except FileNotFoundError:
+                continue  # another worker claimed it first
+            except ValueError as e:
+                print(f"Warning: discarded unreadable population stats snapshot {path}: {e}")
+                os.remove(claimed)
+                continue
+            with self._lock:
+                self._local.merge(stats)
+                self._dirty = True
+                self._version += 1
+            self.save()
+            os.remove(claimed)
+            self.adopted += 1
+
+
+def read_snapshot(path: str) -> PopulationStats:
+    """Load counts from a snapshot file."""
+    with open(path, encoding='utf-8') as f:
+        return PopulationStats.from_dict(json.load(f))
+
+
+def write_snapshot(path: str, stats: PopulationStats):
+    """Write counts to a snapshot file, atomically so readers never see half of it."""
+    data = stats.to_dict()
+    temp = f'{path}.tmp'
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+
+
+def build_population_stats() -> PopulationStatsService:
+    """Build the service configured from environment settings."""
+    directory = os.getenv('POPULATION_STATS_DIR', DEFAULT_DIRECTORY)
+    return PopulationStatsService(
+        directory=directory or None,
+        snapshot_interval=float(os.getenv('POPULATION_STATS_SNAPSHOT_SECONDS', DEFAULT_SNAPSHOT_SECONDS))
+    )
@@ -0,0 +1,42 @@
+"""
+Server-Sent Events helpers.
+Formats events for `text/event-stream` responses consumed by the dashboard.
+"""
+
+import json
+from typing import Any, Dict, Optional
+
+
+SSE_MIMETYPE = 'text/event-stream'
+
+# Disable proxy buffering so events reach the browser as they are produced
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no',
+}
+
+# Comment line sent on idle streams so proxies keep the connection open
+SSE_KEEPALIVE = ': keep-alive\n\n'
+
+
+def format_sse(data: Any, event: Optional[str] = None) -> str:
+    """
+    Format a single SSE message.
+
+    Args:
+        data: JSON-serializable payload
+        event: Optional event name (defaults to "message" on the client)
+
+    Returns:
+        Wire-format event terminated by a blank line
+    """
+    lines = []
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def sse_error(payload: Dict[str, Any], status: int) -> str:
+    """Format an error event carrying the HTTP status it would have had."""
+    return format_sse(dict(payload, status=status), event='error')
@@ -0,0 +1,141 @@
+"""
+Instrumented Supabase client.
+Wraps a supabase-py client so every `.execute()` records round-trip latency
+and errors per table and operation (plus a tracing span), without changing
+call sites. InstrumentedAsyncSupabase does the same for the AsyncClient.
+
+Every query also goes through the `supabase` circuit breaker, so while the
+database is down calls fail fast with CircuitOpenError.
+"""
+
+import time
+from typing import Any
+
+from utils.circuit_breaker import CircuitBreaker, get_breaker
+from utils.metrics import REGISTRY
+from utils.tracing import span
+
+
+DB_LATENCY = REGISTRY.histogram(
+    'supabase_request_duration_seconds',
+    'Supabase round-trip latency per table and operation',
+    ('table', 'operation')
+)
+DB_ERRORS = REGISTRY.counter(
+    'supabase_errors_total',
+    'Failed Supabase requests per table and operation',
+    ('table', 'operation')
+)
+
+# Query builder methods that decide the HTTP operation
+_OPERATIONS = frozenset(('select', 'insert', 'update', 'upsert', 'delete'))
+
+# PostgREST codes for an unreachable database, and Postgres SQLSTATE classes
+# for connection, resource and system errors
+_OUTAGE_CODES = ('PGRST000', 'PGRST001', 'PGRST002', 'PGRST003')
+_OUTAGE_SQLSTATES = ('08', '53', '57', '58')
+
+
+def is_outage(error: Exception) -> bool:
+    """
+    True for errors that suggest Supabase is down (network errors, timeouts,
+    5xx), False for request errors such as constraint violations.
+    """
+    code = getattr(error, 'code', None)
+    if isinstance(code, int):
+        return code >= 500
+    if isinstance(code, str) and code:
+        if code.startswith('PGRST'):
+            return code in _OUTAGE_CODES
+        if code.isdigit() and len(code) == 3:
+            return code.startswith('5')
+        return code[:2] in _OUTAGE_SQLSTATES
+    return True
+
+
+def get_supabase_breaker() -> CircuitBreaker:
+    return get_breaker('supabase', is_failure=is_outage)
+
+
+class _InstrumentedQuery:
+    """Proxy for a query builder that remembers its table and operation."""
+
+    __slots__ = ('_builder', '_table', '_operation')
+
+    def __init__(self, builder: Any, table: str, operation: str):
+        self._builder = builder
+        self._table = table
+        self._operation = operation
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            return attr
+        operation = name if name in _OPERATIONS else self._operation
+
+        def chained(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return type(self)(result, self._table, operation)
+        return chained
+
+    def _without_retries(self) -> Any:
+        # postgrest-py retries GETs on 503 with 1s/2s/4s sleeps; the breaker
+        # handles outages, so a failed read should fail at once
+        retry = getattr(self._builder, 'retry', None)
+        return retry(False) if retry is not None else self._builder
+
+    def execute(self) -> Any:
+        # Rejected calls (breaker open) are not timed as round trips
+        with get_supabase_breaker().guard():
+            start = time.perf_counter()
+            try:
+                with span(f'supabase.{self._operation}', table=self._table):
+                    return self._without_retries().execute()
+            except Exception:
+                DB_ERRORS.labels(self._table, self._operation).inc()
+                raise
+            finally:
+                DB_LATENCY.labels(self._table, self._operation).observe(time.perf_counter() - start)
+
+
+class _InstrumentedAsyncQuery(_InstrumentedQuery):
+    """_InstrumentedQuery for async query builders (execute() is awaited)."""
+
+    __slots__ = ()
+
+    async def execute(self) -> Any:
+        with get_supabase_breaker().guard():
+            start = time.perf_counter()
+            try:
+                with span(f'supabase.{self._operation}', table=self._table):
+                    return await self._without_retries().execute()
+            except Exception:
+                DB_ERRORS.labels(self._table, self._operation).inc()
+                raise
+            finally:
+                DB_LATENCY.labels(self._table, self._operation).observe(time.perf_counter() - start)
+
+
+class InstrumentedSupabase:
+    """Drop-in wrapper for a supabase-py Client (table() and rpc() are timed)."""
+
+    _query_class = _InstrumentedQuery
+
+    def __init__(self, client: Any):
+        self._client = client
+
+    def table(self, name: str) -> _InstrumentedQuery:
+        return self._query_class(self._client.table(name), name, 'select')
+
+    def rpc(self, fn: str, params: Any = None, *args, **kwargs) -> _InstrumentedQuery:
+        builder = self._client.rpc(fn, params or {}, *args, **kwargs)
+        return self._query_class(builder, fn, 'rpc')
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+class InstrumentedAsyncSupabase(InstrumentedSupabase):
+    """Drop-in wrapper for a supabase-py AsyncClient."""
+
+    _query_class = _InstrumentedAsyncQuery
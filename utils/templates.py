@@ -0,0 +1,55 @@
+"""
+Precompiled prompt templates.
+Parses a str.format template once at import so rendering on the request path
+is a single join, producing exactly what template.format(**values) would.
+"""
+
+from string import Formatter
+from typing import Any, List, Optional, Tuple
+
+
+class PromptTemplate:
+    """A str.format template parsed once and rendered many times."""
+
+    __slots__ = ('template', 'fields', '_parts')
+
+    def __init__(self, template: str):
+        """
+        Compile a template.
+
+        Args:
+            template: str.format-style template with named fields
+        """
+        self.template = template
+        # (literal_text, field_name, format_spec, conversion) with escapes resolved
+        self._parts: List[Tuple[str, Optional[str], str, Optional[str]]] = list(
+            Formatter().parse(template)
+        )
+        self.fields = tuple(
+            name for _, name, _, _ in self._parts if name is not None
+        )
+
+    def render(self, **values: Any) -> str:
+        """
+        Render the template.
+
+        Raises:
+            KeyError: If a field is missing from `values`
+        """
+        out = []
+        for literal, name, spec, conversion in self._parts:
+            out.append(literal)
+            if name is None:
+                continue
+            value = values[name]
+            if conversion == 'r':
+                value = repr(value)
+            elif conversion == 's':
+                value = str(value)
+            elif conversion == 'a':
+                value = ascii(value)
+            out.append(format(value, spec))
+        return ''.join(out)
+
+    def __repr__(self) -> str:
+        return f"PromptTemplate(fields={self.fields!r})"
@@ -0,0 +1,435 @@
+"""
+Lightweight request tracing.
+Spans follow the OpenTelemetry data model (trace/span IDs, W3C traceparent
+propagation, attributes, status) but need no collector: sampled traces are
+appended to a local JSONL file, one trace per line. A configurable fraction
+of traced requests can also be profiled with cProfile or a stack sampler.
+
+Unsampled requests get a shared no-op span, so instrumented code costs one
+context variable lookup per span.
+"""
+
+import contextvars
+import cProfile
+import functools
+import inspect
+import ipaddress
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter as CallCounter
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+
+T = TypeVar('T')
+
+DEFAULT_TRACE_PATH = os.path.join('data', 'traces.jsonl')
+DEFAULT_PROFILE_DIR = os.path.join('data', 'profiles')
+DEFAULT_SAMPLER_INTERVAL = 0.005
+DEFAULT_MAX_TRACES_PER_SECOND = 10.0
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+
+
+class _NoopSpan:
+    """Stand-in returned when the current request is not being traced."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_exception(self, error: BaseException):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """Spans collected for one sampled request."""
+
+    __slots__ = ('trace_id', 'spans', 'lock', 'profiler')
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List['Span'] = []
+        self.lock = threading.Lock()
+        self.profiler = None
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = (
+        'name', 'trace', 'span_id', 'parent_id', 'start_ns', 'end_ns',
+        'attributes', 'status', 'status_message', '_token'
+    )
+
+    def __init__(self, name: str, trace: Trace, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace = trace
+        self.span_id = '%016x' % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.status = 'UNSET'
+        self.status_message = None
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_exception(self, error: BaseException):
+        self.status = 'ERROR'
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            with self.trace.lock:
+                self.trace.spans.append(self)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.record_exception(exc)
+        self.end()
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Exited from a different context (e.g. a generator resumed elsewhere)
+            pass
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize using OpenTelemetry (OTLP JSON) field names."""
+        return {
+            'traceId': self.trace.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent_id,
+            'name': self.name,
+            'startTimeUnixNano': self.start_ns,
+            'endTimeUnixNano': self.end_ns,
+            'durationMs': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'attributes': self.attributes,
+            'status': {'code': self.status, 'message': self.status_message},
+        }
+
+
+def span(name: str, **attributes: Any):
+    """
+    Start a child span of the current span.
+
+    Use as a context manager; returns a no-op span when the current
+    request is not sampled.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(name, parent.trace, parent.span_id, attributes)
+
+
+def current_span():
+    """Return the active span (or the no-op span)."""
+    return _current_span.get() or NOOP_SPAN
+
+
+def traced(name: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Decorator that wraps a function (or coroutine function) in a span."""
+    def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def bind_context(func: Callable[..., T]) -> Callable[..., T]:
+    """Carry the caller's trace context into another thread (e.g. an executor)."""
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.run(func, *args, **kwargs)
+    return wrapper
+
+
+def parse_traceparent(header: Optional[str]):
+    """
+    Parse a W3C traceparent header.
+
+    Returns:
+        Tuple of (trace_id, parent_span_id, sampled), or None if invalid
+    """
+    if not header:
+        return None
+    parts = header.strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3], 16)
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+def parse_trusted_sources(raw: Optional[str]) -> List[Any]:
+    """
+    Parse a comma-separated list of IP addresses and CIDR ranges.
+
+    Raises:
+        ValueError: If an entry is not an address or network
+    """
+    return [ipaddress.ip_network(entry.strip(), strict=False) for entry in (raw or '').split(',') if entry.strip()]
+
+
+class StackSampler:
+    """
+    Statistical profiler: samples one thread's stack at a fixed interval and
+    writes collapsed stacks (flamegraph / speedscope "folded" format).
+    """
+
+    def __init__(self, thread_id: int, interval: float = DEFAULT_SAMPLER_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: CallCounter = CallCounter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, path: str):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Tracer:
+    """Samples requests, owns the JSONL exporter and the optional profilers."""
+
+    def __init__(
+        self,
+        sample_rate: float = 0.0,
+        path: str = DEFAULT_TRACE_PATH,
+        profile_rate: float = 0.0,
+        profile_mode: str = 'cprofile',
+        profile_dir: str = DEFAULT_PROFILE_DIR,
+        trust_traceparent: bool = False,
+        trusted_sources: Optional[List[Any]] = None,
+        max_per_second: float = DEFAULT_MAX_TRACES_PER_SECOND
+    ):
+        """
+        Initialize the tracer.
+
+        Args:
+            sample_rate: Fraction of requests traced locally
+            path: JSONL file that sampled traces are appended to
+            profile_rate: Fraction of traced requests that are also profiled
+            profile_mode: 'cprofile' (deterministic, request thread only) or
+                'sampler' (statistical stack sampling)
+            profile_dir: Directory for profile output files
+            trust_traceparent: Honour the sampled flag of every incoming
+                traceparent (only safe behind a proxy that sets it)
+            trusted_sources: Networks whose sampled traceparent is honoured;
+                anyone else's keeps its trace ID but is sampled locally
+            max_per_second: Cap on traces started per second (0 disables
+                the cap), so a burst cannot flood the exporter or profilers
+        """
+        self.sample_rate = sample_rate
+        self.path = path
+        self.profile_rate = profile_rate
+        self.profile_mode = profile_mode
+        self.profile_dir = profile_dir
+        self.trust_traceparent = trust_traceparent
+        self.trusted_sources = trusted_sources or []
+        self.max_per_second = max_per_second
+        self._write_lock = threading.Lock()
+
+        # Token bucket holding up to one second's worth of traces
+        self._rate_lock = threading.Lock()
+        self._tokens = max_per_second
+        self._refilled = time.monotonic()
+        self.dropped = 0
+
+    def start_trace(
+        self,
+        name: str,
+        traceparent: Optional[str] = None,
+        remote_addr: Optional[str] = None,
+        **attributes: Any
+    ) -> Optional[Span]:
+        """
+        Start a root span for a request if it is sampled.
+
+        Args:
+            name: Root span name
+            traceparent: Incoming W3C traceparent header, if any
+            remote_addr: Client address, checked against trusted_sources
+
+        Returns:
+            The active root span, or None when the request is not traced
+        """
+        incoming = parse_traceparent(traceparent)
+        if incoming is not None and self._trusted(remote_addr):
+            trace_id, parent_id, sampled = incoming
+        else:
+            # Untrusted callers still get their trace ID joined up, not their sampling decision
+            trace_id, parent_id = incoming[:2] if incoming is not None else (None, None)
+            sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        if not sampled or not self._take_token():
+            # Clear anything left by an earlier request on this thread
+            _current_span.set(None)
+            return None
+
+        trace = Trace(trace_id or '%032x' % random.getrandbits(128))
+        root = Span(name, trace, parent_id, attributes)
+        _current_span.set(root)
+
+        if self.profile_rate > 0 and random.random() < self.profile_rate:
+            self._start_profiler(trace)
+        return root
+
+    def end_trace(self, root: Optional[Span]):
+        """End the root span, stop any profiler and export the trace."""
+        if root is None:
+            return
+        if _current_span.get() is root:
+            _current_span.set(None)
+        trace = root.trace
+        if trace.profiler is not None:
+            root.set_attribute('profile.path', self._stop_profiler(trace))
+        root.end()
+        self.export(trace)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'dropped_over_rate': self.dropped}
+
+    def traceparent(self, root: Span) -> str:
+        """W3C traceparent header value for a span."""
+        return f"00-{root.trace.trace_id}-{root.span_id}-01"
+
+    def export(self, trace: Trace):
+        with trace.lock:
+            spans = sorted(trace.spans, key=lambda s: s.start_ns)
+        record = {'traceId': trace.trace_id, 'spans': [s.to_dict() for s in spans]}
+        line = json.dumps(record, default=str)
+
+        directory = os.path.dirname(self.path)
+        with self._write_lock:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
+
+    def _trusted(self, remote_addr: Optional[str]) -> bool:
+        if self.trust_traceparent:
+            return True
+        if not remote_addr or not self.trusted_sources:
+            return False
+        try:
+            address = ipaddress.ip_address(remote_addr)
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted_sources)
+
+    def _take_token(self) -> bool:
+        if self.max_per_second <= 0:
+            return True
+        with self._rate_lock:
+            now = time.monotonic()
+            self._tokens = min(self.max_per_second, self._tokens + (now - self._refilled) * self.max_per_second)
+            self._refilled = now
+            if self._tokens < 1:
+                self.dropped += 1
+                return False
+            self._tokens -= 1
+            return True
+
+    def _start_profiler(self, trace: Trace):
+        if self.profile_mode == 'sampler':
+            trace.profiler = StackSampler(threading.get_ident())
+            trace.profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Python 3.12+ allows one active profiler; skip this request
+                return
+            trace.profiler = profiler
+
+    def _stop_profiler(self, trace: Trace) -> str:
+        os.makedirs(self.profile_dir, exist_ok=True)
+        profiler, trace.profiler = trace.profiler, None
+        if isinstance(profiler, StackSampler):
+            profiler.stop()
+            path = os.path.join(self.profile_dir, f"{trace.trace_id}.folded")
+            profiler.dump(path)
+        else:
+            profiler.disable()
+            path = os.path.join(self.profile_dir, f"{trace.trace_id}.prof")
+            profiler.dump_stats(path)
+        return path
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer configured from the environment."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer(
+                    sample_rate=float(os.getenv('TRACE_SAMPLE_RATE', 0.0)),
+                    path=os.getenv('TRACE_PATH', DEFAULT_TRACE_PATH),
+                    profile_rate=float(os.getenv('PROFILE_SAMPLE_RATE', 0.0)),
+                    profile_mode=os.getenv('PROFILE_MODE', 'cprofile'),
+                    profile_dir=os.getenv('PROFILE_DIR', DEFAULT_PROFILE_DIR),
+                    trust_traceparent=os.getenv('TRACE_TRUST_TRACEPARENT', '').lower() in ('1', 'true', 'yes'),
+                    trusted_sources=parse_trusted_sources(os.getenv('TRACE_TRUSTED_SOURCES')),
+                    max_per_second=float(os.getenv('TRACE_MAX_PER_SECOND', DEFAULT_MAX_TRACES_PER_SECOND))
+                )
+    return _tracer
@@ -0,0 +1,325 @@
+"""
+Write-behind queue for Supabase inserts.
+Routes enqueue rows and return immediately; a background thread batches them
+into multi-row inserts, flushing by size or interval, retrying failures with
+backoff, and draining on shutdown. With a WriteSpool, rows that cannot be
+written because the database is down are spooled locally and replayed once
+it recovers.
+"""
+
+import atexit
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils.write_spool import WriteSpool
+
+
+class WriteBehindQueue:
+    """
+    Batches inserts per table and writes them from a background thread.
+
+    Rows should carry a client-generated primary key when the caller needs
+    the ID before the row is written.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        enabled: bool = True,
+        spool: Optional[WriteSpool] = None,
+        is_outage: Optional[Callable[[Exception], bool]] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        replay_interval: float = 5.0
+    ):
+        """
+        Initialize the queue.
+
+        Args:
+            client: Supabase client (anything with .table(name).insert(rows).execute())
+            batch_size: Flush as soon as this many rows are pending
+            flush_interval: Flush at least this often (seconds)
+            max_pending: Above this, enqueue() writes synchronously (backpressure)
+            max_retries: Attempts per batch before the rows are dropped
+            backoff: Base delay (seconds) for exponential retry backoff
+            enabled: If False, every enqueue() is a synchronous insert
+            spool: Where writes go while the database is down (None drops
+                them after max_retries, as before)
+            is_outage: Decides whether an error means the database is down
+                (default: every error)
+            breaker: Database circuit breaker; replays wait while it is open
+            replay_interval: Seconds between attempts to replay the spool
+        """
+        self.client = client
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.enabled = enabled
+        self.spool = spool
+        self.is_outage = is_outage or (lambda error: True)
+        self.breaker = breaker
+        self.replay_interval = replay_interval
+
+        self._last_replay = 0.0
+        self._replay_lock = threading.Lock()
+        self._pending: List[Tuple[str, Dict]] = []
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._hooks_registered = False
+
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    def start(self):
+        """
+        Start the background writer (idempotent) and drain it at exit.
+
+        Threads do not survive fork(), so a server that imports the app
+        before forking workers gets the writer restarted in each child.
+        """
+        if self.spool is not None:
+            self.spool.recover()
+        if not self.enabled or self._thread is not None:
+            return
+        if not self._hooks_registered:
+            self._hooks_registered = True
+            atexit.register(self.stop)
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=self._after_fork)
+        self._thread = threading.Thread(
+            target=self._run,
+            name='write-behind',
+            daemon=True
+        )
+        self._thread.start()
+
+    def enqueue(self, table: str, row: Dict):
+        """Queue a row for insertion into `table`."""
+        if not self.enabled or self._thread is None:
+            self.insert(table, [row])
+            self.replay_spool()
+            return
+
+        with self._condition:
+            if len(self._pending) >= self.max_pending:
+                backpressure = True
+            else:
+                backpressure = False
+                self._pending.append((table, row))
+                if len(self._pending) >= self.batch_size:
+                    self._condition.notify()
+
+        if backpressure:
+            self.insert(table, [row])
+
+    def insert(self, table: str, rows: List[Dict]):
+        """Insert rows synchronously, spooling them if the database is down."""
+        if self._behind_spool(table, rows):
+            return
+        try:
+            self._insert(table, rows)
+        except Exception as e:
+            if self.spool is None or not self.is_outage(e):
+                raise
+            self.spool.append_insert(table, rows)
+
+    def update(self, table: str, values: Dict, match: Dict) -> Optional[List[Dict]]:
+        """
+        Update rows synchronously, spooling the update if the database is down.
+
+        Returns:
+            The updated rows, or None if the update was spooled
+        """
+        if self.spool is not None and self.spool.pending():
+            # The rows it targets may still be in the spool
+            self.replay_spool(force=True)
+            if self.spool.pending():
+                self.spool_update(table, values, match)
+                return None
+        try:
+            return self._update(table, values, match)
+        except Exception as e:
+            if self.spool is None or not self.is_outage(e):
+                raise
+            self.spool_update(table, values, match)
+            return None
+
+    def spool_update(self, table: str, values: Dict, match: Dict):
+        """
+        Spool an update for replay, after any queued rows it may target
+        (e.g. accepting a challenge whose insert has not been written yet).
+        """
+        self.flush()
+        self.spool.append_update(table, values, match)
+
+    def flush(self):
+        """Write every pending row now, including any batch already in flight."""
+        with self._flush_lock:
+            self._write_batch(self._take_pending())
+
+    def replay_spool(self, force: bool = False) -> int:
+        """
+        Replay spooled writes if the database looks healthy, at most once
+        per replay_interval unless forced. Returns the number applied.
+        """
+        if self.spool is None or not self.spool.pending():
+            return 0
+        if self.breaker is not None and self.breaker.is_open():
+            return 0
+        now = time.monotonic()
+        if not force and now - self._last_replay < self.replay_interval:
+            return 0
+        # A forced replay waits for one in progress, so it returns once it has finished
+        if not self._replay_lock.acquire(blocking=force):
+            return 0
+        try:
+            self._last_replay = now
+            applied = self.spool.replay(self._apply, self.is_outage)
+        finally:
+            self._replay_lock.release()
+        if applied:
+            print(f"Write spool: replayed {applied} writes")
+        return applied
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the writer after draining pending rows."""
+        with self._condition:
+            if self._stopping:
+                return
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            'pending': len(self._pending),
+            'written': self.written,
+            'failed': self.failed,
+            'batches': self.batches,
+        }
+        if self.spool is not None:
+            stats['spool'] = self.spool.stats()
+        return stats
+
+    def _take_pending(self) -> List[Tuple[str, Dict]]:
+        with self._condition:
+            batch, self._pending = self._pending, []
+        return batch
+
+    def _after_fork(self):
+        """In a forked child: replace inherited locks and restart the writer."""
+        started = self._thread is not None and not self._stopping
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        # Rows queued before the fork are still written by the parent
+        self._pending = []
+        self._stopping = False
+        self._thread = None
+        if self.spool is not None:
+            self.spool.after_fork()
+        if started:
+            self.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._stopping and len(self._pending) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                stopping = self._stopping
+            # Take the batch under the flush lock so flush() waits for it
+            with self._flush_lock:
+                self._write_batch(self._take_pending())
+            if stopping:
+                return
+            self.replay_spool()
+
+    def _write_batch(self, batch: List[Tuple[str, Dict]]):
+        if not batch:
+            return
+
+        # Group by table and column set; PostgREST bulk inserts need uniform keys
+        groups: Dict[Tuple[str, frozenset], List[Dict]] = defaultdict(list)
+        for table, row in batch:
+            groups[(table, frozenset(row))].append(row)
+
+        for (table, _), rows in groups.items():
+            for start in range(0, len(rows), self.batch_size):
+                chunk = rows[start:start + self.batch_size]
+                if not self._behind_spool(table, chunk):
+                    self._insert_with_retry(table, chunk)
+
+    def _behind_spool(self, table: str, rows: List[Dict]) -> bool:
+        """
+        Keep new rows behind older spooled writes they may depend on (e.g. a
+        footprint after its user's row): replay the spool first, and if it
+        cannot be emptied, spool the rows too. Returns True if they were spooled.
+        """
+        if self.spool is None or not self.spool.pending():
+            return False
+        self.replay_spool(force=True)
+        if not self.spool.pending():
+            return False
+        self.spool.append_insert(table, rows)
+        return True
+
+    def _insert_with_retry(self, table: str, rows: List[Dict]):
+        for attempt in range(self.max_retries):
+            try:
+                self._insert(table, rows)
+                return
+            except Exception as e:
+                outage = self.is_outage(e)
+                if self.spool is not None and outage and (
+                    isinstance(e, CircuitOpenError) or attempt == self.max_retries - 1
+                ):
+                    # The database is down; keep the rows for replay
+                    self.spool.append_insert(table, rows)
+                    return
+                if attempt == self.max_retries - 1:
+                    with self._stats_lock:
+                        self.failed += len(rows)
+                    print(f"WRITE-BEHIND ERROR: dropped {len(rows)} {table} rows: {e}")
+                    return
+                # Exponential backoff with full jitter
+                time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    def _apply(self, entry: Dict):
+        """Perform one spooled write."""
+        if entry['op'] == 'update':
+            self._update(entry['table'], entry['values'], entry['match'])
+        else:
+            self._insert(entry['table'], entry['rows'])
+
+    def _update(self, table: str, values: Dict, match: Dict) -> List[Dict]:
+        query = self.client.table(table).update(values)
+        for column, value in match.items():
+            query = query.eq(column, value)
+        return query.execute().data
+
+    def _insert(self, table: str, rows: List[Dict]):
+        self.client.table(table).insert(rows).execute()
+        with self._stats_lock:
+            self.written += len(rows)
+            self.batches += 1
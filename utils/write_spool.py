@@ -0,0 +1,161 @@
+"""
+Local write spool for database writes made while Supabase is unreachable.
+Writes are appended to a JSONL file and replayed, oldest first, once the
+database is back, so an outage delays rows instead of losing them.
+"""
+
+import json
+import os
+import threading
+from glob import escape, glob
+from typing import Any, Callable, Dict, List, Optional
+
+
+class WriteSpool:
+    """
+    Append-only JSONL spool of pending writes.
+
+    Each line is one write: {"table", "op": "insert", "rows"} or
+    {"table", "op": "update", "values", "match"}. Processes sharing the file
+    claim it for replay by renaming it, so a write is replayed once.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the spool.
+
+        Args:
+            path: JSONL file; its directory is created if needed
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.spooled = 0
+        self.replayed = 0
+        self.dropped = 0
+
+    def append_insert(self, table: str, rows: List[Dict]):
+        self._append([{'table': table, 'op': 'insert', 'rows': rows}])
+
+    def append_update(self, table: str, values: Dict, match: Dict):
+        self._append([{'table': table, 'op': 'update', 'values': values, 'match': match}])
+
+    def pending(self) -> bool:
+        """True if the spool file has writes waiting."""
+        try:
+            return os.path.getsize(self.path) > 0
+        except OSError:
+            return False
+
+    def replay(self, apply: Callable[[Dict], None], is_outage: Callable[[Exception], bool]) -> int:
+        """
+        Apply spooled writes in order.
+
+        Stops at the first outage error and puts that write and everything
+        after it back in the spool. Writes rejected for other reasons (e.g.
+        a duplicate key from an earlier partial replay) are dropped.
+
+        Args:
+            apply: Performs one write against the database
+            is_outage: Decides whether an error means the database is down
+
+        Returns:
+            Number of writes applied
+        """
+        # Under the lock so no in-process append lands in the claimed file late
+        with self._lock:
+            claimed = self._claim()
+            if claimed is None:
+                return 0
+            entries = self._read(claimed)
+
+        applied = 0
+        for index, entry in enumerate(entries):
+            try:
+                apply(entry)
+                applied += 1
+            except Exception as e:
+                if is_outage(e):
+                    self._append(entries[index:], requeued=True)
+                    break
+                print(f"WRITE SPOOL ERROR: dropped {entry['op']} on {entry['table']}: {e}")
+                with self._lock:
+                    self.dropped += 1
+
+        os.remove(claimed)
+        with self._lock:
+            self.replayed += applied
+        return applied
+
+    def recover(self):
+        """
+        Return writes from replays interrupted by a crash to the spool.
+        Call at start-up, before this process replays anything.
+        """
+        for claimed in glob(f'{escape(self.path)}.replaying-*'):
+            pid = claimed.rsplit('-', 1)[-1]
+            # A file with our own PID is from an earlier process (e.g. PID 1 in a container)
+            if pid.isdigit() and int(pid) != os.getpid() and pid_alive(int(pid)):
+                continue
+            self._append(self._read(claimed), requeued=True)
+            os.remove(claimed)
+
+    def after_fork(self):
+        """Replace the lock inherited by a forked child."""
+        self._lock = threading.Lock()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'spooled': self.spooled,
+            'replayed': self.replayed,
+            'dropped': self.dropped,
+        }
+
+    def _append(self, entries: List[Dict[str, Any]], requeued: bool = False):
+        if not entries:
+            return
+        lines = ''.join(json.dumps(entry, default=str) + '\n' for entry in entries)
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            if not requeued:
+                self.spooled += len(entries)
+
+    def _claim(self) -> Optional[str]:
+        claimed = f'{self.path}.replaying-{os.getpid()}'
+        try:
+            # Atomic: concurrent writers append to a fresh file from here on
+            os.replace(self.path, claimed)
+        except FileNotFoundError:
+            return None
+        return claimed
+
+    def _read(self, path: str) -> List[Dict[str, Any]]:
+        entries = []
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn last line from a crash mid-append
+                    print(f"WRITE SPOOL ERROR: skipped unreadable line in {path}")
+        return entries
+
+
+def pid_alive(pid: int) -> bool:
+    """True if a process with this PID exists (on this host)."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True